@@ -0,0 +1,473 @@
+"""
+Times the billing and queue statements on the docker-compose SQL Server, before and after the index packs.
+
+    docker compose up -d
+    python benchmarks/bench_billing_sql.py --patients 22000 --months 3
+
+Loads synthetic data into a scratch database and times every statement without supporting indexes. Then it
+applies the sql/schema packs in order, runs update_billing_statistics and times them again. Statements
+that write run inside a transaction that is rolled back, so every run sees the same data. Connection details
+come from the INTEGRATION_DB_* variables the integration tests use.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import numpy as np
+import pandas as pd
+import pyodbc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from medicare_rebuild.queries import create_patient_reading_day_stmt
+from medicare_rebuild.utils.synthetic_utils import generate_dataset
+
+
+sql_dir = Path(__file__).resolve().parents[1] / "sql"
+schema_packs = sorted((sql_dir / "schema").glob("v*.sql"))
+
+procedures = [
+    "refresh_patient_reading_day",
+    "update_billing_statistics",
+    "batch_medcode_99202",
+    "batch_medcode_99453_bg",
+    "batch_medcode_99453_bp",
+    "batch_medcode_99454",
+    "batch_medcode_99454_bg",
+    "batch_medcode_99454_bp",
+    "batch_medcode_99457",
+    "batch_medcode_99458",
+    "get_my_queue",
+    "search_patient_list",
+    "get_patient_overview",
+]
+
+# Only the columns the timed statements read or write.
+schema = [
+    "CREATE TABLE [user] (user_id INT PRIMARY KEY, display_name VARCHAR(200))",
+    """
+    CREATE TABLE patient (
+        patient_id INT PRIMARY KEY,
+        first_name VARCHAR(100),
+        last_name VARCHAR(100),
+        full_name VARCHAR(200),
+        phone_number VARCHAR(20),
+        date_of_birth DATETIME2,
+        user_id INT,
+        temp_user VARCHAR(100)
+    )
+    """,
+    "CREATE TABLE patient_status_type (patient_status_type_id INT PRIMARY KEY, name VARCHAR(50))",
+    """
+    CREATE TABLE patient_status (
+        patient_status_id INT IDENTITY PRIMARY KEY,
+        patient_id INT,
+        patient_status_type_id INT,
+        temp_status_type VARCHAR(50)
+    )
+    """,
+    """
+    CREATE TABLE patient_address (
+        patient_address_id INT IDENTITY PRIMARY KEY,
+        patient_id INT,
+        temp_state VARCHAR(10)
+    )
+    """,
+    "CREATE TABLE note_type (note_type_id INT PRIMARY KEY, name VARCHAR(100))",
+    """
+    CREATE TABLE patient_note (
+        patient_note_id INT IDENTITY PRIMARY KEY,
+        patient_id INT,
+        note_datetime DATETIME2,
+        call_time_seconds INT,
+        note_type_id INT,
+        user_id INT,
+        temp_note_type VARCHAR(100),
+        temp_user VARCHAR(100)
+    )
+    """,
+    "CREATE TABLE device (device_id INT PRIMARY KEY, patient_id INT)",
+    """
+    CREATE TABLE glucose_reading (
+        glucose_reading_id INT IDENTITY PRIMARY KEY,
+        device_id INT,
+        recorded_datetime DATETIME2,
+        received_datetime DATETIME2
+    )
+    """,
+    """
+    CREATE TABLE blood_pressure_reading (
+        blood_pressure_reading_id INT IDENTITY PRIMARY KEY,
+        device_id INT,
+        recorded_datetime DATETIME2,
+        received_datetime DATETIME2
+    )
+    """,
+    "CREATE TABLE medical_code_type (med_code_type_id INT PRIMARY KEY, name VARCHAR(10))",
+    """
+    CREATE TABLE medical_code (
+        med_code_id INT IDENTITY PRIMARY KEY,
+        patient_id INT,
+        med_code_type_id INT,
+        timestamp_applied DATETIME2
+    )
+    """,
+    """
+    CREATE TABLE medical_code_device (
+        medical_code_device_id INT IDENTITY PRIMARY KEY,
+        med_code_id INT,
+        device_id INT
+    )
+    """,
+    create_patient_reading_day_stmt,
+]
+
+code_names = ["99202", "99203", "99204", "99205", "99453", "99454", "99457", "99458"]
+
+Statement = Tuple[str, str, Tuple[Any, ...]]
+
+
+def connect(database: str = "master", autocommit: bool = False) -> pyodbc.Connection:
+    """Connects to the benchmark SQL Server, defaulting to the docker-compose.yml credentials."""
+    host = os.environ.get("INTEGRATION_DB_HOST", "localhost")
+    port = os.environ.get("INTEGRATION_DB_PORT", "14330")
+    user = os.environ.get("INTEGRATION_DB_USER", "sa")
+    password = os.environ.get("INTEGRATION_DB_PASSWORD", "IntegrationTest_Passw0rd!")
+    conn = pyodbc.connect(
+        "DRIVER={ODBC Driver 18 for SQL Server};"
+        f"SERVER={host},{port};DATABASE={database};UID={user};PWD={password};"
+        "TrustServerCertificate=yes",
+        timeout=10,
+    )
+    conn.autocommit = autocommit
+    return conn
+
+
+def split_batches(script: str) -> List[str]:
+    """Splits a SQL script into the batches between its GO lines."""
+    batches = re.split(r"^\s*GO\s*$", script, flags=re.IGNORECASE | re.MULTILINE)
+    return [batch.strip() for batch in batches if batch.strip()]
+
+
+def read_sql(path: Path) -> str:
+    return path.read_text(encoding="utf-8-sig")
+
+
+def run_batches(conn: pyodbc.Connection, batches: List[str]) -> None:
+    cur = conn.cursor()
+    for batch in batches:
+        cur.execute(batch)
+        while cur.nextset():
+            pass
+    conn.commit()
+
+
+def insert(conn: pyodbc.Connection, table: str, df: pd.DataFrame) -> None:
+    """Bulk inserts a DataFrame whose columns match the table's by name."""
+    columns = ", ".join(df.columns)
+    params = ", ".join("?" for _ in df.columns)
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    rows = df.astype(object).where(df.notna(), None).values.tolist()
+    for i in range(0, len(rows), 50_000):
+        cur.executemany(
+            f"INSERT INTO [{table}] ({columns}) VALUES ({params})",
+            rows[i : i + 50_000],
+        )
+    conn.commit()
+
+
+def load_dataset(
+    conn: pyodbc.Connection,
+    patients: int,
+    months: int,
+    readings_per_day: float,
+    today: datetime,
+    seed: int = 42,
+) -> Dict[str, int]:
+    """Loads generated patients, devices, readings and notes ending at today, the way the importer leaves them.
+
+    Returns:
+        Dict[str, int]: Rows loaded per table.
+    """
+    start = today - timedelta(days=months * 30)
+    data = generate_dataset(
+        patients=patients,
+        months=months,
+        readings_per_day=readings_per_day,
+        start_date=start.strftime("%Y-%m-%d"),
+        seed=seed,
+    )
+    export = data["Patient_Export"]
+    rng = np.random.default_rng(seed)
+    patient_ids = export["ID"].to_numpy()
+
+    users = sorted(
+        set(export["Health Coach"].dropna()) | set(data["Medical_Notes"]["LCH_UPN"])
+    )
+    user_ids = {name: i for i, name in enumerate(users, start=1)}
+    insert(
+        conn,
+        "user",
+        pd.DataFrame({"user_id": list(user_ids.values()), "display_name": users}),
+    )
+
+    coaches = export["Health Coach"].fillna(users[0])
+    first_names = export["First Name"].fillna("").str.strip().str.title()
+    last_names = export["Last Name"].fillna("").str.strip().str.title()
+    insert(
+        conn,
+        "patient",
+        pd.DataFrame(
+            {
+                "patient_id": patient_ids,
+                "first_name": first_names,
+                "last_name": last_names,
+                "full_name": first_names + " " + last_names,
+                "phone_number": export["Phone Number"].str.replace(
+                    r"\D", "", regex=True
+                ),
+                "date_of_birth": pd.Timestamp("1955-01-01")
+                + pd.to_timedelta(rng.integers(0, 30 * 365, patients), unit="D"),
+                "user_id": coaches.map(user_ids),
+                "temp_user": coaches,
+            }
+        ),
+    )
+    statuses = export["Member_Status"].fillna("Active")
+    status_ids = {name: i for i, name in enumerate(sorted(set(statuses)), start=1)}
+    insert(
+        conn,
+        "patient_status_type",
+        pd.DataFrame(
+            {
+                "patient_status_type_id": list(status_ids.values()),
+                "name": list(status_ids),
+            }
+        ),
+    )
+    insert(
+        conn,
+        "patient_status",
+        pd.DataFrame(
+            {
+                "patient_id": patient_ids,
+                "patient_status_type_id": statuses.map(status_ids),
+                "temp_status_type": statuses,
+            }
+        ),
+    )
+    insert(
+        conn,
+        "patient_address",
+        pd.DataFrame({"patient_id": patient_ids, "temp_state": "TX"}),
+    )
+
+    notes = data["Medical_Notes"].merge(
+        data["Time_Log"][["Note_ID", "Recording_Time"]], on="Note_ID", how="left"
+    )
+    note_types = notes["Time_Note"].str.split(",").str[0].str.strip()
+    # Some initial evaluations, so 99202 has patients to find.
+    note_types = note_types.replace(
+        "Initial Evaluation with APRN", "Initial Evaluation"
+    )
+    type_ids = {name: i for i, name in enumerate(sorted(set(note_types)), start=1)}
+    insert(
+        conn,
+        "note_type",
+        pd.DataFrame({"note_type_id": list(type_ids.values()), "name": list(type_ids)}),
+    )
+    insert(
+        conn,
+        "patient_note",
+        pd.DataFrame(
+            {
+                "patient_id": notes["SharePoint_ID"].astype(int),
+                "note_datetime": notes["TimeStamp"],
+                "call_time_seconds": pd.to_timedelta(notes["Recording_Time"])
+                .dt.total_seconds()
+                .astype("Int64"),
+                "note_type_id": note_types.map(type_ids),
+                "user_id": notes["LCH_UPN"].map(user_ids),
+                "temp_note_type": note_types,
+                "temp_user": notes["LCH_UPN"],
+            }
+        ),
+    )
+
+    devices = data["Fulfillment_All"]
+    devices = devices[devices["Resupply"] == 0].drop_duplicates(
+        ["Patient_ID", "Device_Name"]
+    )
+    devices = devices.assign(device_id=np.arange(1, devices.shape[0] + 1))
+    insert(
+        conn,
+        "device",
+        devices[["device_id", "Patient_ID"]].rename(
+            columns={"Patient_ID": "patient_id"}
+        ),
+    )
+    counts = {}
+    for table, name, device_name in [
+        ("glucose_reading", "Glucose_Readings", "Tenovi Glucometer"),
+        (
+            "blood_pressure_reading",
+            "Blood_Pressure_Readings",
+            "Omron Blood Pressure Monitor",
+        ),
+    ]:
+        kind_devices = devices.loc[
+            devices["Device_Name"] == device_name, ["Patient_ID", "device_id"]
+        ]
+        readings = data[name].merge(
+            kind_devices, left_on="SharePoint_ID", right_on="Patient_ID"
+        )
+        insert(
+            conn,
+            table,
+            readings[["device_id", "Time_Recorded", "Time_Recieved"]].rename(
+                columns={
+                    "Time_Recorded": "recorded_datetime",
+                    "Time_Recieved": "received_datetime",
+                }
+            ),
+        )
+        counts[table] = readings.shape[0]
+
+    insert(
+        conn,
+        "medical_code_type",
+        pd.DataFrame(
+            {
+                "med_code_type_id": range(1, len(code_names) + 1),
+                "name": code_names,
+            }
+        ),
+    )
+    counts.update(
+        patient=patients, patient_note=notes.shape[0], device=devices.shape[0]
+    )
+    return counts
+
+
+def billing_statements(today: datetime, display_name: str) -> List[Statement]:
+    """The statements timed before and after the index packs, with their parameters."""
+    date = today.date()
+    statements: List[Statement] = [
+        ("refresh_patient_reading_day", "EXEC refresh_patient_reading_day", ()),
+        (
+            "refresh_patient_reading_day[7 days]",
+            "EXEC refresh_patient_reading_day @since = ?",
+            (date - timedelta(days=7),),
+        ),
+    ]
+    statements += [
+        (name, f"EXEC {name} @today_date = ?", (date,))
+        for name in procedures
+        if name.startswith("batch_medcode_")
+    ]
+    statements += [
+        ("get_my_queue", "EXEC get_my_queue @display_name = ?", (display_name,)),
+        ("search_patient_list", "EXEC search_patient_list @last_name = ?", ("Smith",)),
+        ("get_patient_overview", "EXEC get_patient_overview @patient_id = ?", (1,)),
+    ]
+    return statements
+
+
+def time_statements(
+    conn: pyodbc.Connection, statements: List[Statement], repeat: int = 3
+) -> Dict[str, float]:
+    """Times each statement, rolling back after every run. Returns the best wall time in seconds per statement."""
+    results = {}
+    cur = conn.cursor()
+    for name, stmt, params in statements:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cur.execute(stmt, *params)
+            while True:
+                if cur.description:
+                    cur.fetchall()
+                if not cur.nextset():
+                    break
+            best = min(best, time.perf_counter() - start)
+            conn.rollback()
+        results[name] = round(best, 4)
+        print(f"{name:<40} {best:>10.4f} s", flush=True)
+    return results
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patients", type=int, default=2_200)
+    parser.add_argument("--months", type=int, default=2)
+    parser.add_argument("--readings-per-day", type=float, default=2.0)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed runs per statement."
+    )
+    parser.add_argument("--database", default="medicare_rebuild_bench")
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the scratch database afterwards."
+    )
+    args = parser.parse_args(argv)
+
+    admin = connect(autocommit=True)
+    admin.execute(
+        f"IF DB_ID('{args.database}') IS NOT NULL DROP DATABASE {args.database}"
+    )
+    admin.execute(f"CREATE DATABASE {args.database}")
+    conn = connect(args.database)
+    try:
+        run_batches(conn, schema)
+        run_batches(
+            conn,
+            [read_sql(sql_dir / "stored_procedures" / f"{p}.sql") for p in procedures],
+        )
+        today = datetime.combine(datetime.today(), datetime.min.time())
+        counts = load_dataset(
+            conn, args.patients, args.months, args.readings_per_day, today
+        )
+        print(", ".join(f"{table}: {rows:,}" for table, rows in counts.items()))
+
+        # The codes a month ago are already billed, so the NOT EXISTS checks have rows to probe.
+        run_batches(conn, ["EXEC refresh_patient_reading_day"])
+        last_month = (today - timedelta(days=30)).date()
+        cur = conn.cursor()
+        for name in procedures:
+            if name.startswith("batch_medcode_"):
+                cur.execute(f"EXEC {name} @today_date = ?", last_month)
+        conn.commit()
+
+        display_name = conn.execute(
+            "SELECT TOP 1 u.display_name FROM [user] u JOIN patient p ON u.user_id = p.user_id"
+        ).fetchval()
+        statements = billing_statements(today, display_name)
+
+        print("\nWithout indexes")
+        before = time_statements(conn, statements, repeat=args.repeat)
+        for pack in schema_packs:
+            run_batches(conn, split_batches(read_sql(pack)))
+        run_batches(conn, ["EXEC update_billing_statistics"])
+        print(f"\nWith {', '.join(pack.name for pack in schema_packs)}")
+        after = time_statements(conn, statements, repeat=args.repeat)
+    finally:
+        conn.close()
+        if not args.keep:
+            admin.execute(
+                f"ALTER DATABASE {args.database} SET SINGLE_USER WITH ROLLBACK IMMEDIATE"
+            )
+            admin.execute(f"DROP DATABASE {args.database}")
+        admin.close()
+
+    report = pd.DataFrame({"before_s": before, "after_s": after})
+    report["speedup"] = (report["before_s"] / report["after_s"]).round(2)
+    print()
+    print(report.to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
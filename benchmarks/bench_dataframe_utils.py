@@ -0,0 +1,194 @@
+"""
+Benchmarks the dataframe_utils normalize functions over synthetic data at several sizes.
+
+    python benchmarks/bench_dataframe_utils.py --sizes 2200 22000 220000
+    python benchmarks/bench_dataframe_utils.py --save        # store the baseline
+    python benchmarks/bench_dataframe_utils.py               # compare with it
+
+Sizes are patient counts; readings and notes scale with them. Exits with status 1 when a benchmark
+regresses against the stored baseline by more than the threshold.
+"""
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from medicare_rebuild.utils.benchmark_utils import (
+    compare_to_baseline,
+    load_baseline,
+    measure,
+    save_baseline,
+)
+from medicare_rebuild.utils.dataframe_utils import (
+    check_patient_db_constraints,
+    map_id_col,
+    normalize_bg_readings,
+    normalize_bp_readings,
+    normalize_devices,
+    normalize_patient_notes,
+    normalize_patients,
+)
+from medicare_rebuild.utils.synthetic_utils import generate_dataset
+
+
+default_baseline = Path(__file__).with_name("baseline.json")
+
+Case = Tuple[str, Callable[[Any], Any], Callable[[], Any], int]
+
+
+def build_cases(patients: int, seed: int = 42) -> List[Case]:
+    """Generates the data for one size and pairs each benchmarked function with its input."""
+    data = generate_dataset(patients=patients, seed=seed)
+    patient_df = data["Patient_Export"]
+    normalized_patient_df = normalize_patients(patient_df.copy())
+
+    time_df = data["Time_Log"].rename(
+        columns={"SharPoint_ID": "SharePoint_ID", "Notes": "Note_Type"}
+    )
+    notes_df = pd.merge(
+        data["Medical_Notes"],
+        time_df,
+        on=["SharePoint_ID", "Note_ID", "LCH_UPN"],
+        how="left",
+    )
+    notes_df["Time_Note"] = notes_df["Time_Note"].fillna(notes_df["Note_Type"])
+    notes_df.drop(columns=["Note_ID", "Note_Type"], inplace=True)
+
+    device_df = data["Fulfillment_All"]
+    device_df = device_df[device_df["Resupply"] == 0].drop(columns="Resupply")
+    gluc_df = data["Glucose_Readings"]
+    bp_df = data["Blood_Pressure_Readings"]
+
+    # The ID maps the importer resolves readings with: patients by SharePoint ID,
+    # devices by patient and reading kind.
+    reading_df = normalize_bg_readings(gluc_df.copy())
+    patient_ids = np.arange(1, patients + 1) + 1000
+    patient_map = pd.Series(
+        patient_ids,
+        index=pd.Index(np.arange(1, patients + 1), name="sharepoint_id"),
+        name="patient_id",
+    )
+    device_map = pd.Series(
+        np.arange(1, 2 * patients + 1),
+        index=pd.MultiIndex.from_product(
+            [patient_ids, ["bg", "bp"]], names=["patient_id", "reading_kind"]
+        ),
+        name="device_id",
+    )
+    patient_reading_df = map_id_col(reading_df, patient_map, "sharepoint_id")[0]
+    patient_reading_df["reading_kind"] = "bg"
+
+    return [
+        (
+            "normalize_patients",
+            normalize_patients,
+            patient_df.copy,
+            patient_df.shape[0],
+        ),
+        (
+            "normalize_patient_notes",
+            normalize_patient_notes,
+            notes_df.copy,
+            notes_df.shape[0],
+        ),
+        (
+            "normalize_devices",
+            normalize_devices,
+            device_df.copy,
+            device_df.shape[0],
+        ),
+        (
+            "normalize_bg_readings",
+            normalize_bg_readings,
+            gluc_df.copy,
+            gluc_df.shape[0],
+        ),
+        (
+            "normalize_bp_readings",
+            normalize_bp_readings,
+            bp_df.copy,
+            bp_df.shape[0],
+        ),
+        (
+            "check_patient_db_constraints",
+            check_patient_db_constraints,
+            normalized_patient_df.copy,
+            normalized_patient_df.shape[0],
+        ),
+        (
+            "map_id_col",
+            lambda df: map_id_col(df, patient_map, "sharepoint_id"),
+            reading_df.copy,
+            reading_df.shape[0],
+        ),
+        (
+            "map_id_col_device",
+            lambda df: map_id_col(df, device_map, ["patient_id", "reading_kind"]),
+            patient_reading_df.copy,
+            patient_reading_df.shape[0],
+        ),
+    ]
+
+
+def run(sizes: List[int], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Runs every benchmark at every size. Results are keyed as '<function>[<patients>]'."""
+    results = {}
+    for patients in sizes:
+        for name, func, make_input, rows in build_cases(patients):
+            key = f"{name}[{patients}]"
+            results[key] = measure(func, make_input, rows, repeat=repeat)
+            print(
+                f"{key:<40} {rows:>10,} rows {results[key]['rows_per_sec']:>14,.0f} rows/s "
+                f"{results[key]['peak_mb']:>10,.1f} MB",
+                flush=True,
+            )
+    return results
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[2_200, 22_000],
+        help="Patient counts to benchmark (22,000 is current production size).",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case.")
+    parser.add_argument("--baseline", type=Path, default=default_baseline)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown or memory growth flagged as a regression.",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="Store the results as the new baseline."
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, repeat=args.repeat)
+    if args.save:
+        save_baseline({**load_baseline(args.baseline), **results}, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save to store one.")
+        return 0
+    report = compare_to_baseline(results, baseline, threshold=args.threshold)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(report.to_string(index=False))
+    regressions = report.loc[report["regression"], "benchmark"].tolist()
+    if regressions:
+        print(f"Regressions against baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,8 @@
-SELECT d.patient_id,
-	MAX(gr.received_datetime) AS latest_reading
-FROM device d
-JOIN glucose_reading gr
-ON d.device_id = gr.device_id
-WHERE NOT EXISTS (
+SELECT prd.patient_id,
+	MAX(prd.last_received_datetime) AS latest_reading
+FROM patient_reading_day prd
+WHERE prd.reading_kind = 'bg'
+AND NOT EXISTS (
 	SELECT 1
 	FROM medical_code mc
 	JOIN medical_code_type mct 
@@ -11,8 +10,8 @@ WHERE NOT EXISTS (
 	AND mct.name = '99453'
 	JOIN medical_code_device mcd
 	ON mc.med_code_id = mcd.med_code_id
-	WHERE mc.patient_id = d.patient_id
-	AND mcd.device_id = d.device_id
+	WHERE mc.patient_id = prd.patient_id
+	AND mcd.device_id = prd.device_id
 )
-GROUP BY d.patient_id
-HAVING COUNT(DISTINCT CAST(gr.received_datetime AS DATE)) >= 16;
\ No newline at end of file
+GROUP BY prd.patient_id
+HAVING COUNT(DISTINCT prd.reading_day) >= 16;
\ No newline at end of file
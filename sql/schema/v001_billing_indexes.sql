@@ -0,0 +1,126 @@
+﻿-- =============================================
+-- Author:		Craig Hurley
+-- Create date: 10/18/26
+-- Description:	Schema version 1. Supporting indexes for the billing, queue and import statements.
+--				Every statement checks for its index first, so the pack can be run again safely.
+--				Run with sqlcmd or SSMS, the batches are separated by GO.
+-- =============================================
+IF OBJECT_ID('schema_version', 'U') IS NULL
+CREATE TABLE schema_version (
+	version INT NOT NULL PRIMARY KEY,
+	description VARCHAR(200) NOT NULL,
+	applied_date DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+);
+GO
+
+-- Readings by device and received datetime.
+-- Used by the billing cross check and the patient_reading_day refresh joining readings to their devices.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_glucose_reading_device_received' AND object_id = OBJECT_ID('glucose_reading'))
+CREATE NONCLUSTERED INDEX IX_glucose_reading_device_received
+ON glucose_reading (device_id, received_datetime);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_blood_pressure_reading_device_received' AND object_id = OBJECT_ID('blood_pressure_reading'))
+CREATE NONCLUSTERED INDEX IX_blood_pressure_reading_device_received
+ON blood_pressure_reading (device_id, received_datetime);
+GO
+
+-- Readings by received datetime alone, for the incremental refresh of the days since the last import.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_glucose_reading_received' AND object_id = OBJECT_ID('glucose_reading'))
+CREATE NONCLUSTERED INDEX IX_glucose_reading_received
+ON glucose_reading (received_datetime)
+INCLUDE (device_id);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_blood_pressure_reading_received' AND object_id = OBJECT_ID('blood_pressure_reading'))
+CREATE NONCLUSTERED INDEX IX_blood_pressure_reading_received
+ON blood_pressure_reading (received_datetime)
+INCLUDE (device_id);
+GO
+
+-- Devices by patient, for the queue procedures and the 99453 device links.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_device_patient' AND object_id = OBJECT_ID('device'))
+CREATE NONCLUSTERED INDEX IX_device_patient
+ON device (patient_id);
+GO
+
+-- Notes by patient and note datetime, covering the call time and note type the 99202, 99457 and 99458 sums read.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_patient_note_patient_datetime' AND object_id = OBJECT_ID('patient_note'))
+CREATE NONCLUSTERED INDEX IX_patient_note_patient_datetime
+ON patient_note (patient_id, note_datetime)
+INCLUDE (call_time_seconds, note_type_id);
+GO
+
+-- Notes by note datetime alone, for the monthly 99457 and 99458 windows across every patient.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_patient_note_datetime' AND object_id = OBJECT_ID('patient_note'))
+CREATE NONCLUSTERED INDEX IX_patient_note_datetime
+ON patient_note (note_datetime)
+INCLUDE (patient_id, call_time_seconds);
+GO
+
+-- Medical codes by patient, code type and date, for the NOT EXISTS checks of every batch_medcode procedure.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_medical_code_patient_type_applied' AND object_id = OBJECT_ID('medical_code'))
+CREATE NONCLUSTERED INDEX IX_medical_code_patient_type_applied
+ON medical_code (patient_id, med_code_type_id, timestamp_applied);
+GO
+
+-- Medical codes by date alone, for the billing report and the 99458 code counts.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_medical_code_applied' AND object_id = OBJECT_ID('medical_code'))
+CREATE NONCLUSTERED INDEX IX_medical_code_applied
+ON medical_code (timestamp_applied)
+INCLUDE (patient_id, med_code_type_id);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_medical_code_device_code' AND object_id = OBJECT_ID('medical_code_device'))
+CREATE NONCLUSTERED INDEX IX_medical_code_device_code
+ON medical_code_device (med_code_id, device_id);
+GO
+
+-- Filtered indexes on the temp_* columns, only holding the rows the post-load lookup updates still have to resolve.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_patient_note_temp_note_type' AND object_id = OBJECT_ID('patient_note'))
+CREATE NONCLUSTERED INDEX IX_patient_note_temp_note_type
+ON patient_note (temp_note_type)
+WHERE temp_note_type IS NOT NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_patient_note_temp_user' AND object_id = OBJECT_ID('patient_note'))
+CREATE NONCLUSTERED INDEX IX_patient_note_temp_user
+ON patient_note (temp_user)
+WHERE temp_user IS NOT NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_patient_status_temp_status_type' AND object_id = OBJECT_ID('patient_status'))
+CREATE NONCLUSTERED INDEX IX_patient_status_temp_status_type
+ON patient_status (temp_status_type)
+WHERE temp_status_type IS NOT NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_patient_temp_user' AND object_id = OBJECT_ID('patient'))
+CREATE NONCLUSTERED INDEX IX_patient_temp_user
+ON patient (temp_user)
+WHERE temp_user IS NOT NULL;
+GO
+
+-- The lookup names the updates resolve the temp_* columns against, and get_my_queue filters users by.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_note_type_name' AND object_id = OBJECT_ID('note_type'))
+CREATE NONCLUSTERED INDEX IX_note_type_name
+ON note_type (name)
+INCLUDE (note_type_id);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_patient_status_type_name' AND object_id = OBJECT_ID('patient_status_type'))
+CREATE NONCLUSTERED INDEX IX_patient_status_type_name
+ON patient_status_type (name)
+INCLUDE (patient_status_type_id);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_user_display_name' AND object_id = OBJECT_ID('user'))
+CREATE NONCLUSTERED INDEX IX_user_display_name
+ON [user] (display_name)
+INCLUDE (user_id);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM schema_version WHERE version = 1)
+INSERT INTO schema_version (version, description)
+VALUES (1, 'Billing, queue and import indexes');
+GO
\ No newline at end of file
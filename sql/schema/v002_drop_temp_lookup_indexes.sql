@@ -0,0 +1,23 @@
+﻿-- =============================================
+-- Author:		Craig Hurley
+-- Create date: 10/18/26
+-- Description:	Schema version 2. The importer resolves note types, patient status types and users before
+--				inserting, so nothing updates the temp_* columns after a load anymore. Drops the filtered
+--				indexes version 1 kept on them, which only slowed the loads down.
+-- =============================================
+DROP INDEX IF EXISTS IX_patient_note_temp_note_type ON patient_note;
+GO
+
+DROP INDEX IF EXISTS IX_patient_note_temp_user ON patient_note;
+GO
+
+DROP INDEX IF EXISTS IX_patient_status_temp_status_type ON patient_status;
+GO
+
+DROP INDEX IF EXISTS IX_patient_temp_user ON patient;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM schema_version WHERE version = 2)
+INSERT INTO schema_version (version, description)
+VALUES (2, 'Drop the temp_* lookup update indexes');
+GO
\ No newline at end of file
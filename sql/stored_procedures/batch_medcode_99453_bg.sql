@@ -1,7 +1,7 @@
 ﻿-- =============================================
 -- Author:		Craig Hurley
 -- Create date: 12/20/24
--- Revision date: 01/27/25
+-- Revision date: 10/17/26
 -- Description:	Adds 99453 to medical code for patients with 16 distinct days of glucose testing.
 -- =============================================
 CREATE PROCEDURE [dbo].[batch_medcode_99453_bg]
@@ -17,16 +17,15 @@ BEGIN
 
 	-- Create a temporary table #99453_bg.
 	-- Select patient_id and the latest reading glucose received reading date.
-	-- Selecting from the patients, devices and join on glucose readings table.
+	-- Selecting from the daily glucose rows of the patient_reading_day rollup instead of the readings table.
 	-- Where a patient_id and device_id in the medical code table with a 99453 code doesn't exist.
-	-- Group by patient_id and count the distinct dates of glucose recevied readings.
-	SELECT d.patient_id,
-		MAX(gr.received_datetime) latest_reading
+	-- Group by patient_id and count the distinct days of glucose recevied readings.
+	SELECT prd.patient_id,
+		MAX(prd.last_received_datetime) latest_reading
 	INTO #99453_bg
-	FROM device d
-	JOIN glucose_reading gr
-	ON d.device_id = gr.device_id
-	WHERE NOT EXISTS (
+	FROM patient_reading_day prd
+	WHERE prd.reading_kind = 'bg'
+	AND NOT EXISTS (
 		SELECT 1
 		FROM medical_code mc
 		JOIN medical_code_type mct 
@@ -34,11 +33,11 @@ BEGIN
 		AND mct.name = '99453'
 		JOIN medical_code_device mcd
 		ON mc.med_code_id = mcd.med_code_id
-		WHERE mc.patient_id = d.patient_id
-		AND mcd.device_id = d.device_id
+		WHERE mc.patient_id = prd.patient_id
+		AND mcd.device_id = prd.device_id
 	)
-	GROUP BY d.patient_id
-	HAVING COUNT(DISTINCT CAST(gr.received_datetime AS DATE)) >= 16;
+	GROUP BY prd.patient_id
+	HAVING COUNT(DISTINCT prd.reading_day) >= 16;
 
 	-- Using the #99453 temporary table.
 	-- Insert patient_id, medical_code_type and latest reading datetime into medical code table.
@@ -1,7 +1,7 @@
 ﻿-- =============================================
 -- Author:		Craig Hurley
 -- Create date: 12/23/24
--- Revision date: 01/27/25
+-- Revision date: 10/17/26
 -- Description:	Adds 99454 code to medical code for patients with 16 distinct days of testing.
 -- =============================================
 CREATE PROCEDURE batch_medcode_99454
@@ -14,35 +14,30 @@ BEGIN
 
 	-- Create a temporary table #99454.
 	-- Select patient_id and the latest reading blood pressure or glucose reading date.
-	-- Selecting from the patients, devices. Left join on both readings tables within the last 30 days.
+	-- Selecting the daily rows of both reading kinds from the patient_reading_day rollup within the last 30 days.
 	-- Where a patient_id doesn't exist in the medical code table with a 99454 code and in the last 30 days.
-	-- Group by patient_id and count the distinct dates of eith blood pressure or glucose recevied readings.
-	SELECT d.patient_id,
+	-- Group by patient_id and count the distinct days of eith blood pressure or glucose recevied readings.
+	SELECT prd.patient_id,
 		CASE
-		WHEN MAX(gr.received_datetime) > MAX(bpr.received_datetime)
-		THEN MAX(gr.received_datetime)
-		ELSE MAX(bpr.received_datetime)
+		WHEN MAX(CASE WHEN prd.reading_kind = 'bg' THEN prd.last_received_datetime END) > MAX(CASE WHEN prd.reading_kind = 'bp' THEN prd.last_received_datetime END)
+		THEN MAX(CASE WHEN prd.reading_kind = 'bg' THEN prd.last_received_datetime END)
+		ELSE MAX(CASE WHEN prd.reading_kind = 'bp' THEN prd.last_received_datetime END)
 		END AS last_reading
 	INTO #99454
-	FROM device d
-	LEFT JOIN glucose_reading gr
-	ON d.device_id = gr.device_id
-	AND gr.received_datetime >= DATEADD(day, -30, @today_date)
-	LEFT JOIN blood_pressure_reading bpr
-	ON d.device_id = bpr.device_id
-	AND bpr.received_datetime >= DATEADD(day, -30, @today_date)
-	WHERE NOT EXISTS (
+	FROM patient_reading_day prd
+	WHERE prd.reading_day >= DATEADD(day, -30, @today_date)
+	AND NOT EXISTS (
 		SELECT 1
 		FROM medical_code mc
 		JOIN medical_code_type mct 
 		ON mc.med_code_type_id = mct.med_code_type_id
 		AND mct.name = '99454'
-		WHERE mc.patient_id = d.patient_id
+		WHERE mc.patient_id = prd.patient_id
 		AND mc.timestamp_applied >= DATEADD(day, -30, @today_date)
 	)
-	GROUP BY d.patient_id
-	HAVING COUNT(DISTINCT CAST(gr.received_datetime AS DATE)) >= 16
-	OR COUNT(DISTINCT CAST(bpr.received_datetime AS DATE)) >= 16;
+	GROUP BY prd.patient_id
+	HAVING COUNT(DISTINCT CASE WHEN prd.reading_kind = 'bg' THEN prd.reading_day END) >= 16
+	OR COUNT(DISTINCT CASE WHEN prd.reading_kind = 'bp' THEN prd.reading_day END) >= 16;
 
 	-- Using the #99454 temporary table.
 	-- Insert patient_id, medical_code_type and latest reading datetime into medical code table.
@@ -1,7 +1,7 @@
 ﻿-- =============================================
 -- Author:		Craig Hurley
 -- Create date: 12/23/24
--- Revision date: 01/27/25
+-- Revision date: 10/17/26
 -- Description:	Adds 99454 to medical code for patients with 16 distinct days of glucose testing.
 -- =============================================
 CREATE PROCEDURE [dbo].[batch_medcode_99454_bg]
@@ -14,27 +14,26 @@ BEGIN
 
 	-- Create a temporary table #99454_bg.
 	-- Select patient_id and the latest glucose reading date.
-	-- Selecting from the patients, devices. Join on glucose readings tables within the last 30 days.
+	-- Selecting the daily glucose rows of the patient_reading_day rollup within the last 30 days.
 	-- Where a patient_id doesn't exist in the medical code table with a 99454_bg code and in the last 30 days.
-	-- Group by patient_id and count the distinct dates of glucose recevied readings.
-	SELECT d.patient_id,
-		MAX(gr.received_datetime) latest_reading
+	-- Group by patient_id and count the distinct days of glucose recevied readings.
+	SELECT prd.patient_id,
+		MAX(prd.last_received_datetime) latest_reading
 	INTO #99454_bg
-	FROM device d
-	JOIN glucose_reading gr
-	ON d.device_id = gr.device_id
-	AND gr.received_datetime >= DATEADD(day, -30, @today_date)
-	WHERE NOT EXISTS (
+	FROM patient_reading_day prd
+	WHERE prd.reading_kind = 'bg'
+	AND prd.reading_day >= DATEADD(day, -30, @today_date)
+	AND NOT EXISTS (
 		SELECT 1
 		FROM medical_code mc
 		JOIN medical_code_type mct 
 		ON mc.med_code_type_id = mct.med_code_type_id
 		AND mct.name = '99454'
-		WHERE mc.patient_id = d.patient_id
+		WHERE mc.patient_id = prd.patient_id
 		AND mc.timestamp_applied >= DATEADD(day, -30, @today_date)
 	)
-	GROUP BY d.patient_id
-	HAVING COUNT(DISTINCT CAST(gr.received_datetime AS DATE)) >= 16;
+	GROUP BY prd.patient_id
+	HAVING COUNT(DISTINCT prd.reading_day) >= 16;
 
 	-- Using the #99454_bg temporary table.
 	-- Insert patient_id, medical_code_type and latest reading datetime into medical code table.
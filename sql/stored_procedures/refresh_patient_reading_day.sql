@@ -0,0 +1,53 @@
+﻿-- =============================================
+-- Author:		Craig Hurley
+-- Create date: 10/17/26
+-- Description:	Rebuilds the patient_reading_day rollup from the given day, or entirely when @since is NULL.
+-- =============================================
+CREATE PROCEDURE [dbo].[refresh_patient_reading_day]
+	@since date = NULL
+AS
+BEGIN
+
+	SET NOCOUNT ON;
+	SET XACT_ABORT ON;
+
+	BEGIN TRANSACTION;
+
+	-- Remove the days being rebuilt, every day when @since is NULL.
+	DELETE FROM patient_reading_day
+	WHERE @since IS NULL
+	OR reading_day >= @since;
+
+	-- One row per device, reading kind and received day.
+	-- Counting the readings and keeping the first and last received datetime of the day.
+	INSERT INTO patient_reading_day (patient_id, device_id, reading_kind, reading_day, reading_count, first_received_datetime, last_received_datetime)
+	SELECT d.patient_id,
+		d.device_id,
+		'bg',
+		CAST(gr.received_datetime AS DATE),
+		COUNT(*),
+		MIN(gr.received_datetime),
+		MAX(gr.received_datetime)
+	FROM glucose_reading gr
+	JOIN device d
+	ON gr.device_id = d.device_id
+	WHERE gr.received_datetime >= ISNULL(@since, '0001-01-01')
+	GROUP BY d.patient_id, d.device_id, CAST(gr.received_datetime AS DATE);
+
+	INSERT INTO patient_reading_day (patient_id, device_id, reading_kind, reading_day, reading_count, first_received_datetime, last_received_datetime)
+	SELECT d.patient_id,
+		d.device_id,
+		'bp',
+		CAST(bpr.received_datetime AS DATE),
+		COUNT(*),
+		MIN(bpr.received_datetime),
+		MAX(bpr.received_datetime)
+	FROM blood_pressure_reading bpr
+	JOIN device d
+	ON bpr.device_id = d.device_id
+	WHERE bpr.received_datetime >= ISNULL(@since, '0001-01-01')
+	GROUP BY d.patient_id, d.device_id, CAST(bpr.received_datetime AS DATE);
+
+	COMMIT TRANSACTION;
+
+END
\ No newline at end of file
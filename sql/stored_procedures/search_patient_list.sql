@@ -25,38 +25,33 @@ BEGIN
 		AND (@patient_id IS NULL OR p.patient_id = @patient_id)
 		GROUP BY p.patient_id
 	),
+	device_reading_days AS (
+		SELECT prd.device_id,
+			SUM(CASE WHEN prd.reading_kind = 'bg' AND prd.reading_day >= @first_of_month AND prd.first_received_datetime <= GETDATE() THEN 1 ELSE 0 END) AS bg_days,
+			SUM(CASE WHEN prd.reading_kind = 'bp' AND prd.reading_day >= @first_of_month AND prd.first_received_datetime <= GETDATE() THEN 1 ELSE 0 END) AS bp_days,
+			MAX(prd.last_received_datetime) AS last_reading_date
+		FROM patient_reading_day prd
+		JOIN patient p
+		ON prd.patient_id = p.patient_id
+		WHERE (@first_name IS NULL OR p.first_name = @first_name)
+		AND (@last_name IS NULL OR p.last_name = @last_name)
+		AND (@phone_number IS NULL OR p.phone_number = @phone_number)
+		AND (@patient_id IS NULL OR p.patient_id = @patient_id)
+		GROUP BY prd.device_id
+	),
 	monthly_count AS (
 		SELECT p.patient_id,
-			COUNT(DISTINCT CAST(gr.received_datetime AS DATE)) +
-			COUNT(DISTINCT CAST(bpr.received_datetime AS DATE)) AS mon_count,
-			(
-				SELECT MAX(received_datetime)
-				FROM (
-					SELECT gr.received_datetime
-					FROM glucose_reading gr
-					WHERE gr.device_id = d.device_id
-					UNION
-					SELECT bpr.received_datetime
-					FROM blood_pressure_reading bpr
-					WHERE bpr.device_id = d.device_id
-				) AS combined_dates
-			) AS last_reading_date
+			COALESCE(drd.bg_days, 0) + COALESCE(drd.bp_days, 0) AS mon_count,
+			drd.last_reading_date
 		FROM patient p
 		LEFT JOIN device d
 		ON p.patient_id = d.patient_id
-		LEFT JOIN glucose_reading gr
-		ON d.device_id = gr.device_id
-		AND gr.received_datetime >= @first_of_month
-		AND gr.received_datetime <= GETDATE()
-		LEFT JOIN blood_pressure_reading bpr
-		ON d.device_id = bpr.device_id
-		AND bpr.received_datetime >= @first_of_month
-		AND bpr.received_datetime <= GETDATE()
+		LEFT JOIN device_reading_days drd
+		ON d.device_id = drd.device_id
 		WHERE (@first_name IS NULL OR p.first_name = @first_name)
 		AND (@last_name IS NULL OR p.last_name = @last_name)
 		AND (@phone_number IS NULL OR p.phone_number = @phone_number)
 		AND (@patient_id IS NULL OR p.patient_id = @patient_id)
-		GROUP BY p.patient_id, d.device_id
 	)
 
 	SELECT p.patient_id,
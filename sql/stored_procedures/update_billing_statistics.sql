@@ -0,0 +1,23 @@
+﻿-- =============================================
+-- Author:		Craig Hurley
+-- Create date: 10/18/26
+-- Description:	Refreshes the statistics of the tables the import bulk loads, so the billing procedures are planned on current row counts.
+-- =============================================
+CREATE PROCEDURE [dbo].[update_billing_statistics]
+AS
+BEGIN
+
+	SET NOCOUNT ON;
+
+	-- A full reload replaces every row, well past what the automatic statistics updates wait for.
+	UPDATE STATISTICS glucose_reading;
+	UPDATE STATISTICS blood_pressure_reading;
+	UPDATE STATISTICS patient_reading_day;
+	UPDATE STATISTICS patient_note;
+	UPDATE STATISTICS device;
+	UPDATE STATISTICS patient;
+	UPDATE STATISTICS patient_status;
+	UPDATE STATISTICS medical_code;
+	UPDATE STATISTICS medical_code_device;
+
+END
\ No newline at end of file
@@ -1,22 +1,31 @@
 import os
 import logging
+import threading
 import warnings
 import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
-from datetime import datetime
-from typing import Dict
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Tuple
 
-from medicare_rebuild.utils.api_utils import MSGraphApi
+from medicare_rebuild.utils.api_utils import (
+    MSGraphApi,
+    TenoviApi,
+    shared_token_cache,
+    user_select_fields,
+)
+from medicare_rebuild.utils.cache_utils import shared_response_cache
 from medicare_rebuild.utils.dataframe_utils import (
-    check_patient_db_constraints,
-    add_id_col,
+    split_patient_db_constraints,
+    map_id_col,
     normalize_users,
     normalize_patients,
     normalize_patient_notes,
     normalize_devices,
     normalize_bg_readings,
     normalize_bp_readings,
+    split_tenovi_readings,
+    drop_vendor_readings,
     create_patient_df,
     create_patient_address_df,
     create_patient_insurance_df,
@@ -27,12 +36,21 @@ from medicare_rebuild.utils.dataframe_utils import (
 from shared_tools.atomic_io import ensure_dir
 from shared_tools.tabular_io import write_structured_file
 
-from medicare_rebuild.utils.db_utils import DatabaseManager
+from medicare_rebuild.utils.db_utils import (
+    DatabaseManager,
+    engine_registry,
+    query_profiler,
+)
+from medicare_rebuild.utils.snapshot_utils import SnapshotFormat, SnapshotWriter
 from medicare_rebuild.helpers import (
     get_files_in_dir,
     delete_files_in_dir,
 )
+from medicare_rebuild.billing import compare_medical_codes, compute_medical_codes
+from medicare_rebuild.harvester import TenoviHarvester
 from medicare_rebuild.logger import setup_logger
+from medicare_rebuild.metrics import RunMetrics
+from medicare_rebuild.pipeline import Pipeline
 from medicare_rebuild.queries import (
     get_notes_log_stmt,
     get_time_log_stmt,
@@ -40,29 +58,54 @@ from medicare_rebuild.queries import (
     get_patient_id_stmt,
     get_device_id_stmt,
     get_vendor_id_stmt,
+    get_user_id_stmt,
+    get_note_type_id_stmt,
+    get_patient_status_type_id_stmt,
     get_bg_readings_stmt,
     get_bp_readings_stmt,
-    update_patient_note_stmt,
-    update_patient_status_stmt,
-    update_user_stmt,
-    update_user_note_stmt,
+    get_billing_notes_stmt,
+    get_billing_bg_readings_stmt,
+    get_billing_bp_readings_stmt,
+    get_medical_codes_stmt,
+    get_watermark_stmt,
+    get_watermarks_like_stmt,
+    create_import_watermark_stmt,
+    create_patient_reading_day_stmt,
+    set_watermark_stmt,
 )
 
 
 class DataImporter:
-    def __init__(self, start_date: str, end_date: str, logger=None):
+    def __init__(
+        self,
+        start_date: str,
+        end_date: str,
+        incremental: bool = False,
+        snap_format: SnapshotFormat = "parquet",
+        metrics: RunMetrics | None = None,
+        tenovi: bool = False,
+        logger=None,
+    ):
         """
         Initializes the DataImporter with the given start and end dates.
 
         Args:
             start_date (str, datetime): The start date for data import.
             end_date (str, datetime): The end date for data import.
+            incremental (bool): Whether to extract only rows past each source's high-water mark and merge them
+                on their natural keys instead of appending. Defaults to False (optional).
+            snap_format (str): Snapshot file format: 'parquet', 'feather', 'csv' or 'xlsx'. Defaults to 'parquet' (optional).
+            metrics (RunMetrics): Run metrics each extract, normalize and load stage is recorded in.
+                Defaults to a new RunMetrics (optional).
+            tenovi (bool): Whether Tenovi readings are harvested from the Tenovi API. Their device readings are then
+                dropped from the SharePoint readings, so they are not loaded twice. Defaults to False (optional).
             logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
         """
         self.start_date = datetime.strptime(start_date, "%Y-%m-%d")
         self.end_date = datetime.strptime(end_date, "%Y-%m-%d")
 
         self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics or RunMetrics("import", logger=self.logger)
         self.gps = DatabaseManager(logger=self.logger)
         self.gps.create_engine(
             username=os.environ["LCH_SQL_GPS_USERNAME"],
@@ -71,17 +114,341 @@ class DataImporter:
             database=os.environ["LCH_SQL_GPS_DB"],
         )
         self.snaps_dir = Path.cwd() / "data" / "snaps"
+        self.snap_format = snap_format
+        self.snapshots: SnapshotWriter | None = None
+        self._snap_lock = threading.Lock()
+        # Guards the ID maps, unmatched counts, watermarks and first reading day the pipeline stages share.
+        self._state_lock = threading.Lock()
+
+        self.incremental = incremental
+        self.tenovi = tenovi
+        self.pending_watermarks: Dict[str, datetime] = {}
+        self.watermark_caps: Dict[str, datetime] = {}
+        if self.incremental:
+            self.gps.execute_query(create_import_watermark_stmt)
+        self.gps.execute_query(create_patient_reading_day_stmt)
+        self.first_reading_day: date | None = None
+
+        self.id_maps: Dict[str, pd.Series] = {}
+        self.unmatched_keys: Dict[str, int] = {}
+
+    # Query, key column(s) and ID column of each cached ID map.
+    # Devices are keyed on their patient and the kind of reading they take, 'bg' or 'bp'.
+    # A patient's only device of unknown kind takes both, see fill_device_kinds.
+    id_map_sources: Dict[str, Tuple[str, str | List[str], str]] = {
+        "patient": (get_patient_id_stmt, "sharepoint_id", "patient_id"),
+        "device": (get_device_id_stmt, ["patient_id", "reading_kind"], "device_id"),
+        "vendor": (get_vendor_id_stmt, "name", "vendor_id"),
+        "user": (get_user_id_stmt, "display_name", "user_id"),
+        "note_type": (get_note_type_id_stmt, "name", "note_type_id"),
+        "patient_status_type": (
+            get_patient_status_type_id_stmt,
+            "name",
+            "patient_status_type_id",
+        ),
+    }
+
+    def refresh_id_map(self, name: str) -> pd.Series:
+        """
+        Reads an ID map from the database and caches it. Called once after each parent table load.
+        Duplicate keys keep the highest ID, e.g. the newest glucometer of a patient.
+
+        Args:
+            name (str): Name of the ID map, a key of id_map_sources.
+
+        Returns:
+            pd.Series: IDs indexed by key value.
+        """
+        stmt, key_col, id_col = self.id_map_sources[name]
+        with self.metrics.stage(f"extract.{name}_id_map") as stage:
+            id_df = stage.output(self.gps.read_sql(stmt)).sort_values(id_col)
+        if name == "device":
+            id_df = self.fill_device_kinds(id_df)
+        duplicated = id_df.duplicated(subset=key_col, keep="last")
+        if duplicated.any():
+            self.logger.warning(
+                f"{duplicated.sum()} duplicate {key_col} values in {name} ID map, keeping the highest {id_col}."
+            )
+        id_map = id_df[~duplicated].set_index(key_col)[id_col]
+        with self._state_lock:
+            self.id_maps[name] = id_map
+        self.logger.debug(f"Cached {name} ID map ({id_map.shape[0]} keys)...")
+        return id_map
+
+    def fill_device_kinds(self, id_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Handles devices whose reading kind could not be told from their name.
+        Each one is reported, and the only device of a patient takes readings of both kinds,
+        so its readings are still loaded.
+
+        Args:
+            id_df (pd.DataFrame): Device IDs with their patient, name and reading kind.
+
+        Returns:
+            pd.DataFrame: The devices, with a row per reading kind for a patient's only device of unknown kind.
+        """
+        untyped = id_df["reading_kind"].isna()
+        if not untyped.any():
+            return id_df
+        untyped_names = dict(
+            zip(id_df.loc[untyped, "device_id"], id_df.loc[untyped, "name"])
+        )
+        self.logger.warning(
+            f"{len(untyped_names)} devices have no reading kind in their name: {untyped_names}."
+        )
+        only_device = ~id_df["patient_id"].duplicated(keep=False)
+        fallback = id_df[untyped & only_device]
+        return pd.concat(
+            [id_df[~untyped]]
+            + [fallback.assign(reading_kind=kind) for kind in ("bg", "bp")]
+        ).sort_values("device_id")
+
+    def get_id_map(self, name: str) -> pd.Series:
+        """
+        Gets a cached ID map, reading it from the database on first use.
+
+        Args:
+            name (str): Name of the ID map, a key of id_map_sources.
+
+        Returns:
+            pd.Series: IDs indexed by key value.
+        """
+        with self._state_lock:
+            id_map = self.id_maps.get(name)
+        if id_map is None:
+            id_map = self.refresh_id_map(name)
+        return id_map
+
+    def resolve_ids(
+        self,
+        df: pd.DataFrame,
+        name: str,
+        table: str,
+        col: str | List[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Replaces a key column with IDs from a cached ID map, reading the map on first use.
+        Rows with unmatched keys are dropped, counted per table and reported.
+
+        Args:
+            df (pd.DataFrame): The DataFrame holding the key column.
+            name (str): Name of the ID map, a key of id_map_sources.
+            table (str): The name of the table being loaded, used for reporting.
+            col (str, List[str]): Key column(s) in the DataFrame. Defaults to the ID map's key column(s) (optional).
+
+        Returns:
+            pd.DataFrame: The DataFrame with the ID column in place of the key column.
+        """
+        id_map = self.get_id_map(name)
+        df, unmatched = map_id_col(df, id_map, col or self.id_map_sources[name][1])
+        if not unmatched.empty:
+            with self._state_lock:
+                self.unmatched_keys[table] = (
+                    self.unmatched_keys.get(table, 0) + unmatched.shape[0]
+                )
+            sample = unmatched.drop_duplicates().head(5).tolist()
+            self.logger.warning(
+                f"Dropped {unmatched.shape[0]} {table} rows with no matching {name} id (e.g. {sample})."
+            )
+        return df
+
+    def lookup_ids(
+        self, df: pd.DataFrame, name: str, table: str, col: str
+    ) -> pd.DataFrame:
+        """
+        Adds the ID column of a lookup table from a cached ID map, reading the map on first use.
+        Unlike resolve_ids, the key column is kept and no row is dropped: unmatched keys get a null ID.
+        Keys match ignoring case and trailing spaces, like the database's default collation.
+
+        Args:
+            df (pd.DataFrame): The DataFrame holding the key column.
+            name (str): Name of the ID map, a key of id_map_sources.
+            table (str): The name of the table being loaded, used for reporting.
+            col (str): Key column in the DataFrame, e.g. temp_user.
+
+        Returns:
+            pd.DataFrame: The DataFrame with the ID column added.
+        """
+        id_map = self.get_id_map(name)
+        folded = id_map.copy()
+        folded.index = folded.index.astype(str).str.rstrip().str.casefold()
+        folded = folded[~folded.index.duplicated(keep="last")]
+        ids = df[col].astype("string").str.rstrip().str.casefold().map(folded)
+        unmatched = df.loc[df[col].notna() & ids.isna(), col]
+        if not unmatched.empty:
+            sample = unmatched.drop_duplicates().head(5).tolist()
+            self.logger.warning(
+                f"{unmatched.shape[0]} {table} rows have no matching {name} id (e.g. {sample})."
+            )
+        df = df.copy()
+        df[id_map.name] = ids.astype("Int64")
+        return df
+
+    def get_window_start(self, source: str) -> datetime:
+        """
+        Gets the start of the extract window for a source.
+        In incremental mode this is the later of the start date and the source's high-water mark.
+
+        Args:
+            source (str): Name of the source table and timestamp column, e.g. 'Glucose_Readings.Time_Recorded'.
 
-    @staticmethod
-    def snap_dataframe(df: pd.DataFrame, path: Path | str) -> None:
+        Returns:
+            datetime: The start of the extract window.
+        """
+        if not self.incremental:
+            return self.start_date
+        rows = self.gps.execute_query(get_watermark_stmt, {"source_name": source})
+        if rows and rows[0][0] and rows[0][0] > self.start_date:
+            self.logger.debug(f"Resuming {source} from {rows[0][0]}...")
+            return rows[0][0]
+        return self.start_date
+
+    def get_window_starts(self, prefix: str) -> Dict[str, datetime]:
+        """
+        Gets the high-water marks of every source sharing a name prefix, e.g. the per-device Tenovi marks.
+
+        Args:
+            prefix (str): Prefix of the source names, e.g. 'Tenovi.created.'.
+
+        Returns:
+            Dict[str, datetime]: High-water marks keyed by the rest of the source name, empty outside incremental mode.
+        """
+        if not self.incremental:
+            return {}
+        rows = self.gps.execute_query(
+            get_watermarks_like_stmt, {"source_pattern": f"{prefix}%"}
+        )
+        return {source[len(prefix) :]: mark for source, mark in rows or []}
+
+    def track_watermark(
+        self, source: str, values: pd.Series, rejected: pd.Series | None = None
+    ) -> None:
+        """
+        Records the latest timestamp extracted for a source. Marks are only persisted by commit_watermarks().
+        The mark is held at the earliest rejected row, so rows dropped for an unmatched id are extracted again
+        by the next run, once their patient or device has been loaded.
+
+        Args:
+            source (str): Name of the source table and timestamp column.
+            values (pd.Series): Timestamps of the rows that were extracted.
+            rejected (pd.Series): Timestamps of the extracted rows that were not loaded. Defaults to None (optional).
+        """
+        if not self.incremental:
+            return
+        if rejected is not None and not rejected.empty:
+            earliest = rejected.min()
+            if not pd.isnull(earliest):
+                earliest = pd.Timestamp(earliest).to_pydatetime()
+                with self._state_lock:
+                    if (
+                        source not in self.watermark_caps
+                        or earliest < self.watermark_caps[source]
+                    ):
+                        self.watermark_caps[source] = earliest
+        if values.empty:
+            return
+        latest = values.max()
+        if pd.isnull(latest):
+            return
+        latest = pd.Timestamp(latest).to_pydatetime()
+        with self._state_lock:
+            if (
+                source not in self.pending_watermarks
+                or latest > self.pending_watermarks[source]
+            ):
+                self.pending_watermarks[source] = latest
+
+    def track_reading_days(self, values: pd.Series) -> None:
+        """
+        Records the earliest received day loaded, where the reading day rollup has to be rebuilt from.
+
+        Args:
+            values (pd.Series): Received datetimes of the loaded readings.
+        """
+        if values.empty:
+            return
+        earliest = pd.to_datetime(values, errors="coerce").min()
+        if pd.isnull(earliest):
+            return
+        first = earliest.date()
+        with self._state_lock:
+            if self.first_reading_day is None or first < self.first_reading_day:
+                self.first_reading_day = first
+
+    def refresh_reading_days(self) -> None:
+        """
+        Rebuilds the patient_reading_day rollup the billing and queue procedures count reading days from.
+        A full import rebuilds every day, an incremental one only the days from the earliest reading loaded.
+        """
+        if self.incremental and self.first_reading_day is None:
+            return
+        since = self.first_reading_day if self.incremental else None
+        with self.metrics.stage("proc.refresh_patient_reading_day"):
+            self.gps.execute_query(
+                "EXEC refresh_patient_reading_day :since", {"since": since}
+            )
+        self.first_reading_day = None
+
+    def commit_watermarks(self) -> None:
         """
-        Saves a DataFrame to an Excel file.
+        Persists the tracked high-water marks once every load of the run has finished.
+        A mark past the earliest rejected row of its source is held back to that row.
+        """
+        for source, high_water_mark in self.pending_watermarks.items():
+            if source in self.watermark_caps:
+                high_water_mark = min(high_water_mark, self.watermark_caps[source])
+            self.gps.execute_query(
+                set_watermark_stmt,
+                {"source_name": source, "high_water_mark": high_water_mark},
+            )
+        self.pending_watermarks.clear()
+        self.watermark_caps.clear()
+
+    def finish_loads(self) -> None:
+        """
+        Rebuilds the reading day rollup, then persists the high-water marks.
+        The marks only move once the rollup has been rebuilt, so a failed refresh extracts the same readings
+        again on the next run and their days are not lost.
+        """
+        self.refresh_reading_days()
+        self.commit_watermarks()
+
+    def load_table(
+        self, df: pd.DataFrame, table: str, keys: List[str], bulk: bool = False
+    ) -> None:
+        """
+        Loads a DataFrame into a table. Incremental imports merge on the natural key, full imports append.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to load.
+            table (str): The name of the target SQL table.
+            keys (List[str]): Columns forming the natural key of the table.
+            bulk (bool): Whether full imports use the staging table bulk load. Defaults to False (optional).
+        """
+        with self.metrics.stage(f"load.{table}", df) as stage:
+            if self.incremental:
+                rows = self.gps.merge(df, table, keys)
+            elif bulk:
+                rows = self.gps.bulk_insert(df, table)
+            else:
+                self.gps.to_sql(df, table, if_exists="append")
+                rows = df.shape[0]
+            stage.output(None, rows=rows)
+
+    def snap_dataframe(self, df: pd.DataFrame, name: str) -> None:
+        """
+        Queues a DataFrame snapshot for the background snapshot writer, starting it on first use.
 
         Args:
             df (pd.DataFrame): The DataFrame to save.
-            path (Path, str): The path to save the Excel file.
+            name (str): File name of the snapshot in the snapshots directory, without extension.
         """
-        write_structured_file(df, path, file_type="xlsx", index=False)
+        with self._snap_lock:
+            if self.snapshots is None:
+                self.snapshots = SnapshotWriter(
+                    self.snaps_dir, fmt=self.snap_format, logger=self.logger
+                )
+        self.snapshots.submit(df, name)
 
     def get_user_data(self, snap: bool = False) -> pd.DataFrame:
         """
@@ -99,15 +466,14 @@ class DataImporter:
             client_secret=os.environ["AZURE_CLIENT_SECRET"],
             logger=self.logger,
         )
-        msg.request_access_token()
-        data = msg.get_group_members("4bbe3379-1250-4522-92e6-017f77517470")
-        assert isinstance(data, dict), (
-            "Expected a JSON object from the members endpoint"
-        )
-        df = pd.DataFrame(data["value"])
-        df = normalize_users(df)
+        with self.metrics.stage("extract.user") as stage:
+            msg.request_access_token()
+            members = msg.iter_group_members("4bbe3379-1250-4522-92e6-017f77517470")
+            df = stage.output(pd.DataFrame(list(members), columns=user_select_fields))
+        with self.metrics.stage("normalize.user", df) as stage:
+            df = stage.output(normalize_users(df))
         if snap:
-            self.snap_dataframe(df, self.snaps_dir / "snap_user_df.xlsx")
+            self.snap_dataframe(df, "snap_user_df")
         return df
 
     def get_patient_data(
@@ -123,27 +489,43 @@ class DataImporter:
         Returns:
             Dict[str, pd.DataFrame]: A dictionary of normalized patient data DataFrames.
         """
-        df = pd.read_csv(
-            filename,
-            dtype={"Phone Number": "str", "Social Security": "str", "Zip code": "str"},
-            parse_dates=["DOB", "On-board Date"],
-        )
+        with self.metrics.stage("extract.patient") as stage:
+            df = pd.read_csv(
+                filename,
+                dtype={
+                    "Phone Number": "str",
+                    "Social Security": "str",
+                    "Zip code": "str",
+                },
+                parse_dates=["DOB", "On-board Date"],
+            )
+            stage.output(df)
         self.logger.debug(
             f"Reading patient export from SharePoint (rows: {df.shape[0]}, cols: {df.shape[1]})"
         )
-        df = normalize_patients(df)
-        df = check_patient_db_constraints(df)
-        res = {
-            "patient": create_patient_df(df),
-            "address": create_patient_address_df(df),
-            "insurance": create_patient_insurance_df(df),
-            "med_nec": create_med_necessity_df(df),
-            "status": create_patient_status_df(df),
-            "emcontacts": create_emcontacts_df(df),
-        }
+        with self.metrics.stage("normalize.patient", df) as stage:
+            df = normalize_patients(df)
+            df, failed_df = split_patient_db_constraints(df)
+            stage.output(df)
+        if not failed_df.empty:
+            self.logger.warning(
+                f"Dropped {failed_df.shape[0]} patients failing database constraints: "
+                f"{failed_df['error_type'].value_counts().to_dict()}"
+            )
+        with self.metrics.stage("transform.patient", df) as stage:
+            res = {
+                "patient": create_patient_df(df),
+                "address": create_patient_address_df(df),
+                "insurance": create_patient_insurance_df(df),
+                "med_nec": create_med_necessity_df(df),
+                "status": create_patient_status_df(df),
+                "emcontacts": create_emcontacts_df(df),
+            }
+            stage.output(res)
         if snap:
             for name, df in res.items():
-                self.snap_dataframe(df, self.snaps_dir / f"snap_{name}_df.xlsx")
+                self.snap_dataframe(df, f"snap_{name}_df")
+            self.snap_dataframe(failed_df, "snap_failed_patient_df")
         return res
 
     def get_patient_note_data(self, snap: bool = False) -> pd.DataFrame:
@@ -170,27 +552,38 @@ class DataImporter:
             host=os.environ["LCH_SQL_HOST"],
             database=os.environ["LCH_SQL_SP_TIME"],
         )
-        notes_df = notes_db.read_sql(
-            get_notes_log_stmt,
-            params=(self.start_date, self.end_date),
-            parse_dates=["TimeStamp"],
-        )
-        time_df = time_db.read_sql(
-            get_time_log_stmt,
-            params=(self.start_date, self.end_date),
-            parse_dates=["Start_Time", "End_Time"],
-        )
-        time_df = time_df.rename(
-            columns={"SharPoint_ID": "SharePoint_ID", "Notes": "Note_Type"}
+        # Notes and call times are joined, so both sources share the earlier window.
+        window_start = min(
+            self.get_window_start("Medical_Notes.TimeStamp"),
+            self.get_window_start("Time_Log.End_Time"),
         )
-        df = pd.merge(
-            notes_df, time_df, on=["SharePoint_ID", "Note_ID", "LCH_UPN"], how="left"
-        )
-        df["Time_Note"] = df["Time_Note"].fillna(df["Note_Type"])
-        df.drop(columns=["Note_ID", "Note_Type"], inplace=True)
-        df = normalize_patient_notes(df)
+        with self.metrics.stage("extract.notes") as stage:
+            notes_df = notes_db.read_sql(
+                get_notes_log_stmt,
+                params=(window_start, self.end_date),
+                parse_dates=["TimeStamp"],
+            )
+            time_df = time_db.read_sql(
+                get_time_log_stmt,
+                params=(window_start, self.end_date),
+                parse_dates=["Start_Time", "End_Time"],
+            )
+            time_df = time_df.rename(
+                columns={"SharPoint_ID": "SharePoint_ID", "Notes": "Note_Type"}
+            )
+            df = pd.merge(
+                notes_df,
+                time_df,
+                on=["SharePoint_ID", "Note_ID", "LCH_UPN"],
+                how="left",
+            )
+            df["Time_Note"] = df["Time_Note"].fillna(df["Note_Type"])
+            df.drop(columns=["Note_ID", "Note_Type"], inplace=True)
+            stage.output(df)
+        with self.metrics.stage("normalize.notes", df) as stage:
+            df = stage.output(normalize_patient_notes(df))
         if snap:
-            self.snap_dataframe(df, self.snaps_dir / "snap_note_df.xlsx")
+            self.snap_dataframe(df, "snap_note_df")
         time_db.close()
         notes_db.close()
         return df
@@ -212,10 +605,13 @@ class DataImporter:
             host=os.environ["LCH_SQL_HOST"],
             database=os.environ["LCH_SQL_SP_FULFILLMENT"],
         )
-        df = fulfillment_db.read_sql(get_fulfillment_stmt)
-        df = normalize_devices(df)
+        with self.metrics.stage("extract.device") as stage:
+            df = stage.output(fulfillment_db.read_sql(get_fulfillment_stmt))
+        fulfillment_db.close()
+        with self.metrics.stage("normalize.device", df) as stage:
+            df = stage.output(normalize_devices(df))
         if snap:
-            self.snap_dataframe(df, self.snaps_dir / "snap_device_df.xlsx")
+            self.snap_dataframe(df, "snap_device_df")
         return df
 
     def get_gluc_readings(self, snap: bool = False) -> pd.DataFrame:
@@ -235,14 +631,21 @@ class DataImporter:
             host=os.environ["LCH_SQL_HOST"],
             database=os.environ["LCH_SQL_SP_READINGS"],
         )
-        df = readings_db.read_sql(
-            get_bg_readings_stmt,
-            params=(self.start_date, self.end_date),
-            parse_dates=["Time_Recorded", "Time_Recieved"],
-        )
+        with self.metrics.stage("extract.gluc_readings") as stage:
+            df = readings_db.read_sql(
+                get_bg_readings_stmt,
+                params=(
+                    self.get_window_start("Glucose_Readings.Time_Recorded"),
+                    self.end_date,
+                ),
+                parse_dates=["Time_Recorded", "Time_Recieved"],
+            )
+            stage.output(df)
+        readings_db.close()
         if snap:
-            self.snap_dataframe(df, self.snaps_dir / "snap_glucose_df.xlsx")
-        df = normalize_bg_readings(df)
+            self.snap_dataframe(df, "snap_glucose_df")
+        with self.metrics.stage("normalize.gluc_readings", df) as stage:
+            df = stage.output(self.drop_harvested_readings(normalize_bg_readings(df)))
         return df
 
     def get_bp_readings(self, snap: bool = False) -> pd.DataFrame:
@@ -262,16 +665,119 @@ class DataImporter:
             host=os.environ["LCH_SQL_HOST"],
             database=os.environ["LCH_SQL_SP_READINGS"],
         )
-        df = readings_db.read_sql(
-            get_bp_readings_stmt,
-            params=(self.start_date, self.end_date),
-            parse_dates=["Time_Recorded", "Time_Recieved"],
-        )
+        with self.metrics.stage("extract.bp_readings") as stage:
+            df = readings_db.read_sql(
+                get_bp_readings_stmt,
+                params=(
+                    self.get_window_start("Blood_Pressure_Readings.Time_Recorded"),
+                    self.end_date,
+                ),
+                parse_dates=["Time_Recorded", "Time_Recieved"],
+            )
+            stage.output(df)
+        readings_db.close()
         if snap:
-            self.snap_dataframe(df, self.snaps_dir / "snap_blood_pressure_df.xlsx")
-        df = normalize_bp_readings(df)
+            self.snap_dataframe(df, "snap_blood_pressure_df")
+        with self.metrics.stage("normalize.bp_readings", df) as stage:
+            df = stage.output(self.drop_harvested_readings(normalize_bp_readings(df)))
         return df
 
+    def iter_gluc_readings(self, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+        """
+        Streams and normalizes glucose readings from the database chunk by chunk.
+
+        Args:
+            chunksize (int): Maximum number of readings per chunk. Defaults to 50,000 (optional).
+
+        Yields:
+            pd.DataFrame: The next chunk of normalized glucose readings.
+        """
+        readings_db = DatabaseManager(logger=self.logger)
+        readings_db.create_engine(
+            username=os.environ["LCH_SQL_USERNAME"],
+            password=os.environ["LCH_SQL_PASSWORD"],
+            host=os.environ["LCH_SQL_HOST"],
+            database=os.environ["LCH_SQL_SP_READINGS"],
+        )
+        try:
+            chunks = readings_db.read_sql_chunks(
+                get_bg_readings_stmt,
+                params=(
+                    self.get_window_start("Glucose_Readings.Time_Recorded"),
+                    self.end_date,
+                ),
+                parse_dates=["Time_Recorded", "Time_Recieved"],
+                chunksize=chunksize,
+            )
+            while True:
+                # Each fetch and normalize is timed on its own, so the load of the chunk is not counted.
+                with self.metrics.stage("extract.gluc_readings") as stage:
+                    df = stage.output(next(chunks, None))
+                if df is None:
+                    break
+                with self.metrics.stage("normalize.gluc_readings", df) as stage:
+                    df = stage.output(
+                        self.drop_harvested_readings(normalize_bg_readings(df))
+                    )
+                yield df
+        finally:
+            readings_db.close()
+
+    def iter_bp_readings(self, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+        """
+        Streams and normalizes blood pressure readings from the database chunk by chunk.
+
+        Args:
+            chunksize (int): Maximum number of readings per chunk. Defaults to 50,000 (optional).
+
+        Yields:
+            pd.DataFrame: The next chunk of normalized blood pressure readings.
+        """
+        readings_db = DatabaseManager(logger=self.logger)
+        readings_db.create_engine(
+            username=os.environ["LCH_SQL_USERNAME"],
+            password=os.environ["LCH_SQL_PASSWORD"],
+            host=os.environ["LCH_SQL_HOST"],
+            database=os.environ["LCH_SQL_SP_READINGS"],
+        )
+        try:
+            chunks = readings_db.read_sql_chunks(
+                get_bp_readings_stmt,
+                params=(
+                    self.get_window_start("Blood_Pressure_Readings.Time_Recorded"),
+                    self.end_date,
+                ),
+                parse_dates=["Time_Recorded", "Time_Recieved"],
+                chunksize=chunksize,
+            )
+            while True:
+                # Each fetch and normalize is timed on its own, so the load of the chunk is not counted.
+                with self.metrics.stage("extract.bp_readings") as stage:
+                    df = stage.output(next(chunks, None))
+                if df is None:
+                    break
+                with self.metrics.stage("normalize.bp_readings", df) as stage:
+                    df = stage.output(
+                        self.drop_harvested_readings(normalize_bp_readings(df))
+                    )
+                yield df
+        finally:
+            readings_db.close()
+
+    def drop_harvested_readings(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drops the SharePoint readings of Tenovi devices when they are harvested from the Tenovi API instead.
+
+        Args:
+            df (pd.DataFrame): The normalized SharePoint readings.
+
+        Returns:
+            pd.DataFrame: The readings that are not harvested from the Tenovi API.
+        """
+        if not self.tenovi:
+            return df
+        return drop_vendor_readings(df, "Tenovi")
+
     def import_user_data(self, df: pd.DataFrame) -> None:
         """
         Imports user data into the database.
@@ -279,7 +785,8 @@ class DataImporter:
         Args:
             df (pd.DataFrame): The user data DataFrame to import.
         """
-        self.gps.to_sql(df, "user", if_exists="append")
+        self.load_table(df, "user", keys=["ms_entra_id"])
+        self.refresh_id_map("user")
 
     def import_patient_data(self, patient_data: Dict[str, pd.DataFrame]) -> None:
         """
@@ -288,30 +795,45 @@ class DataImporter:
         Args:
             patient_data (Dict[str, pd.DataFrame]): A dictionary of patient data DataFrames to import.
         """
-        self.gps.to_sql(patient_data["patient"], "patient", if_exists="append")
-        patient_id_df = self.gps.read_sql(get_patient_id_stmt)
+        patient_df = self.lookup_ids(
+            patient_data["patient"], "user", "patient", "temp_user"
+        )
+        self.load_table(patient_df, "patient", keys=["sharepoint_id"])
+        self.refresh_id_map("patient")
 
-        address_df = add_id_col(
-            df=patient_data["address"], id_df=patient_id_df, col="sharepoint_id"
+        address_df = self.resolve_ids(
+            patient_data["address"], "patient", "patient_address"
+        )
+        insurance_df = self.resolve_ids(
+            patient_data["insurance"], "patient", "patient_insurance"
         )
-        insurance_df = add_id_col(
-            df=patient_data["insurance"], id_df=patient_id_df, col="sharepoint_id"
+        med_nec_df = self.resolve_ids(
+            patient_data["med_nec"], "patient", "medical_necessity"
         )
-        med_nec_df = add_id_col(
-            df=patient_data["med_nec"], id_df=patient_id_df, col="sharepoint_id"
+        patient_status_df = self.resolve_ids(
+            patient_data["status"], "patient", "patient_status"
         )
-        patient_status_df = add_id_col(
-            df=patient_data["status"], id_df=patient_id_df, col="sharepoint_id"
+        patient_status_df = self.lookup_ids(
+            patient_status_df,
+            "patient_status_type",
+            "patient_status",
+            "temp_status_type",
         )
-        emcontacts_df = add_id_col(
-            df=patient_data["emcontacts"], id_df=patient_id_df, col="sharepoint_id"
+        emcontacts_df = self.resolve_ids(
+            patient_data["emcontacts"], "patient", "emergency_contact"
         )
 
-        self.gps.to_sql(address_df, "patient_address", if_exists="append")
-        self.gps.to_sql(insurance_df, "patient_insurance", if_exists="append")
-        self.gps.to_sql(med_nec_df, "medical_necessity", if_exists="append")
-        self.gps.to_sql(patient_status_df, "patient_status", if_exists="append")
-        self.gps.to_sql(emcontacts_df, "emergency_contact", if_exists="append")
+        self.load_table(address_df, "patient_address", keys=["patient_id"])
+        self.load_table(insurance_df, "patient_insurance", keys=["patient_id"])
+        self.load_table(
+            med_nec_df, "medical_necessity", keys=["patient_id", "temp_dx_code"]
+        )
+        self.load_table(
+            patient_status_df, "patient_status", keys=["patient_id", "temp_status_type"]
+        )
+        self.load_table(
+            emcontacts_df, "emergency_contact", keys=["patient_id", "full_name"]
+        )
 
     def import_patient_note_data(self, df: pd.DataFrame) -> None:
         """
@@ -320,9 +842,24 @@ class DataImporter:
         Args:
             df (pd.DataFrame): The patient note data DataFrame to import.
         """
-        patient_id_df = self.gps.read_sql(get_patient_id_stmt)
-        df = add_id_col(df, id_df=patient_id_df, col="sharepoint_id")
-        self.gps.to_sql(df, "patient_note", if_exists="append")
+        extracted = df
+        df = self.resolve_ids(df, "patient", "patient_note")
+        df = self.lookup_ids(df, "note_type", "patient_note", "temp_note_type")
+        df = self.lookup_ids(df, "user", "patient_note", "temp_user")
+        self.load_table(
+            df, "patient_note", keys=["patient_id", "note_datetime", "temp_user"]
+        )
+        rejected = extracted.drop(index=df.index)
+        self.track_watermark(
+            "Medical_Notes.TimeStamp",
+            extracted["note_datetime"],
+            rejected["note_datetime"],
+        )
+        self.track_watermark(
+            "Time_Log.End_Time",
+            extracted["end_call_datetime"],
+            rejected["end_call_datetime"],
+        )
 
     def import_device_data(self, df: pd.DataFrame) -> None:
         """
@@ -331,48 +868,255 @@ class DataImporter:
         Args:
             df (pd.DataFrame): The device data DataFrame to import.
         """
-        patient_id_df = self.gps.read_sql(get_patient_id_stmt)
-        vendor_id_df = self.gps.read_sql(get_vendor_id_stmt)
-        df = add_id_col(df=df, id_df=patient_id_df, col="sharepoint_id")
-        vendor_id_df = vendor_id_df.rename(columns={"name": "Vendor"})
-        df = add_id_col(df=df, id_df=vendor_id_df, col="Vendor")
-        self.gps.to_sql(df, "device", if_exists="append")
+        df = self.resolve_ids(df, "patient", "device")
+        df = self.resolve_ids(df, "vendor", "device", col="Vendor")
+        self.load_table(df, "device", keys=["hardware_uuid"])
+        self.refresh_id_map("device")
+
+    def load_readings(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        reading_kind: str,
+        source: str | None = None,
+    ) -> pd.Index:
+        """
+        Resolves the patient and device of readings and loads them into their table.
+
+        Args:
+            df (pd.DataFrame): The normalized readings DataFrame to import.
+            table (str): The readings table to load into.
+            reading_kind (str): The kind of device the readings were taken with, 'bg' or 'bp'.
+            source (str): Watermark source the loaded readings advance, or None for readings tracked elsewhere.
+                Defaults to None (optional).
+
+        Returns:
+            pd.Index: The index of the readings that were loaded.
+        """
+        extracted = df
+        df = self.resolve_ids(df, "patient", table)
+        df = self.resolve_ids(df.assign(reading_kind=reading_kind), "device", table)
+        self.load_table(df, table, keys=["device_id", "recorded_datetime"], bulk=True)
+        self.track_reading_days(df["received_datetime"])
+        if source:
+            self.track_watermark(
+                source,
+                extracted["recorded_datetime"],
+                extracted["recorded_datetime"].drop(index=df.index),
+            )
+        return df.index
 
-    def import_gluc_readings_data(self, df: pd.DataFrame) -> None:
+    def import_gluc_readings_data(
+        self,
+        df: pd.DataFrame,
+        source: str | None = "Glucose_Readings.Time_Recorded",
+    ) -> None:
         """
         Imports glucose readings data into the database.
 
         Args:
             df (pd.DataFrame): The glucose readings data DataFrame to import.
+            source (str): Watermark source the loaded readings advance, or None for readings tracked elsewhere.
+                Defaults to 'Glucose_Readings.Time_Recorded' (optional).
         """
-        patient_id_df = self.gps.read_sql(get_patient_id_stmt)
-        device_id_df = self.gps.read_sql(get_device_id_stmt)
-        df = add_id_col(df=df, id_df=patient_id_df, col="sharepoint_id")
-        df = add_id_col(df=df, id_df=device_id_df, col="patient_id")
-        self.gps.to_sql(df, "glucose_reading", if_exists="append")
+        self.load_readings(df, "glucose_reading", "bg", source=source)
 
-    def import_bp_readings_data(self, df: pd.DataFrame) -> None:
+    def import_bp_readings_data(
+        self,
+        df: pd.DataFrame,
+        source: str | None = "Blood_Pressure_Readings.Time_Recorded",
+    ) -> None:
         """
         Imports blood pressure readings data into the database.
 
         Args:
             df (pd.DataFrame): The blood pressure readings data DataFrame to import.
+            source (str): Watermark source the loaded readings advance, or None for readings tracked elsewhere.
+                Defaults to 'Blood_Pressure_Readings.Time_Recorded' (optional).
+        """
+        self.load_readings(df, "blood_pressure_reading", "bp", source=source)
+
+    # Prefix of the per-device Tenovi watermarks, followed by the hwi_device_id.
+    tenovi_watermark_prefix = "Tenovi.created."
+
+    def import_tenovi_readings(
+        self,
+        max_workers: int = 8,
+        requests_per_second: float = 5.0,
+        batch_size: int = 5_000,
+    ) -> None:
+        """
+        Harvests readings from the Tenovi API for every device and loads them as they arrive.
+        In incremental mode each device resumes from the latest created time loaded for it, otherwise from the start date.
+        Every device stops at the end date.
+
+        Args:
+            max_workers (int): Maximum number of Tenovi requests in flight. Defaults to 8 (optional).
+            requests_per_second (float): Maximum Tenovi requests started per second. Defaults to 5.0 (optional).
+            batch_size (int): Minimum number of readings normalized and loaded at once. Defaults to 5,000 (optional).
         """
-        patient_id_df = self.gps.read_sql(get_patient_id_stmt)
-        device_id_df = self.gps.read_sql(get_device_id_stmt)
-        df = add_id_col(df=df, id_df=patient_id_df, col="sharepoint_id")
-        df = add_id_col(df=df, id_df=device_id_df, col="patient_id")
-        self.gps.to_sql(df, "blood_pressure_reading", if_exists="append")
+        api = TenoviApi(
+            client_domain=os.environ["TENOVI_CLIENT_DOMAIN"],
+            api_key=os.environ["TENOVI_API_KEY"],
+            logger=self.logger,
+        )
+        harvester = TenoviHarvester(
+            api,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            logger=self.logger,
+        )
+        batches = harvester.iter_readings(
+            self.get_window_starts(self.tenovi_watermark_prefix),
+            default_start=self.start_date,
+            batch_size=batch_size,
+            end=self.end_date,
+        )
+        while True:
+            # Each fetch and normalize is timed on its own, so the load of the batch is not counted.
+            with self.metrics.stage("extract.tenovi_readings") as stage:
+                df = stage.output(next(batches, None))
+            if df is None:
+                break
+            with self.metrics.stage("normalize.tenovi_readings", df) as stage:
+                readings = split_tenovi_readings(df)
+                readings["glucose"] = normalize_bg_readings(readings["glucose"])
+                readings["blood_pressure"] = normalize_bp_readings(
+                    readings["blood_pressure"]
+                )
+                stage.output(readings)
+            loaded = pd.Index([])
+            if not readings["glucose"].empty:
+                loaded = loaded.union(
+                    self.load_readings(readings["glucose"], "glucose_reading", "bg")
+                )
+            if not readings["blood_pressure"].empty:
+                loaded = loaded.union(
+                    self.load_readings(
+                        readings["blood_pressure"], "blood_pressure_reading", "bp"
+                    )
+                )
+            rejected = (
+                readings["glucose"].index.union(readings["blood_pressure"].index)
+            ).difference(loaded)
+            # Marks advance on Tenovi's created time, which is what the next run filters on.
+            # Only loaded readings advance them, and a reading dropped for an unmatched id holds its device's mark.
+            created = pd.to_datetime(df["created"], utc=True).dt.tz_localize(None)
+            for device_id, values in created.groupby(df["hwi_device_id"]):
+                self.track_watermark(
+                    f"{self.tenovi_watermark_prefix}{device_id}",
+                    values[values.index.isin(loaded)],
+                    values[values.index.isin(rejected)],
+                )
 
     def close_db(self) -> None:
         """
-        Closes the database connection.
+        Waits for queued snapshots to be written and closes the database connection.
         """
+        if self.snapshots:
+            self.snapshots.close()
+            self.snapshots = None
         if self.gps:
             self.gps.close()
 
 
-def import_all_data(start_date, end_date, snap=False, logger=logging.getLogger()):
+def build_import_pipeline(
+    dim: DataImporter,
+    patient_path: Path | str,
+    snap: bool = False,
+    chunksize: int | None = None,
+    max_workers: int = 4,
+) -> Pipeline:
+    """
+    Builds the import pipeline for a DataImporter.
+    Extracts from independent sources run concurrently; loads run in foreign-key order:
+    user, patient, device, readings, then notes.
+
+    Args:
+        dim (DataImporter): The importer whose extract and import methods make up the stages.
+        patient_path (Path, str): Path to the SharePoint patient export.
+        snap (bool): Whether to save a snapshot of each DataFrame. Defaults to False (optional).
+        chunksize (int): Stream readings in chunks of this many rows. Defaults to None (optional).
+        max_workers (int): Maximum number of stages running at once. Defaults to 4 (optional).
+
+    Returns:
+        Pipeline: The pipeline, ready to run.
+    """
+    pipeline = Pipeline(max_workers=max_workers, logger=dim.logger)
+    pipeline.add_stage("extract_user", lambda: dim.get_user_data(snap=snap))
+    pipeline.add_stage(
+        "extract_patient", lambda: dim.get_patient_data(patient_path, snap=snap)
+    )
+    pipeline.add_stage("extract_device", lambda: dim.get_device_data(snap=snap))
+    pipeline.add_stage("extract_notes", lambda: dim.get_patient_note_data(snap=snap))
+
+    pipeline.add_stage("load_user", dim.import_user_data, ["extract_user"])
+    pipeline.add_stage(
+        "load_patient",
+        lambda patient_data, _: dim.import_patient_data(patient_data),
+        ["extract_patient", "load_user"],
+    )
+    pipeline.add_stage(
+        "load_device",
+        lambda device_df, _: dim.import_device_data(device_df),
+        ["extract_device", "load_patient"],
+    )
+    if chunksize:
+        # Streamed readings are extracted while they load, so each stream waits on its devices.
+        def stream_gluc(_):
+            for gluc_df in dim.iter_gluc_readings(chunksize=chunksize):
+                dim.import_gluc_readings_data(gluc_df)
+
+        def stream_bp(_):
+            for bp_df in dim.iter_bp_readings(chunksize=chunksize):
+                dim.import_bp_readings_data(bp_df)
+
+        pipeline.add_stage("load_gluc_readings", stream_gluc, ["load_device"])
+        pipeline.add_stage("load_bp_readings", stream_bp, ["load_device"])
+    else:
+        pipeline.add_stage(
+            "extract_gluc_readings", lambda: dim.get_gluc_readings(snap=snap)
+        )
+        pipeline.add_stage(
+            "extract_bp_readings", lambda: dim.get_bp_readings(snap=snap)
+        )
+        pipeline.add_stage(
+            "load_gluc_readings",
+            lambda gluc_df, _: dim.import_gluc_readings_data(gluc_df),
+            ["extract_gluc_readings", "load_device"],
+        )
+        pipeline.add_stage(
+            "load_bp_readings",
+            lambda bp_df, _: dim.import_bp_readings_data(bp_df),
+            ["extract_bp_readings", "load_device"],
+        )
+    # Tenovi readings are harvested after the SharePoint readings, when the importer is set up for them.
+    if dim.tenovi:
+        pipeline.add_stage(
+            "load_tenovi_readings",
+            lambda *_: dim.import_tenovi_readings(),
+            ["load_gluc_readings", "load_bp_readings"],
+        )
+    pipeline.add_stage(
+        "load_notes",
+        lambda note_df, *_: dim.import_patient_note_data(note_df),
+        ["extract_notes", "load_gluc_readings", "load_bp_readings"],
+    )
+    return pipeline
+
+
+def import_all_data(
+    start_date,
+    end_date,
+    snap=False,
+    chunksize=None,
+    incremental=False,
+    max_workers=4,
+    snap_format="parquet",
+    metrics=None,
+    tenovi=False,
+    logger=logging.getLogger(),
+):
     """
     Imports all data within the specified date range.
 
@@ -380,8 +1124,17 @@ def import_all_data(start_date, end_date, snap=False, logger=logging.getLogger()
         start_date (str, datetime): The start date for data import.
         end_date (str, datetime): The end date for data import.
         snap (bool): Whether to save a snapshot of the DataFrame. Defaults to False (optional).
+        chunksize (int): Stream readings in chunks of this many rows instead of loading them all at once.
+            Reading snapshots are skipped when streaming. Defaults to None (optional).
+        incremental (bool): Merge only rows past each source's high-water mark instead of resetting
+            and reloading every table. Defaults to False (optional).
+        max_workers (int): Maximum number of extract and load stages running at once. Defaults to 4 (optional).
+        snap_format (str): Snapshot file format: 'parquet', 'feather', 'csv' or 'xlsx'. Defaults to 'parquet' (optional).
+        metrics (RunMetrics): Run metrics each stage is recorded in. Defaults to a new RunMetrics (optional).
+        tenovi (bool): Whether to also harvest readings from the Tenovi API. Defaults to False (optional).
         logger (logging.Logger): Logger instance for logging. Defaults to logging.getLogger() (optional).
     """
+    metrics = metrics or RunMetrics("import", logger=logger)
     gps = DatabaseManager(logger=logger)
     gps.create_engine(
         username=os.environ["LCH_SQL_GPS_USERNAME"],
@@ -389,7 +1142,9 @@ def import_all_data(start_date, end_date, snap=False, logger=logging.getLogger()
         host=os.environ["LCH_SQL_GPS_HOST"],
         database=os.environ["LCH_SQL_GPS_DB"],
     )
-    gps.execute_query("EXEC reset_all_billing_tables")
+    if not incremental:
+        with metrics.stage("proc.reset_all_billing_tables"):
+            gps.execute_query("EXEC reset_all_billing_tables")
 
     data_dir = Path.cwd() / "data"
     snaps_dir = data_dir / "snaps"
@@ -397,35 +1152,95 @@ def import_all_data(start_date, end_date, snap=False, logger=logging.getLogger()
     if get_files_in_dir(snaps_dir):
         delete_files_in_dir(snaps_dir)
 
-    dim = DataImporter(start_date, end_date, logger=logger)
-    user_df = dim.get_user_data(snap=snap)
-    dim.import_user_data(user_df)
-    patient_data = dim.get_patient_data(data_dir / "Patient_Export.csv", snap=snap)
-    dim.import_patient_data(patient_data)
-    device_df = dim.get_device_data(snap=snap)
-    dim.import_device_data(device_df)
-    gluc_df = dim.get_gluc_readings(snap=snap)
-    dim.import_gluc_readings_data(gluc_df)
-    bp_df = dim.get_bp_readings(snap=snap)
-    dim.import_bp_readings_data(bp_df)
-    dim.close_db()
-
-    gps.execute_query(update_patient_note_stmt)
-    gps.execute_query(update_patient_status_stmt)
-    gps.execute_query(update_user_stmt)
-    gps.execute_query(update_user_note_stmt)
+    dim = DataImporter(
+        start_date,
+        end_date,
+        incremental=incremental,
+        snap_format=snap_format,
+        metrics=metrics,
+        tenovi=tenovi,
+        logger=logger,
+    )
+    pipeline = build_import_pipeline(
+        dim,
+        data_dir / "Patient_Export.csv",
+        snap=snap,
+        chunksize=chunksize,
+        max_workers=max_workers,
+    )
+    try:
+        pipeline.run()
+        dim.finish_loads()
+        if dim.unmatched_keys:
+            logger.warning(f"Rows dropped for unmatched ids: {dim.unmatched_keys}")
+    finally:
+        dim.close_db()
+
+    with metrics.stage("proc.update_billing_statistics"):
+        gps.execute_query("EXEC update_billing_statistics")
     gps.close()
 
 
-def create_billing_report(start_date, end_date, logger=logging.getLogger()):
+def cross_check_medical_codes(
+    gps: DatabaseManager, today_date: datetime, logger=logging.getLogger()
+) -> pd.DataFrame:
+    """
+    Compares the medical codes the stored procedures applied with the codes the in-memory billing engine computes
+    from the same notes and readings. Any difference is logged and saved to data/medical_code_mismatches.csv.
+
+    Args:
+        gps (DatabaseManager): Connection to the database the procedures ran in.
+        today_date (datetime): The billing date the procedures were given.
+        logger (logging.Logger): Logger instance for logging. Defaults to logging.getLogger() (optional).
+
+    Returns:
+        pd.DataFrame: The codes whose counts differ, empty when they match.
+    """
+    notes = gps.read_sql(get_billing_notes_stmt, parse_dates=["note_datetime"])
+    gluc_readings = gps.read_sql(
+        get_billing_bg_readings_stmt, parse_dates=["received_datetime"]
+    )
+    bp_readings = gps.read_sql(
+        get_billing_bp_readings_stmt, parse_dates=["received_datetime"]
+    )
+    devices = gps.read_sql(get_device_id_stmt)
+    expected, _ = compute_medical_codes(
+        notes, gluc_readings, bp_readings, today_date, devices=devices
+    )
+    actual = gps.read_sql(get_medical_codes_stmt, parse_dates=["timestamp_applied"])
+    mismatches = compare_medical_codes(expected, actual)
+    if mismatches.empty:
+        logger.info(
+            f"Billing engine matches the {actual.shape[0]} medical codes applied."
+        )
+    else:
+        mismatch_path = Path.cwd() / "data" / "medical_code_mismatches.csv"
+        mismatches.to_csv(mismatch_path, index=False)
+        logger.warning(
+            f"Billing engine and stored procedures disagree on {mismatches.shape[0]} codes, see {mismatch_path}."
+        )
+    return mismatches
+
+
+def create_billing_report(
+    start_date,
+    end_date,
+    cross_check=False,
+    metrics=None,
+    logger=logging.getLogger(),
+):
     """
     Creates a billing report for the specified date range.
 
     Args:
         start_date (str, datetime): The start date for the billing report.
         end_date (str, datetime): The end date for the billing report.
+        cross_check (bool): Whether to compare the applied medical codes with the in-memory billing engine.
+            Defaults to False (optional).
+        metrics (RunMetrics): Run metrics each stored procedure is recorded in. Defaults to a new RunMetrics (optional).
         logger (logging.Logger): Logger instance for logging. Defaults to logging.getLogger() (optional).
     """
+    metrics = metrics or RunMetrics("billing_report", logger=logger)
     if isinstance(start_date, str):
         start_date = datetime.strptime(start_date, "%Y-%m-%d")
     if isinstance(end_date, str):
@@ -439,32 +1254,90 @@ def create_billing_report(start_date, end_date, logger=logging.getLogger()):
     )
     medcode_params = {"today_date": end_date}
 
-    gps.execute_query("EXEC reset_medical_code_tables")
-    gps.execute_query("EXEC batch_medcode_99202")
-    gps.execute_query("EXEC batch_medcode_99453_bg")
-    gps.execute_query("EXEC batch_medcode_99453_bp")
-    gps.execute_query("EXEC batch_medcode_99454_bg :today_date", medcode_params)
-    gps.execute_query("EXEC batch_medcode_99454_bp :today_date", medcode_params)
-    gps.execute_query("EXEC batch_medcode_99457 :today_date", medcode_params)
-    gps.execute_query("EXEC batch_medcode_99458 :today_date", medcode_params)
-
-    df = gps.read_sql(
-        "EXEC create_billing_report @start_date = ?, @end_date = ?",
-        params=(start_date, end_date),
-    )
-    write_structured_file(
-        df, Path.cwd() / "data" / "LCH_Billing_Report.xlsx", index=False
-    )
+    procs = [
+        ("reset_medical_code_tables", "EXEC reset_medical_code_tables", None),
+        ("batch_medcode_99202", "EXEC batch_medcode_99202", None),
+        ("batch_medcode_99453_bg", "EXEC batch_medcode_99453_bg", None),
+        ("batch_medcode_99453_bp", "EXEC batch_medcode_99453_bp", None),
+        (
+            "batch_medcode_99454_bg",
+            "EXEC batch_medcode_99454_bg :today_date",
+            medcode_params,
+        ),
+        (
+            "batch_medcode_99454_bp",
+            "EXEC batch_medcode_99454_bp :today_date",
+            medcode_params,
+        ),
+        ("batch_medcode_99457", "EXEC batch_medcode_99457 :today_date", medcode_params),
+        ("batch_medcode_99458", "EXEC batch_medcode_99458 :today_date", medcode_params),
+    ]
+    for name, stmt, params in procs:
+        with metrics.stage(f"proc.{name}"):
+            gps.execute_query(stmt, params)
+    if cross_check:
+        with metrics.stage("billing.cross_check"):
+            cross_check_medical_codes(gps, end_date, logger=logger)
+
+    with metrics.stage("proc.create_billing_report") as stage:
+        df = gps.read_sql(
+            "EXEC create_billing_report @start_date = ?, @end_date = ?",
+            params=(start_date, end_date),
+        )
+        stage.output(df)
+    with metrics.stage("write.billing_report", df):
+        write_structured_file(
+            df, Path.cwd() / "data" / "LCH_Billing_Report.xlsx", index=False
+        )
     gps.close()
 
 
 def main() -> None:
     warnings.filterwarnings("ignore")
     load_dotenv()
-    logger = setup_logger("main", level="debug")
+    logger = setup_logger("main", level="debug", queue_handler=True)
+    # METRICS_DEEP_BYTES=1 counts the contents of object columns in the stage bytes, at a cost on large frames.
+    metrics = RunMetrics(
+        "nightly", deep_bytes=bool(os.environ.get("METRICS_DEEP_BYTES")), logger=logger
+    )
+    # Keeps the Microsoft Graph token between runs, e.g. MSGRAPH_TOKEN_CACHE=~/.cache/medicare_rebuild/token.json
+    if os.environ.get("MSGRAPH_TOKEN_CACHE"):
+        shared_token_cache.path = Path(os.environ["MSGRAPH_TOKEN_CACHE"]).expanduser()
+    # Caches Tenovi and Graph GET responses on disk, so reruns of a failed import skip refetching,
+    # e.g. HTTP_CACHE_DIR=~/.cache/medicare_rebuild/http
+    if os.environ.get("HTTP_CACHE_DIR"):
+        shared_response_cache.path = Path(os.environ["HTTP_CACHE_DIR"]).expanduser()
+        shared_response_cache.logger = logger
+    # Opt-in statement profiling, e.g. QUERY_SLOW_SECONDS=2 logs every statement slower than 2 seconds.
+    if os.environ.get("QUERY_SLOW_SECONDS"):
+        query_profiler.logger = logger
+        query_profiler.enable(float(os.environ["QUERY_SLOW_SECONDS"]))
 
-    import_all_data("2025-01-01", "2025-02-28", logger=logger)
-    create_billing_report("2025-02-01", "2025-02-28", logger=logger)
+    try:
+        # Tenovi readings are harvested when TENOVI_API_KEY and TENOVI_CLIENT_DOMAIN are set.
+        import_all_data(
+            "2025-01-01",
+            "2025-02-28",
+            metrics=metrics,
+            tenovi=bool(os.environ.get("TENOVI_API_KEY")),
+            logger=logger,
+        )
+        # BILLING_CROSS_CHECK=1 checks the stored procedures against the in-memory billing engine.
+        create_billing_report(
+            "2025-02-01",
+            "2025-02-28",
+            cross_check=bool(os.environ.get("BILLING_CROSS_CHECK")),
+            metrics=metrics,
+            logger=logger,
+        )
+    finally:
+        engine_registry.dispose_all()
+        metrics.write_manifest(Path.cwd() / "data" / "run_manifest.json")
+        # Set to a path in the node_exporter textfile collector directory, e.g. /var/lib/node_exporter/medicare_rebuild.prom
+        if os.environ.get("METRICS_TEXTFILE"):
+            metrics.write_prometheus(os.environ["METRICS_TEXTFILE"])
+        if query_profiler.enabled:
+            query_profiler.dump(Path.cwd() / "data" / "query_profile.json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,385 @@
+"""
+In-memory billing engine mirroring the batch_medcode_* stored procedures.
+
+Each batch_medcode_* function applies the same rules as the stored procedure of the same name to DataFrames,
+with groupby and distinct day counts instead of server-side scans. compute_medical_codes runs them in the
+order create_billing_report runs the procedures, each seeing the codes added before it, so its result is the
+medical_code table the procedures would leave behind. Use it as a fast path, or compare it with the table
+to cross-check the procedures.
+
+Frames use the database column names:
+    notes: patient_id, note_datetime, call_time_seconds and the note type name.
+    readings: patient_id (of the reading's device), device_id and received_datetime.
+    codes: patient_id, code (the medical_code_type name) and timestamp_applied, one row per medical_code row.
+    code devices: patient_id and device_id of each medical_code_device link of a 99453 code.
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from typing import List, Tuple
+
+code_columns = ["patient_id", "code", "timestamp_applied"]
+
+# Readings on this many distinct days qualify for 99453 and 99454.
+min_reading_days = 16
+# 99458 is billed per 20 minute block past the first, up to this many blocks in all.
+max_rpm_blocks = 4
+
+
+def empty_codes() -> pd.DataFrame:
+    """Builds an empty medical code frame.
+
+    Returns:
+        pd.DataFrame: No rows, with the code columns.
+    """
+    return pd.DataFrame(
+        {
+            "patient_id": pd.Series(dtype="int64"),
+            "code": pd.Series(dtype="object"),
+            "timestamp_applied": pd.Series(dtype="datetime64[ns]"),
+        }
+    )
+
+
+def day_cutoff(today_date: date | datetime | str, days: int = 30) -> pd.Timestamp:
+    """Mirrors DATEADD(day, -days, @today_date) with a date parameter.
+
+    Args:
+        today_date (date, datetime, str): The billing date. Any time of day is dropped, as the date parameter does.
+        days (int): Number of days back. Defaults to 30 (optional).
+
+    Returns:
+        pd.Timestamp: Midnight of the cutoff day.
+    """
+    return pd.Timestamp(today_date).normalize() - pd.Timedelta(days=days)
+
+
+def month_cutoff(today_date: date | datetime | str) -> pd.Timestamp:
+    """Mirrors DATEADD(MONTH, -1, @today_date) with a date parameter. Month ends clamp, e.g. 03/31 gives 02/28.
+
+    Args:
+        today_date (date, datetime, str): The billing date.
+
+    Returns:
+        pd.Timestamp: Midnight of the same day in the previous month.
+    """
+    return pd.Timestamp(today_date).normalize() - pd.DateOffset(months=1)
+
+
+def _new_codes(
+    patient_ids: pd.Index | pd.Series, code: str, timestamps: pd.Series
+) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "patient_id": np.asarray(patient_ids, dtype="int64"),
+            "code": code,
+            "timestamp_applied": pd.to_datetime(np.asarray(timestamps)),
+        }
+    )
+
+
+def _call_time(notes: pd.DataFrame) -> pd.DataFrame:
+    grouped = notes.groupby("patient_id")
+    return pd.DataFrame(
+        {
+            # SUM skips NULLs, and is NULL when every call time is.
+            "seconds": grouped["call_time_seconds"].sum(min_count=1),
+            "last_note": grouped["note_datetime"].max(),
+        }
+    )
+
+
+def _reading_days(readings: pd.DataFrame) -> pd.DataFrame:
+    received = readings["received_datetime"]
+    distinct = pd.DataFrame(
+        {"patient_id": readings["patient_id"], "day": received.dt.normalize()}
+    ).dropna()
+    return pd.DataFrame(
+        {
+            "days": distinct.drop_duplicates().groupby("patient_id").size(),
+            "latest_reading": received.groupby(readings["patient_id"]).max(),
+        }
+    )
+
+
+def batch_medcode_99202(
+    notes: pd.DataFrame, codes: pd.DataFrame, note_type_col: str = "note_type"
+) -> pd.DataFrame:
+    """Adds 99202 for patients whose Initial Evaluation call time totals 15 to 29 minutes.
+    Patients with any 99202 to 99205 code are skipped. The code is dated at their latest Initial Evaluation note.
+
+    Args:
+        notes (pd.DataFrame): Patient notes.
+        codes (pd.DataFrame): Medical codes already applied.
+        note_type_col (str): Column holding the note type name. Defaults to 'note_type' (optional).
+
+    Returns:
+        pd.DataFrame: The new codes.
+    """
+    coded = codes.loc[
+        codes["code"].isin(["99202", "99203", "99204", "99205"]), "patient_id"
+    ]
+    evals = notes[
+        (notes[note_type_col] == "Initial Evaluation")
+        & ~notes["patient_id"].isin(coded)
+    ]
+    grouped = _call_time(evals)
+    # FLOOR(SUM(call_time_seconds)) / 60 between 15 and 30 minutes; NULL sums never qualify.
+    minutes = np.floor(grouped["seconds"]) // 60
+    grouped = grouped[(minutes >= 15) & (minutes < 30)]
+    return _new_codes(grouped.index, "99202", grouped["last_note"])
+
+
+def batch_medcode_99453(
+    readings: pd.DataFrame, code_devices: pd.DataFrame, devices: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Adds 99453 for patients with readings on 16 or more distinct days, ever.
+    Readings from devices already linked to one of the patient's 99453 codes are left out.
+    The code is dated at the latest reading and linked to every device of the patient.
+
+    Args:
+        readings (pd.DataFrame): Glucose or blood pressure readings.
+        code_devices (pd.DataFrame): Device links of the 99453 codes already applied.
+        devices (pd.DataFrame): patient_id and device_id of every device, used for the new device links.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The new codes and their device links.
+    """
+    readings = readings[["patient_id", "device_id", "received_datetime"]]
+    if not code_devices.empty:
+        readings = readings.merge(
+            code_devices[["patient_id", "device_id"]].drop_duplicates(),
+            on=["patient_id", "device_id"],
+            how="left",
+            indicator=True,
+        )
+        readings = readings[readings["_merge"] == "left_only"]
+    grouped = _reading_days(readings)
+    grouped = grouped[grouped["days"] >= min_reading_days]
+    new_codes = _new_codes(grouped.index, "99453", grouped["latest_reading"])
+    new_devices = devices.loc[
+        devices["patient_id"].isin(new_codes["patient_id"]),
+        ["patient_id", "device_id"],
+    ].drop_duplicates()
+    return new_codes, new_devices
+
+
+def batch_medcode_99454(
+    readings: pd.DataFrame, codes: pd.DataFrame, today_date: date | datetime | str
+) -> pd.DataFrame:
+    """Adds 99454 for patients with readings on 16 or more distinct days since 30 days before the billing date.
+    Patients with a 99454 applied in that window are skipped. The code is dated at the latest reading.
+
+    Args:
+        readings (pd.DataFrame): Glucose or blood pressure readings.
+        codes (pd.DataFrame): Medical codes already applied.
+        today_date (date, datetime, str): The billing date.
+
+    Returns:
+        pd.DataFrame: The new codes.
+    """
+    cutoff = day_cutoff(today_date)
+    coded = codes.loc[
+        (codes["code"] == "99454") & (codes["timestamp_applied"] >= cutoff),
+        "patient_id",
+    ]
+    recent = readings[
+        (readings["received_datetime"] >= cutoff) & ~readings["patient_id"].isin(coded)
+    ]
+    grouped = _reading_days(recent)
+    grouped = grouped[grouped["days"] >= min_reading_days]
+    return _new_codes(grouped.index, "99454", grouped["latest_reading"])
+
+
+def batch_medcode_99457(
+    notes: pd.DataFrame, codes: pd.DataFrame, today_date: date | datetime | str
+) -> pd.DataFrame:
+    """Adds 99457 for patients with 20 or more minutes of calls since a month before the billing date.
+    Patients with a 99457 applied in that window are skipped. The code is dated at the latest note in the window.
+
+    Args:
+        notes (pd.DataFrame): Patient notes of every type.
+        codes (pd.DataFrame): Medical codes already applied.
+        today_date (date, datetime, str): The billing date.
+
+    Returns:
+        pd.DataFrame: The new codes.
+    """
+    cutoff = month_cutoff(today_date)
+    coded = codes.loc[
+        (codes["code"] == "99457") & (codes["timestamp_applied"] >= cutoff),
+        "patient_id",
+    ]
+    recent = notes[
+        (notes["note_datetime"] >= cutoff) & ~notes["patient_id"].isin(coded)
+    ]
+    grouped = _call_time(recent)
+    grouped = grouped[grouped["seconds"] // 60 >= 20]
+    return _new_codes(grouped.index, "99457", grouped["last_note"])
+
+
+def batch_medcode_99458(
+    notes: pd.DataFrame, codes: pd.DataFrame, today_date: date | datetime | str
+) -> pd.DataFrame:
+    """Adds one 99458 for each 20 minute block of calls past the first since a month before the billing date,
+    up to four blocks in all, less the 99458s already applied in that window.
+    As in the procedure, only patients with some code applied in the window are considered, and the codes are
+    dated at the patient's latest note of any date.
+
+    Args:
+        notes (pd.DataFrame): Patient notes of every type.
+        codes (pd.DataFrame): Medical codes already applied.
+        today_date (date, datetime, str): The billing date.
+
+    Returns:
+        pd.DataFrame: The new codes, one row per billed block.
+    """
+    cutoff = month_cutoff(today_date)
+    recent = notes[notes["note_datetime"] >= cutoff]
+    seconds = recent.groupby("patient_id")["call_time_seconds"].sum(min_count=1)
+    blocks = np.floor(seconds / 1200).fillna(0).clip(upper=max_rpm_blocks)
+
+    window_codes = codes[codes["timestamp_applied"] >= cutoff]
+    code_count = (
+        (window_codes["code"] == "99458").groupby(window_codes["patient_id"]).sum()
+    )
+
+    latest_note = notes.groupby("patient_id")["note_datetime"].max()
+    patients = pd.concat(
+        [blocks.rename("blocks"), code_count.rename("code_count"), latest_note],
+        axis=1,
+        join="inner",
+    )
+    extra = (patients["blocks"] - patients["code_count"] - 1).clip(lower=0, upper=3)
+    extra = extra.astype("int64")
+    billed = patients.loc[patients.index.repeat(extra)]
+    return _new_codes(billed.index, "99458", billed["note_datetime"])
+
+
+def _add(codes: pd.DataFrame, new_codes: pd.DataFrame) -> pd.DataFrame:
+    if new_codes.empty:
+        return codes
+    if codes.empty:
+        return new_codes.reset_index(drop=True)
+    return pd.concat([codes, new_codes], ignore_index=True)
+
+
+def compute_medical_codes(
+    notes: pd.DataFrame,
+    gluc_readings: pd.DataFrame,
+    bp_readings: pd.DataFrame,
+    today_date: date | datetime | str,
+    devices: pd.DataFrame | None = None,
+    existing_codes: pd.DataFrame | None = None,
+    existing_code_devices: pd.DataFrame | None = None,
+    note_type_col: str = "note_type",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Computes the medical codes create_billing_report's procedures would apply, in the same order.
+
+    Args:
+        notes (pd.DataFrame): Patient notes.
+        gluc_readings (pd.DataFrame): Glucose readings.
+        bp_readings (pd.DataFrame): Blood pressure readings.
+        today_date (date, datetime, str): The billing date passed to the procedures.
+        devices (pd.DataFrame): patient_id and device_id of every device. Defaults to None, the devices
+            found in the readings (optional).
+        existing_codes (pd.DataFrame): Codes already in medical_code. Defaults to None, an empty table as left
+            by reset_medical_code_tables (optional).
+        existing_code_devices (pd.DataFrame): Device links of the existing 99453 codes. Defaults to None (optional).
+        note_type_col (str): Column of notes holding the note type name, e.g. 'temp_note_type' for freshly
+            normalized notes. Defaults to 'note_type' (optional).
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Every code, existing ones first, and the device links of the 99453 codes.
+    """
+    # Empty query results come back without datetime columns.
+    notes = notes.assign(note_datetime=pd.to_datetime(notes["note_datetime"]))
+    gluc_readings = gluc_readings.assign(
+        received_datetime=pd.to_datetime(gluc_readings["received_datetime"])
+    )
+    bp_readings = bp_readings.assign(
+        received_datetime=pd.to_datetime(bp_readings["received_datetime"])
+    )
+    codes = empty_codes()
+    if existing_codes is not None:
+        codes = _add(
+            codes,
+            existing_codes[code_columns].assign(
+                timestamp_applied=pd.to_datetime(existing_codes["timestamp_applied"])
+            ),
+        )
+    code_devices = pd.DataFrame(columns=["patient_id", "device_id"])
+    if existing_code_devices is not None:
+        code_devices = _add(code_devices, existing_code_devices)
+    if devices is None:
+        devices = pd.concat(
+            [
+                gluc_readings[["patient_id", "device_id"]],
+                bp_readings[["patient_id", "device_id"]],
+            ]
+        )
+
+    codes = _add(codes, batch_medcode_99202(notes, codes, note_type_col))
+    for readings in (gluc_readings, bp_readings):
+        new_codes, new_devices = batch_medcode_99453(readings, code_devices, devices)
+        codes = _add(codes, new_codes)
+        code_devices = _add(code_devices, new_devices)
+    codes = _add(codes, batch_medcode_99454(gluc_readings, codes, today_date))
+    codes = _add(codes, batch_medcode_99454(bp_readings, codes, today_date))
+    codes = _add(codes, batch_medcode_99457(notes, codes, today_date))
+    codes = _add(codes, batch_medcode_99458(notes, codes, today_date))
+    return codes, code_devices
+
+
+def summarize_daily_codes(
+    codes: pd.DataFrame,
+    start_date: date | datetime | str,
+    end_date: date | datetime | str,
+) -> pd.DataFrame:
+    """Counts each patient's codes per date of service, as create_billing_report does before joining patient details.
+    Codes applied from the start date up to midnight of the end date are counted.
+
+    Args:
+        codes (pd.DataFrame): Medical codes, e.g. from compute_medical_codes.
+        start_date (date, datetime, str): The report start date.
+        end_date (date, datetime, str): The report end date.
+
+    Returns:
+        pd.DataFrame: patient_id, date_of_service and a count column for each code.
+    """
+    names: List[str] = ["99202", "99453", "99454", "99457", "99458"]
+    codes = codes[
+        (codes["timestamp_applied"] >= pd.Timestamp(start_date))
+        & (codes["timestamp_applied"] <= pd.Timestamp(end_date))
+    ]
+    counts = pd.crosstab(
+        [codes["patient_id"], codes["timestamp_applied"].dt.normalize()],
+        codes["code"],
+    ).reindex(columns=names, fill_value=0)
+    counts.columns = [f"count_{name}" for name in names]
+    counts.index.names = ["patient_id", "date_of_service"]
+    return counts.reset_index()
+
+
+def compare_medical_codes(expected: pd.DataFrame, actual: pd.DataFrame) -> pd.DataFrame:
+    """Compares two sets of medical codes, e.g. the engine's and the medical_code table after the procedures.
+
+    Args:
+        expected (pd.DataFrame): The expected codes.
+        actual (pd.DataFrame): The codes to check.
+
+    Returns:
+        pd.DataFrame: patient_id, code, timestamp_applied and both counts of every code whose counts differ.
+            Empty when the sets match.
+    """
+
+    def count(codes: pd.DataFrame) -> pd.Series:
+        return codes.groupby(code_columns).size()
+
+    counts = pd.concat(
+        [count(expected).rename("expected"), count(actual).rename("actual")],
+        axis=1,
+    ).fillna(0)
+    counts = counts.astype("int64")
+    return counts[counts["expected"] != counts["actual"]].reset_index()
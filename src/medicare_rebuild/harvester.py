@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+from medicare_rebuild.utils.api_utils import TenoviApi
+
+
+class RateLimiter:
+    """
+    Spaces out calls shared by several threads so no more than `rate` start per second.
+    """
+
+    def __init__(self, rate: float) -> None:
+        """
+        Initializes the limiter.
+
+        Args:
+            rate (float): Maximum calls per second. 0 disables the limit.
+        """
+        self.interval = 1 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until the caller may start its call. Slots are reserved under the lock and waited for outside it.
+        """
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class TenoviHarvester:
+    """
+    Fetches readings from Tenovi for every device concurrently.
+    Each device is read from its own created__gte watermark, so only readings Tenovi received since the last run
+    are fetched. Requests run on a bounded thread pool behind a shared rate limit, and readings are yielded in batches
+    as devices finish, so loading starts before the slowest device returns.
+    """
+
+    def __init__(
+        self,
+        api: TenoviApi,
+        max_workers: int = 8,
+        requests_per_second: float = 5.0,
+        logger=None,
+    ) -> None:
+        """
+        Initializes the harvester.
+
+        Args:
+            api (TenoviApi): The Tenovi API client. Its session is shared by the worker threads.
+            max_workers (int): Maximum number of requests in flight. Defaults to 8 (optional).
+            requests_per_second (float): Maximum requests started per second, 0 for no limit. Defaults to 5.0 (optional).
+            logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(requests_per_second)
+        self.logger = logger or logging.getLogger(__name__)
+        self.failed_devices: List[str] = []
+
+    def get_device_ids(self) -> List[str]:
+        """
+        Lists the hardware IDs of the client's devices.
+
+        Returns:
+            List[str]: The hwi_device_id of every device.
+        """
+        self.limiter.acquire()
+        devices = self.api.get_devices()
+        if not isinstance(devices, list):
+            raise Exception(f"Unexpected Tenovi devices response: {devices!r:.200}")
+        return [d["hwi_device_id"] for d in devices if d.get("hwi_device_id")]
+
+    def fetch_device(
+        self,
+        hwi_device_id: str,
+        created_gte: datetime | None = None,
+        created_lte: datetime | None = None,
+    ) -> List[dict]:
+        """
+        Fetches the readings of one device.
+
+        Args:
+            hwi_device_id (str): The hardware ID of the device.
+            created_gte (datetime): Only fetch readings Tenovi received at or after this UTC time. Defaults to None (optional).
+            created_lte (datetime): Only fetch readings Tenovi received at or before this UTC time. Defaults to None (optional).
+
+        Returns:
+            List[dict]: The device's readings, each tagged with its hwi_device_id.
+        """
+        self.limiter.acquire()
+        readings = self.api.get_readings(
+            hwi_device_id, created_gte=created_gte, created_lte=created_lte
+        )
+        if not isinstance(readings, list):
+            raise Exception(
+                f"Unexpected Tenovi readings response for {hwi_device_id}: {readings!r:.200}"
+            )
+        for reading in readings:
+            reading["hwi_device_id"] = hwi_device_id
+        return readings
+
+    def iter_readings(
+        self,
+        watermarks: Dict[str, datetime],
+        default_start: datetime | None = None,
+        batch_size: int = 5_000,
+        end: datetime | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Fetches the readings of every device and yields them in batches.
+        A device that fails is logged and added to failed_devices; its watermark is left alone, so it is retried next run.
+
+        Args:
+            watermarks (Dict[str, datetime]): Latest created time already loaded, keyed by hwi_device_id.
+            default_start (datetime): created__gte for devices without a watermark. Defaults to None, all readings (optional).
+            batch_size (int): Minimum number of readings per yielded batch, except the last. Defaults to 5,000 (optional).
+            end (datetime): created__lte of every device, the end of the extract window. Defaults to None, no end (optional).
+
+        Yields:
+            pd.DataFrame: The next batch of raw Tenovi readings, with an hwi_device_id column.
+        """
+        device_ids = self.get_device_ids()
+        self.logger.info(
+            f"Fetching Tenovi readings for {len(device_ids)} devices "
+            f"({len(watermarks)} with watermarks)..."
+        )
+        pending = iter(device_ids)
+        running: Dict[Future, str] = {}
+        batch: List[dict] = []
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="tenovi"
+        )
+        try:
+            while True:
+                # Keep a bounded window of requests in flight, so unread results never pile up in memory.
+                while len(running) < self.max_workers * 2:
+                    device_id = next(pending, None)
+                    if device_id is None:
+                        break
+                    start = watermarks.get(device_id, default_start)
+                    future = executor.submit(self.fetch_device, device_id, start, end)
+                    running[future] = device_id
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    device_id = running.pop(future)
+                    try:
+                        batch.extend(future.result())
+                    except Exception as e:
+                        self.failed_devices.append(device_id)
+                        self.logger.warning(
+                            f"Failed to fetch Tenovi readings for {device_id}: {e}"
+                        )
+                if len(batch) >= batch_size:
+                    yield pd.DataFrame.from_records(batch)
+                    batch = []
+            if batch:
+                yield pd.DataFrame.from_records(batch)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if self.failed_devices:
+            self.logger.warning(
+                f"Tenovi readings failed for {len(self.failed_devices)} devices: {self.failed_devices[:5]}"
+            )
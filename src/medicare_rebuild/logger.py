@@ -1,13 +1,35 @@
+import atexit
 import logging
+import queue
 import colorlog
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Dict
 
 from shared_tools.atomic_io import ensure_dir
 
 from medicare_rebuild.helpers import create_file
 
 
-def setup_logger(name: str, level: str = "warning") -> logging.Logger:
+# Listeners of the loggers set up with queue=True, keyed by logger name.
+_queue_listeners: Dict[str, QueueListener] = {}
+
+
+def setup_logger(
+    name: str, level: str = "warning", queue_handler: bool = False
+) -> logging.Logger:
+    """Sets up a logger writing to logs/<name>_logfile.log and to a colored console stream.
+    With queue_handler, records are put on a queue and written by a background listener thread,
+    so pipeline worker threads never wait on file or console I/O.
+
+    Args:
+        name (str): Name of the logger.
+        level (str): Logging level name. Defaults to 'warning' (optional).
+        queue_handler (bool): Whether to hand records to a QueueListener thread. Defaults to False (optional).
+
+    Returns:
+        logging.Logger: The configured logger. An already configured logger is returned unchanged.
+    """
 
     log_level = {
         "critical": logging.CRITICAL,
@@ -49,7 +71,32 @@ def setup_logger(name: str, level: str = "warning") -> logging.Logger:
     )
     stream_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
+    if queue_handler:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True
+        )
+        listener.start()
+        _queue_listeners[name] = listener
+        atexit.register(stop_logger, name)
+        logger.addHandler(QueueHandler(log_queue))
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(stream_handler)
 
     return logger
+
+
+def stop_logger(name: str) -> None:
+    """Writes the queued records of a logger set up with queue_handler and stops its listener thread.
+    Runs at exit; safe to call more than once.
+
+    Args:
+        name (str): Name of the logger.
+    """
+    listener = _queue_listeners.pop(name, None)
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,292 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+def peak_rss_mb() -> float | None:
+    """Gets the peak resident set size of the process so far.
+
+    Returns:
+        float: Peak RSS in MB, or None where the resource module is unavailable (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return round(peak / 1024**2 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def frame_size(data: Any, deep: bool = False) -> Tuple[int | None, int | None]:
+    """Counts the rows and in-memory bytes of a DataFrame, or of every DataFrame in a dict.
+
+    Args:
+        data (Any): A DataFrame, a dict of DataFrames or anything else.
+        deep (bool): Whether to count the bytes of every object value too. This visits each string of an object column,
+            holding the GIL for about half a second per million rows, so it is off for pipeline stages by default.
+            Defaults to False, counting object columns as their pointers (optional).
+
+    Returns:
+        Tuple[int, int]: Rows and bytes, or (None, None) if there are no DataFrames to count.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.shape[0], int(data.memory_usage(deep=deep).sum())
+    if isinstance(data, dict):
+        sizes = [
+            frame_size(df, deep=deep)
+            for df in data.values()
+            if isinstance(df, pd.DataFrame)
+        ]
+        if sizes:
+            return sum(s[0] or 0 for s in sizes), sum(s[1] or 0 for s in sizes)
+    return None, None
+
+
+class StageMetrics:
+    """
+    Totals for one named stage. A stage recorded several times, e.g. once per streamed chunk, adds up.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.failures = 0
+        self.started_at: datetime | None = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows_in: int | None = None
+        self.rows_out: int | None = None
+        self.bytes_in: int | None = None
+        self.bytes_out: int | None = None
+        self.peak_rss_mb: float | None = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+
+def _add(total: int | None, value: int | None) -> int | None:
+    if value is None:
+        return total
+    return (total or 0) + value
+
+
+class StageRecord:
+    """
+    Handle for one run of a stage, returned by RunMetrics.stage(). Report the stage's output with output().
+    """
+
+    def __init__(self, data_in: Any = None, deep_bytes: bool = False) -> None:
+        self.deep_bytes = deep_bytes
+        self.rows_in, self.bytes_in = frame_size(data_in, deep=deep_bytes)
+        self.rows_out: int | None = None
+        self.bytes_out: int | None = None
+
+    def output(self, data: Any, rows: int | None = None) -> Any:
+        """
+        Records the output of the stage.
+
+        Args:
+            data (Any): The stage output, usually a DataFrame or a dict of DataFrames.
+            rows (int): Rows written, when it differs from the output size, e.g. a load's row count. Defaults to None (optional).
+
+        Returns:
+            Any: The output, unchanged, so the call can wrap an assignment.
+        """
+        self.rows_out, self.bytes_out = frame_size(data, deep=self.deep_bytes)
+        if rows is not None:
+            self.rows_out = rows
+        return data
+
+
+class RunMetrics:
+    """
+    Records wall time, CPU time, rows and bytes in and out, and peak RSS for each stage of a run.
+    Stages may run on several threads at once; CPU time is the time of the thread running the stage.
+    Peak RSS is the process high-water mark when the stage finished.
+    Bytes count object columns as their pointers unless deep_bytes is set, see frame_size().
+    """
+
+    def __init__(
+        self,
+        run_name: str = "medicare_rebuild",
+        deep_bytes: bool = False,
+        logger=None,
+    ) -> None:
+        """
+        Starts a run.
+
+        Args:
+            run_name (str): Name of the run, used as a label in the outputs. Defaults to 'medicare_rebuild' (optional).
+            deep_bytes (bool): Whether stage bytes include the contents of object columns. Slow on large frames.
+                Defaults to False (optional).
+            logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
+        """
+        self.run_name = run_name
+        self.deep_bytes = deep_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, StageMetrics] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, data_in: Any = None) -> Iterator[StageRecord]:
+        """
+        Times a stage. Failures are recorded and re-raised.
+
+        Args:
+            name (str): Name of the stage, e.g. 'extract.device' or 'load.patient'.
+            data_in (Any): The stage input, usually a DataFrame or a dict of DataFrames. Defaults to None (optional).
+
+        Yields:
+            StageRecord: Handle used to report the stage output.
+        """
+        record = StageRecord(data_in, deep_bytes=self.deep_bytes)
+        started_at = datetime.now()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        failed = False
+        try:
+            yield record
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            rss = peak_rss_mb()
+            with self._lock:
+                stage = self.stages.get(name)
+                if stage is None:
+                    stage = self.stages[name] = StageMetrics(name)
+                    stage.started_at = started_at
+                stage.calls += 1
+                stage.failures += int(failed)
+                stage.wall_seconds += wall
+                stage.cpu_seconds += cpu
+                stage.rows_in = _add(stage.rows_in, record.rows_in)
+                stage.rows_out = _add(stage.rows_out, record.rows_out)
+                stage.bytes_in = _add(stage.bytes_in, record.bytes_in)
+                stage.bytes_out = _add(stage.bytes_out, record.bytes_out)
+                stage.peak_rss_mb = rss
+            self.logger.debug(
+                f"Stage {name} {'failed' if failed else 'finished'} in {wall:.2f}s "
+                f"(cpu: {cpu:.2f}s, rows in: {record.rows_in}, rows out: {record.rows_out})"
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Builds the run manifest.
+
+        Returns:
+            Dict[str, Any]: Run name, start time, total wall time, peak RSS and the totals of each stage.
+        """
+        with self._lock:
+            stages = [stage.to_dict() for stage in self.stages.values()]
+        return {
+            "run": self.run_name,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self._start, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": stages,
+        }
+
+    def write_manifest(self, path: Path | str) -> Path:
+        """
+        Writes the run manifest as JSON.
+
+        Args:
+            path (Path, str): Path of the manifest file.
+
+        Returns:
+            Path: The path of the written file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+        self.logger.debug(f"Wrote run manifest to {path}")
+        return path
+
+    # Prometheus metric name, help text and stage field of each exported stage metric.
+    prometheus_metrics = [
+        ("stage_wall_seconds", "Wall time spent in the stage.", "wall_seconds"),
+        ("stage_cpu_seconds", "CPU time spent in the stage.", "cpu_seconds"),
+        ("stage_rows_in", "Rows passed into the stage.", "rows_in"),
+        ("stage_rows_out", "Rows produced or written by the stage.", "rows_out"),
+        ("stage_bytes_in", "In-memory bytes passed into the stage.", "bytes_in"),
+        ("stage_bytes_out", "In-memory bytes produced by the stage.", "bytes_out"),
+        (
+            "stage_peak_rss_mb",
+            "Process peak RSS when the stage finished.",
+            "peak_rss_mb",
+        ),
+        ("stage_failures", "Failed runs of the stage.", "failures"),
+    ]
+
+    def write_prometheus(
+        self, path: Path | str, prefix: str = "medicare_rebuild"
+    ) -> Path:
+        """
+        Writes the stage metrics in the Prometheus text format, for the node_exporter textfile collector.
+        The file is replaced atomically so the collector never reads a partial file.
+
+        Args:
+            path (Path, str): Path of the .prom file.
+            prefix (str): Prefix of every metric name. Defaults to 'medicare_rebuild' (optional).
+
+        Returns:
+            Path: The path of the written file.
+        """
+        manifest = self.to_dict()
+        lines: List[str] = []
+        for metric, help_text, field in self.prometheus_metrics:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for stage in manifest["stages"]:
+                if stage[field] is not None:
+                    labels = f'run="{self.run_name}",stage="{stage["stage"]}"'
+                    lines.append(f"{prefix}_{metric}{{{labels}}} {stage[field]}")
+        lines.append(f"# HELP {prefix}_run_wall_seconds Wall time of the whole run.")
+        lines.append(f"# TYPE {prefix}_run_wall_seconds gauge")
+        lines.append(
+            f'{prefix}_run_wall_seconds{{run="{self.run_name}"}} {manifest["wall_seconds"]}'
+        )
+        lines.append(
+            f"# HELP {prefix}_run_finished_timestamp_seconds Unix time the run finished."
+        )
+        lines.append(f"# TYPE {prefix}_run_finished_timestamp_seconds gauge")
+        lines.append(
+            f'{prefix}_run_finished_timestamp_seconds{{run="{self.run_name}"}} {time.time():.0f}'
+        )
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+        self.logger.debug(f"Wrote Prometheus metrics to {path}")
+        return path
@@ -0,0 +1,168 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+
+
+class PipelineStage:
+    """
+    A named unit of work in a Pipeline. The stage callable receives the results of its dependencies
+    as positional arguments, in the order they are listed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        depends_on: List[str] | None = None,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.depends_on = depends_on or []
+
+
+class Pipeline:
+    """
+    Dependency-aware stage scheduler.
+    Every stage whose dependencies have finished is submitted to a thread pool, so independent stages
+    (e.g. extracts from separate sources) overlap while dependent ones (e.g. loads in foreign-key order) wait.
+    """
+
+    def __init__(self, max_workers: int = 4, logger=None) -> None:
+        """
+        Initializes an empty pipeline.
+
+        Args:
+            max_workers (int): Maximum number of stages running at once. Defaults to 4 (optional).
+            logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
+        """
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger(__name__)
+        self.stages: Dict[str, PipelineStage] = {}
+
+    def add_stage(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        depends_on: List[str] | None = None,
+    ) -> None:
+        """
+        Registers a stage.
+
+        Args:
+            name (str): Unique name of the stage.
+            func (Callable[..., Any]): Callable run for the stage, given its dependencies' results.
+            depends_on (List[str]): Names of the stages that must finish first. Defaults to None (optional).
+
+        Raises:
+            Exception: If a stage with the same name is already registered.
+        """
+        if name in self.stages:
+            raise Exception(f"Stage {name} is already registered.")
+        self.stages[name] = PipelineStage(name, func, depends_on)
+
+    def _check_graph(self) -> None:
+        """
+        Ensures every dependency exists and the stages form no cycle.
+
+        Raises:
+            Exception: If a dependency is unknown or the stages form a cycle.
+        """
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise Exception(
+                        f"Stage {stage.name} depends on unknown stage {dep}."
+                    )
+        resolved: set = set()
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [
+                name
+                for name, stage in remaining.items()
+                if all(dep in resolved for dep in stage.depends_on)
+            ]
+            if not ready:
+                raise Exception(f"Stages {sorted(remaining)} form a dependency cycle.")
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
+
+    def _run_stage(self, stage: PipelineStage, args: List[Any]) -> Any:
+        start = time.perf_counter()
+        self.logger.debug(f"Starting stage {stage.name}...")
+        result = stage.func(*args)
+        self.logger.debug(
+            f"Finished stage {stage.name} in {time.perf_counter() - start:.2f}s..."
+        )
+        return result
+
+    def run(self, keep: List[str] | None = None) -> Dict[str, Any]:
+        """
+        Runs every stage once its dependencies have finished.
+        When a stage fails, no further stages are started and the error is raised once running stages finish.
+        A stage's result is released as soon as every stage depending on it has finished,
+        so e.g. an extract DataFrame is not held in memory past its load.
+
+        Args:
+            keep (List[str]): Names of the stages whose results are returned.
+                Defaults to the stages no other stage depends on (optional).
+
+        Returns:
+            Dict[str, Any]: Result of each kept stage, keyed by stage name.
+
+        Raises:
+            Exception: If the stage graph is invalid, a kept stage is unknown or a stage raises.
+        """
+        self._check_graph()
+        dependents = {name: 0 for name in self.stages}
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                dependents[dep] += 1
+        if keep is None:
+            keep = [name for name, count in dependents.items() if count == 0]
+        for name in keep:
+            if name not in self.stages:
+                raise Exception(f"Cannot keep the result of unknown stage {name}.")
+        results: Dict[str, Any] = {}
+        finished: set = set()
+        pending = dict(self.stages)
+        running: Dict[Future, str] = {}
+        error: BaseException | None = None
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="pipeline"
+        ) as executor:
+            while pending or running:
+                if error is None:
+                    ready = [
+                        stage
+                        for stage in pending.values()
+                        if all(dep in finished for dep in stage.depends_on)
+                    ]
+                    for stage in ready:
+                        future = executor.submit(
+                            self._run_stage,
+                            stage,
+                            [results[dep] for dep in stage.depends_on],
+                        )
+                        running[future] = stage.name
+                        del pending[stage.name]
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        self.logger.error(f"Stage {name} failed: {future.exception()}")
+                        error = error or future.exception()
+                        continue
+                    finished.add(name)
+                    if dependents[name] or name in keep:
+                        results[name] = future.result()
+                    for dep in self.stages[name].depends_on:
+                        dependents[dep] -= 1
+                        if not dependents[dep] and dep not in keep:
+                            results.pop(dep, None)
+        if error is not None:
+            raise error
+        return results
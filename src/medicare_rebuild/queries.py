@@ -5,6 +5,27 @@ FROM Glucose_Readings
 WHERE Time_Recorded >= ? AND Time_Recorded <= ?
 """
 
+get_billing_bg_readings_stmt = """
+SELECT d.patient_id, gr.device_id, gr.received_datetime
+FROM device d
+JOIN glucose_reading gr
+ON d.device_id = gr.device_id
+"""
+
+get_billing_bp_readings_stmt = """
+SELECT d.patient_id, bpr.device_id, bpr.received_datetime
+FROM device d
+JOIN blood_pressure_reading bpr
+ON d.device_id = bpr.device_id
+"""
+
+get_billing_notes_stmt = """
+SELECT pn.patient_id, pn.note_datetime, pn.call_time_seconds, nt.name AS note_type
+FROM patient_note pn
+LEFT JOIN note_type nt
+ON pn.note_type_id = nt.note_type_id
+"""
+
 get_bp_readings_stmt = """
 SELECT SharePoint_ID, Device_Model, Time_Recorded, Time_Recieved, BP_Reading_Systolic, BP_Reading_Diastolic, Manual_Reading
 FROM Blood_Pressure_Readings
@@ -12,7 +33,11 @@ WHERE Time_Recorded >= ? AND Time_Recorded <= ?
 """
 
 get_device_id_stmt = """
-SELECT device_id, patient_id
+SELECT device_id, patient_id, name,
+	CASE
+		WHEN name LIKE '%gluco%' OR name LIKE '%BGM%' THEN 'bg'
+		WHEN name LIKE '%blood pressure%' OR name LIKE '%BPM%' THEN 'bp'
+	END AS reading_kind
 FROM device
 """
 
@@ -22,6 +47,18 @@ FROM Fulfillment_All
 WHERE Resupply = 0 AND Vendor IN ('Tenovi', 'Omron')
 """
 
+get_medical_codes_stmt = """
+SELECT mc.patient_id, mct.name AS code, mc.timestamp_applied
+FROM medical_code mc
+JOIN medical_code_type mct
+ON mc.med_code_type_id = mct.med_code_type_id
+"""
+
+get_note_type_id_stmt = """
+SELECT note_type_id, name
+FROM note_type
+"""
+
 get_notes_log_stmt = """
 SELECT SharePoint_ID, Notes, TimeStamp, LCH_UPN, Time_Note, Note_ID
 FROM Medical_Notes
@@ -33,54 +70,71 @@ SELECT patient_id, sharepoint_id
 FROM patient
 """
 
+get_patient_status_type_id_stmt = """
+SELECT patient_status_type_id, name
+FROM patient_status_type
+"""
+
 get_time_log_stmt = """
 SELECT SharPoint_ID, Recording_Time, LCH_UPN, Notes, Auto_Time, Start_Time, End_Time, Note_ID
 FROM Time_Log
 WHERE End_Time >= ? AND End_Time <= ?
 """
 
+get_user_id_stmt = """
+SELECT user_id, display_name
+FROM [user]
+"""
+
 get_vendor_id_stmt = """
 SELECT vendor_id, name
 FROM vendor
 """
 
-# --- UPDATE Queries --- #
-update_patient_note_stmt = """
-UPDATE patient_note
-SET patient_note.note_type_id = (
-	SELECT nt.note_type_id
-	FROM note_type nt
-	WHERE nt.name = patient_note.temp_note_type
-)
-WHERE patient_note.temp_note_type IS NOT NULL;
-"""
-
-update_patient_status_stmt = """
-UPDATE patient_status
-SET patient_status.patient_status_type_id = (
-	SELECT pst.patient_status_type_id
-	FROM patient_status_type pst
-	WHERE pst.name = patient_status.temp_status_type
-)
-WHERE patient_status.temp_status_type IS NOT NULL;
-"""
-
-update_user_stmt = """
-UPDATE patient
-SET patient.user_id = (
-	SELECT u.user_id
-	FROM [user] u
-	WHERE u.display_name = patient.temp_user
-)
-WHERE patient.temp_user IS NOT NULL;
-"""
-
-update_user_note_stmt = """
-UPDATE patient_note
-SET patient_note.user_id = (
-	SELECT u.user_id
-	FROM [user] u
-	WHERE u.display_name = patient_note.temp_user
-)
-WHERE patient_note.temp_user IS NOT NULL;
+get_watermark_stmt = """
+SELECT high_water_mark
+FROM import_watermark
+WHERE source_name = :source_name
+"""
+
+get_watermarks_like_stmt = """
+SELECT source_name, high_water_mark
+FROM import_watermark
+WHERE source_name LIKE :source_pattern
+"""
+
+# --- CREATE Queries --- #
+create_import_watermark_stmt = """
+IF OBJECT_ID('import_watermark', 'U') IS NULL
+CREATE TABLE import_watermark (
+	source_name VARCHAR(100) NOT NULL PRIMARY KEY,
+	high_water_mark DATETIME2 NOT NULL,
+	modified_date DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+);
+"""
+
+create_patient_reading_day_stmt = """
+IF OBJECT_ID('patient_reading_day', 'U') IS NULL
+CREATE TABLE patient_reading_day (
+	patient_id INT NOT NULL,
+	device_id INT NOT NULL,
+	reading_kind VARCHAR(2) NOT NULL,
+	reading_day DATE NOT NULL,
+	reading_count INT NOT NULL,
+	first_received_datetime DATETIME2 NOT NULL,
+	last_received_datetime DATETIME2 NOT NULL,
+	CONSTRAINT PK_patient_reading_day PRIMARY KEY (device_id, reading_kind, reading_day),
+	INDEX IX_patient_reading_day_patient (patient_id, reading_kind, reading_day)
+);
+"""
+
+# --- MERGE Queries --- #
+set_watermark_stmt = """
+MERGE INTO import_watermark AS t
+USING (SELECT :source_name AS source_name, :high_water_mark AS high_water_mark) AS s
+ON t.source_name = s.source_name
+WHEN MATCHED AND s.high_water_mark > t.high_water_mark THEN
+	UPDATE SET t.high_water_mark = s.high_water_mark, t.modified_date = SYSDATETIME()
+WHEN NOT MATCHED THEN
+	INSERT (source_name, high_water_mark) VALUES (s.source_name, s.high_water_mark);
 """
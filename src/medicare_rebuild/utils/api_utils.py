@@ -1,8 +1,152 @@
+import json
 import logging
-from datetime import datetime
+import os
+import threading
+import time
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
 
 from shared_tools.rest_adapter import RestAdapter, RestAdapterConfig
 
+from medicare_rebuild.utils.cache_utils import (
+    ResponseCache,
+    mount_response_cache,
+    shared_response_cache,
+)
+
+
+# The user fields normalize_users keeps.
+user_select_fields = ["givenName", "surname", "displayName", "mail", "id"]
+
+
+def retry_after_seconds(res: requests.Response, attempt: int) -> float:
+    """Reads how long to wait before retrying a throttled request.
+    Retry-After may hold seconds or an HTTP date; without it the wait backs off exponentially up to a minute.
+
+    Args:
+        res (requests.Response): The throttled response.
+        attempt (int): Number of retries made so far.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    value = res.headers.get("Retry-After")
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    return float(min(2**attempt, 60))
+
+
+class TokenCache:
+    """
+    Access tokens cached until shortly before they expire, keyed by tenant, client and scope.
+    One cache is shared by every MSGraphApi instance, so repeated logins within a process are skipped.
+    With a path, tokens are also kept in a JSON file readable only by its owner, so they survive between runs.
+    """
+
+    def __init__(
+        self, path: Path | str | None = None, refresh_margin: int = 300, logger=None
+    ) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            path (Path, str): JSON file the tokens are persisted to. Defaults to None, in memory only (optional).
+            refresh_margin (int): Seconds before expiry at which a token counts as expired. Defaults to 300 (optional).
+            logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.path = Path(path) if path else None
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        self._loaded = True
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, entry in data.items():
+                self._tokens[key] = (entry["access_token"], entry["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable token cache {self.path}: {e}")
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    key: {"access_token": token, "expires_at": expires_at}
+                    for key, (token, expires_at) in self._tokens.items()
+                },
+                f,
+            )
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> str | None:
+        """
+        Gets a cached token that is not about to expire.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: The access token, or None if there is no fresh token.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._tokens.get(key)
+        if entry and entry[1] - self.refresh_margin > time.time():
+            return entry[0]
+        return None
+
+    def set(self, key: str, token: str, expires_in: float) -> None:
+        """
+        Caches a token.
+
+        Args:
+            key (str): The cache key.
+            token (str): The access token.
+            expires_in (float): Seconds until the token expires.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._tokens[key] = (token, time.time() + expires_in)
+            self._save()
+
+    def clear(self) -> None:
+        """
+        Forgets every cached token, including the persisted ones.
+        """
+        with self._lock:
+            self._tokens.clear()
+            self._loaded = True
+            if self.path is not None and self.path.exists():
+                self.path.unlink()
+
+
+shared_token_cache = TokenCache()
+
 
 class MSGraphApi:
     """
@@ -12,21 +156,71 @@ class MSGraphApi:
         tenant_id (str): The tenant ID for the Azure AD application.
         client_id (str): The client ID for the Azure AD application.
         client_secret (str): The client secret for the Azure AD application.
+        max_retries (int): Retries of a throttled (429) or unavailable (503, 504) request. Defaults to 5 (optional).
+        token_cache (TokenCache): Cache of access tokens. Defaults to the module-level shared_token_cache (optional).
+        response_cache (ResponseCache): Cache of GET responses, used when it has a path.
+            Defaults to the module-level shared_response_cache (optional).
         logger (Logger): Custom logger object (optional).
     """
 
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str, logger=None):
+    graph_url = "https://graph.microsoft.com/v1.0/"
+    scope = "https://graph.microsoft.com/.default"
+
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        max_retries: int = 5,
+        token_cache: TokenCache | None = None,
+        response_cache: ResponseCache | None = None,
+        logger=None,
+    ):
         self.logger = logger or logging.getLogger(__name__)
         self.tenant_id = tenant_id
         self.client_id = (client_id,)
         self.client_secret = client_secret
+        self.max_retries = max_retries
+        self.token_cache = token_cache or shared_token_cache
+        self.token_key = f"{tenant_id}:{client_id}:{self.scope}"
+        self.access_token: str | None = None
+        self.rest = RestAdapter(
+            RestAdapterConfig(base_url=self.graph_url), logger=self.logger
+        )
+        # Responses are keyed by tenant and client too, since the same URL returns another tenant's data.
+        mount_response_cache(
+            self.rest.session,
+            response_cache or shared_response_cache,
+            namespace=f"{tenant_id}:{client_id}",
+        )
 
-    def request_access_token(
-        self,
-    ) -> None:
+    def request_access_token(self, force: bool = False) -> None:
         """
         Uses tenant ID, client ID, and client secret to request an access token with privileges outlined in the application object.
+        A cached token is reused until shortly before it expires.
+
+        Args:
+            force (bool): Whether to request a new token even if a cached one is still fresh. Defaults to False (optional).
+        """
+        access_token = None if force else self.token_cache.get(self.token_key)
+        if access_token is None:
+            access_token = self._fetch_access_token()
+        else:
+            self.logger.debug("Using cached Microsoft Graph access token...")
+        self.access_token = access_token
+        self.rest.session.headers["Authorization"] = f"Bearer {access_token}"
+
+    def ensure_access_token(self) -> None:
+        """
+        Requests a new access token when the current one is missing or about to expire, so long jobs keep working.
         """
+        if (
+            self.access_token is None
+            or self.token_cache.get(self.token_key) != self.access_token
+        ):
+            self.request_access_token()
+
+    def _fetch_access_token(self) -> str:
         rest = RestAdapter(
             RestAdapterConfig(base_url="https://login.microsoftonline.com/"),
             logger=self.logger,
@@ -35,31 +229,92 @@ class MSGraphApi:
             "grant_type": "client_credentials",
             "client_id": self.client_id,
             "client_secret": self.client_secret,
-            "scope": "https://graph.microsoft.com/.default",
+            "scope": self.scope,
         }
         res = rest.post(f"{self.tenant_id}/oauth2/v2.0/token", data=data)
         assert isinstance(res, dict), "Expected a JSON object from the token endpoint"
         access_token = res.get("access_token")
-        headers = {"Authorization": f"Bearer {access_token}"}
-        self.rest = RestAdapter(
-            RestAdapterConfig(
-                base_url="https://graph.microsoft.com/v1.0/", headers=headers
-            ),
-            logger=self.logger,
+        assert isinstance(access_token, str), "Expected an access token"
+        # Client credential tokens last an hour unless the endpoint says otherwise.
+        self.token_cache.set(
+            self.token_key, access_token, float(res.get("expires_in", 3600))
         )
+        return access_token
 
-    def get_group_members(self, group_id: str) -> dict | list | str | bytes:
+    def get_group_members(
+        self, group_id: str, select: List[str] = user_select_fields
+    ) -> List[dict]:
         """
-        Get all members that belong to a specific group.
+        Get all members that belong to a specific group, across every page.
 
         Args:
             group_id (str): GUID of the desired group.
+            select (List[str]): Member fields to request. Defaults to the fields normalize_users keeps (optional).
 
         Returns:
-            dict: JSON serialized response body.
+            List[dict]: The group members.
+        """
+        return list(self.iter_group_members(group_id, select=select))
+
+    def _get_page(self, url: str, params: dict | None = None) -> Dict[str, Any]:
+        """
+        Gets one page of a Graph collection, waiting out throttling as told by Retry-After.
+
+        Args:
+            url (str): Absolute URL of the page.
+            params (dict): Query parameters. Defaults to None (optional).
+
+        Returns:
+            Dict[str, Any]: JSON serialized response body.
+
+        Raises:
+            requests.HTTPError: If the request fails, or is still throttled after max_retries.
         """
-        endpoint = f"groups/{group_id}/members"
-        return self.rest.get(endpoint)
+        attempt = 0
+        logged_in_again = False
+        self.ensure_access_token()
+        while True:
+            res = self.rest.session.get(url, params=params, timeout=60)
+            if res.status_code == 401 and not logged_in_again:
+                # The token was revoked or expired early; log in again once.
+                self.request_access_token(force=True)
+                logged_in_again = True
+                continue
+            if res.status_code in (429, 503, 504) and attempt < self.max_retries:
+                delay = retry_after_seconds(res, attempt)
+                self.logger.warning(
+                    f"Microsoft Graph returned {res.status_code}, retrying in {delay:.1f}s..."
+                )
+                time.sleep(delay)
+                attempt += 1
+                continue
+            res.raise_for_status()
+            return res.json()
+
+    def iter_group_members(
+        self,
+        group_id: str,
+        select: List[str] = user_select_fields,
+        page_size: int = 999,
+    ) -> Iterator[dict]:
+        """
+        Iterates over every member of a group, following @odata.nextLink across pages.
+
+        Args:
+            group_id (str): GUID of the desired group.
+            select (List[str]): Member fields to request. Defaults to the fields normalize_users keeps (optional).
+            page_size (int): Members per page, at most 999. Defaults to 999 (optional).
+
+        Yields:
+            dict: The next group member.
+        """
+        url: str | None = f"{self.graph_url}groups/{group_id}/members"
+        params: dict | None = {"$select": ",".join(select), "$top": page_size}
+        while url:
+            data = self._get_page(url, params)
+            yield from data.get("value", [])
+            # The next link already carries the query parameters.
+            url, params = data.get("@odata.nextLink"), None
 
 
 class TenoviApi:
@@ -69,19 +324,30 @@ class TenoviApi:
     Args:
         client_domain (str): The client domain for the Tenovi API.
         api_key (str): The API key for authentication.
+        base_url (str): Root URL of the Tenovi API, e.g. a local stub in tests. Defaults to 'https://api2.tenovi.com' (optional).
+        response_cache (ResponseCache): Cache of GET responses, used when it has a path.
+            Defaults to the module-level shared_response_cache (optional).
         logger (Logger): Custom logger object (optional).
     """
 
-    def __init__(self, client_domain: str, api_key: str, logger=None):
+    def __init__(
+        self,
+        client_domain: str,
+        api_key: str,
+        base_url: str = "https://api2.tenovi.com",
+        response_cache: ResponseCache | None = None,
+        logger=None,
+    ):
         self.logger = logger or logging.getLogger(__name__)
         headers = {"Authorization": f"Api-Key {api_key}"}
         self.rest = RestAdapter(
             RestAdapterConfig(
-                base_url=f"https://api2.tenovi.com/clients/{client_domain}/",
+                base_url=f"{base_url.rstrip('/')}/clients/{client_domain}/",
                 headers=headers,
             ),
             logger=self.logger,
         )
+        mount_response_cache(self.rest.session, response_cache or shared_response_cache)
 
     def get_devices(
         self,
@@ -99,6 +365,7 @@ class TenoviApi:
         hwi_device_id: str,
         metric: str = "",
         created_gte: datetime | str | None = None,
+        created_lte: datetime | str | None = None,
     ) -> dict | list | str | bytes:
         """
         Get readings for a specific device.
@@ -107,6 +374,7 @@ class TenoviApi:
             hwi_device_id (str): The hardware ID of the device.
             metric (str): The name of the metric data to filter by (optional).
             created_gte (datetime, str): The earliest creation date to filter by (optional).
+            created_lte (datetime, str): The latest creation date to filter by (optional).
 
         Returns:
             List[dict]: List of readings.
@@ -118,6 +386,10 @@ class TenoviApi:
             if not isinstance(created_gte, str):
                 created_gte = created_gte.strftime("%Y-%m-%dT%H:%M:%SZ")
             params["created__gte"] = created_gte
+        if created_lte:
+            if not isinstance(created_lte, str):
+                created_lte = created_lte.strftime("%Y-%m-%dT%H:%M:%SZ")
+            params["created__lte"] = created_lte
         return self.rest.get(
             f"hwi/hwi-devices/{hwi_device_id}/measurements/", params=params
         )
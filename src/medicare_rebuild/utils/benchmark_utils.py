@@ -0,0 +1,119 @@
+import json
+import time
+import tracemalloc
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+
+def measure(
+    func: Callable[[Any], Any],
+    make_input: Callable[[], Any],
+    rows: int,
+    repeat: int = 3,
+) -> Dict[str, float]:
+    """Measures the throughput and peak memory of a function.
+    A fresh input is built for every run, since most normalize functions change their input in place.
+    Timing takes the best of the runs; peak memory is traced in one extra run, so tracing does not slow the timed runs.
+
+    Args:
+        func (Callable[[Any], Any]): The function being measured.
+        make_input (Callable[[], Any]): Builds the argument passed to the function.
+        rows (int): Number of input rows, used for throughput.
+        repeat (int): Number of timed runs. Defaults to 3 (optional).
+
+    Returns:
+        Dict[str, float]: Input rows, best wall time in seconds, rows per second and peak traced memory in MB.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        arg = make_input()
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+
+    arg = make_input()
+    tracemalloc.start()
+    try:
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "rows": rows,
+        "seconds": round(best, 6),
+        "rows_per_sec": round(rows / best, 1) if best else float("inf"),
+        "peak_mb": round(peak / 1024**2, 3),
+    }
+
+
+def load_baseline(path: Path | str) -> Dict[str, Dict[str, float]]:
+    """Loads stored benchmark results.
+
+    Args:
+        path (Path, str): Path of the baseline JSON file.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Results keyed by benchmark name, or an empty dict if there is no baseline yet.
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, Dict[str, float]], path: Path | str) -> None:
+    """Stores benchmark results as the baseline later runs are compared against.
+
+    Args:
+        results (Dict[str, Dict[str, float]]): Results keyed by benchmark name.
+        path (Path, str): Path of the baseline JSON file.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float = 0.2,
+) -> pd.DataFrame:
+    """Compares benchmark results with a stored baseline.
+    A benchmark regresses when its throughput drops, or its peak memory grows, by more than the threshold.
+    Benchmarks missing from the baseline are reported but never flagged.
+
+    Args:
+        results (Dict[str, Dict[str, float]]): Results keyed by benchmark name.
+        baseline (Dict[str, Dict[str, float]]): Baseline results keyed by benchmark name.
+        threshold (float): Allowed relative change before flagging a regression. Defaults to 0.2 (optional).
+
+    Returns:
+        pd.DataFrame: One row per benchmark with current and baseline figures, their ratios and a regression flag.
+    """
+    records: List[Dict[str, Any]] = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        speed_ratio = memory_ratio = None
+        regression = False
+        if base:
+            speed_ratio = round(result["rows_per_sec"] / base["rows_per_sec"], 3)
+            if base["peak_mb"]:
+                memory_ratio = round(result["peak_mb"] / base["peak_mb"], 3)
+            regression = speed_ratio < 1 - threshold or (
+                memory_ratio is not None and memory_ratio > 1 + threshold
+            )
+        records.append(
+            {
+                "benchmark": name,
+                "rows_per_sec": result["rows_per_sec"],
+                "base_rows_per_sec": base["rows_per_sec"] if base else None,
+                "peak_mb": result["peak_mb"],
+                "base_peak_mb": base["peak_mb"] if base else None,
+                "speed_ratio": speed_ratio,
+                "memory_ratio": memory_ratio,
+                "regression": regression,
+            }
+        )
+    return pd.DataFrame.from_records(records)
@@ -0,0 +1,331 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import requests
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def normalize_url(url: str) -> str:
+    """Sorts the query parameters of a URL, so the same request always has the same cache key.
+
+    Args:
+        url (str): The request URL.
+
+    Returns:
+        str: The URL with its query parameters in a stable order.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+class ResponseCache:
+    """
+    On-disk cache of successful GET responses, keyed by method, URL and query parameters.
+    Each entry is a JSON metadata file and a body file. A fresh entry is served without a request; a stale one
+    is revalidated with If-None-Match when the API sent an ETag, otherwise refetched.
+    Total size is capped by evicting the least recently used entries. Files are readable only by their owner,
+    since responses may hold patient data.
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        ttls: Dict[str, float] | None = None,
+        default_ttl: float = 900,
+        max_bytes: int = 512 * 1024**2,
+        logger=None,
+    ) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            path (Path, str): Directory the responses are stored in. Defaults to None, caching disabled (optional).
+            ttls (Dict[str, float]): Seconds a response stays fresh, keyed by a regular expression searched in its URL.
+                The first match wins. Defaults to None (optional).
+            default_ttl (float): Seconds a response stays fresh when no pattern matches its URL. Defaults to 900 (optional).
+            max_bytes (int): Maximum total size of the stored responses. Defaults to 512 MB (optional).
+            logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.path = Path(path) if path else None
+        self.ttls = [
+            (re.compile(pattern), ttl) for pattern, ttl in (ttls or {}).items()
+        ]
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._size: int | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def ttl(self, url: str) -> float:
+        """
+        Gets how long a response stays fresh.
+
+        Args:
+            url (str): The request URL.
+
+        Returns:
+            float: Seconds from when the response was stored.
+        """
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    @staticmethod
+    def key(method: str, url: str, namespace: str = "") -> str:
+        """
+        Builds the cache key of a request.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL, including its query parameters.
+            namespace (str): Separates clients whose credentials see different data at the same URL. Defaults to '' (optional).
+
+        Returns:
+            str: Hex digest used as the entry's file name.
+        """
+        raw = f"{namespace}\n{method.upper()}\n{normalize_url(url)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _files(self, key: str) -> Tuple[Path, Path]:
+        assert self.path is not None
+        return self.path / f"{key}.json", self.path / f"{key}.body"
+
+    def get(self, key: str) -> Tuple[Dict[str, Any], bytes] | None:
+        """
+        Reads an entry and marks it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Tuple[Dict[str, Any], bytes]: The entry's metadata and body, or None if it is not cached.
+        """
+        if not self.enabled:
+            return None
+        meta_path, body_path = self._files(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        # The metadata file's modification time is the entry's last use, which eviction goes by.
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return meta, body
+
+    def _write(self, path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _entry_size(self, key: str) -> int:
+        size = 0
+        for path in self._files(key):
+            try:
+                size += path.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        assert self.path is not None
+        entries = []
+        for meta_path in self.path.glob("*.json"):
+            key = meta_path.stem
+            try:
+                used_at = meta_path.stat().st_mtime
+            except OSError:
+                continue
+            entries.append((used_at, key, self._entry_size(key)))
+        return entries
+
+    def set(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+        """
+        Stores an entry, then evicts the least recently used entries while the cache is over max_bytes.
+
+        Args:
+            key (str): The cache key.
+            meta (Dict[str, Any]): The entry's metadata: URL, status, headers, ETag and when it was stored.
+            body (bytes): The response body.
+        """
+        if not self.enabled:
+            return
+        assert self.path is not None
+        data = json.dumps(meta).encode("utf-8")
+        if len(data) + len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if self._size is None:
+                self.path.mkdir(parents=True, exist_ok=True)
+                os.chmod(self.path, 0o700)
+                self._size = sum(size for _, _, size in self._scan())
+            old_size = self._entry_size(key)
+            meta_path, body_path = self._files(key)
+            # The body goes first, so a metadata file always points at a complete body.
+            self._write(body_path, body)
+            self._write(meta_path, data)
+            self._size += len(data) + len(body) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def refresh(self, key: str, meta: Dict[str, Any]) -> None:
+        """
+        Restarts an entry's TTL after the API confirmed it is unchanged.
+
+        Args:
+            key (str): The cache key.
+            meta (Dict[str, Any]): The entry's metadata.
+        """
+        if not self.enabled:
+            return
+        meta["stored_at"] = time.time()
+        with self._lock:
+            self._write(self._files(key)[0], json.dumps(meta).encode("utf-8"))
+
+    def _evict(self) -> None:
+        assert self._size is not None
+        evicted = 0
+        for _, key, size in sorted(self._scan()):
+            if self._size <= self.max_bytes:
+                break
+            for path in self._files(key):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._size -= size
+            evicted += 1
+        self.logger.debug(f"Evicted {evicted} responses from {self.path}")
+
+    def clear(self) -> None:
+        """
+        Deletes every stored response.
+        """
+        if not self.enabled:
+            return
+        assert self.path is not None
+        with self._lock:
+            for path in self.path.glob("*.json"):
+                for entry_path in self._files(path.stem):
+                    try:
+                        entry_path.unlink()
+                    except OSError:
+                        pass
+            self._size = 0
+
+
+# Freshness of the slow-changing endpoints: the Tenovi device list and Graph group members.
+default_ttls = {
+    r"/hwi/hwi-devices/?(\?|$)": 3600.0,
+    r"/groups/[^/]+/members": 3600.0,
+}
+
+shared_response_cache = ResponseCache(ttls=default_ttls)
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter that serves GET requests from a ResponseCache. Mount it on a requests.Session
+    so every client built on the session is cached without changing how it makes requests.
+    """
+
+    def __init__(self, cache: ResponseCache, namespace: str = "", **kwargs) -> None:
+        """
+        Initializes the adapter.
+
+        Args:
+            cache (ResponseCache): The response cache.
+            namespace (str): Part of every cache key, e.g. the tenant whose token signs the requests. Defaults to '' (optional).
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.namespace = namespace
+
+    def _cached_response(
+        self, request: requests.PreparedRequest, meta: Dict[str, Any], body: bytes
+    ) -> requests.Response:
+        res = requests.Response()
+        res.status_code = meta["status"]
+        res.reason = meta.get("reason") or ""
+        res.headers = CaseInsensitiveDict(meta["headers"])
+        res.encoding = meta.get("encoding")
+        res.url = meta["url"]
+        res.request = request
+        res._content = body
+        res.from_cache = True  # type: ignore[attr-defined]
+        return res
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:  # type: ignore[override]
+        if request.method != "GET" or kwargs.get("stream") or not self.cache.enabled:
+            return super().send(request, **kwargs)
+        url = request.url or ""
+        key = self.cache.key(request.method, url, self.namespace)
+        entry = self.cache.get(key)
+        if entry is not None:
+            meta, body = entry
+            if time.time() - meta["stored_at"] < self.cache.ttl(url):
+                self.cache.hits += 1
+                return self._cached_response(request, meta, body)
+            if meta.get("etag"):
+                request.headers["If-None-Match"] = meta["etag"]
+
+        res = super().send(request, **kwargs)
+        if res.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            self.cache.refresh(key, meta)
+            return self._cached_response(request, meta, body)
+        self.cache.misses += 1
+        if res.status_code == 200:
+            self.cache.set(
+                key,
+                {
+                    "url": res.url,
+                    "status": res.status_code,
+                    "reason": res.reason,
+                    "headers": dict(res.headers),
+                    "encoding": res.encoding,
+                    "etag": res.headers.get("ETag"),
+                    "stored_at": time.time(),
+                },
+                res.content,
+            )
+        return res
+
+
+def mount_response_cache(
+    session: requests.Session, cache: ResponseCache, namespace: str = ""
+) -> None:
+    """Serves a session's GET requests from a response cache, if the cache is enabled.
+
+    Args:
+        session (requests.Session): The session to mount the cache on.
+        cache (ResponseCache): The response cache.
+        namespace (str): Part of every cache key, e.g. the tenant whose token signs the requests. Defaults to '' (optional).
+    """
+    if not cache.enabled:
+        return
+    adapter = CachingAdapter(cache, namespace=namespace)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
@@ -2,6 +2,8 @@ import re
 import html
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Tuple
 
 from medicare_rebuild.utils.enums import (
     insurance_keywords,
@@ -11,6 +13,99 @@ from medicare_rebuild.utils.enums import (
 )
 
 
+class KeywordMatcher:
+    """Compiled matcher for a keyword dictionary, built once and reused for every value.
+
+    Keywords are either plain strings (as in relationship_keywords) or lists of keyword sets
+    (as in insurance_keywords), where every keyword of a set must be present in the value.
+    A keyword matches as a whole word, case-insensitively. Standard names are tried in dictionary
+    order and the first match wins.
+
+    Keywords made only of word characters are matched against the value's word tokens through
+    an index from token to candidate keyword sets; any other keyword falls back to a precompiled regex.
+    """
+
+    def __init__(self, keywords: dict):
+        self.keywords = keywords
+        # Each rule is (standard name, word tokens, regex patterns), kept in priority order.
+        self._rules: List[Tuple[str, FrozenSet[str], List[re.Pattern]]] = []
+        self._index: Dict[str, List[int]] = {}
+        self._regex_only: List[int] = []
+        for standard_name, keyword_sets in keywords.items():
+            if isinstance(keyword_sets, str):
+                keyword_sets = [[keyword_sets]]
+            for keyword_set in keyword_sets:
+                tokens, patterns = set(), []
+                for keyword in keyword_set:
+                    keyword = keyword.lower()
+                    if re.fullmatch(r"\w+", keyword):
+                        tokens.add(keyword)
+                    else:
+                        patterns.append(re.compile(r"\b" + re.escape(keyword) + r"\b"))
+                rule_idx = len(self._rules)
+                self._rules.append((standard_name, frozenset(tokens), patterns))
+                if tokens:
+                    # Indexing on a single token is enough; the rest are checked on the candidate.
+                    self._index.setdefault(min(tokens), []).append(rule_idx)
+                else:
+                    self._regex_only.append(rule_idx)
+
+    def match(self, value: str) -> str | None:
+        """Finds the standard name for a value.
+
+        Args:
+            value (str): The value to be standardized.
+
+        Returns:
+            str | None: The standard name of the first matching keyword set, or None.
+        """
+        value = value.lower()
+        tokens = set(re.findall(r"\w+", value))
+        candidates = set(self._regex_only)
+        for token in tokens:
+            candidates.update(self._index.get(token, ()))
+        for rule_idx in sorted(candidates):
+            standard_name, rule_tokens, patterns = self._rules[rule_idx]
+            if rule_tokens <= tokens and all(p.search(value) for p in patterns):
+                return standard_name
+        return None
+
+    def search(self, value: str, keep_original=False) -> str | float:
+        """Searches for a keyword being present in the value.
+
+        Args:
+            value (str): The value to be standardized.
+            keep_original (bool): Option for keeping the original value provided.
+
+        Returns:
+            str: The standardized name, found as the key in the keyword list.
+        """
+        result = self.match(value)
+        if result is None:
+            return value if keep_original else np.nan
+        return result
+
+
+_keyword_matchers: Dict[int, Tuple[dict, KeywordMatcher]] = {}
+
+
+def get_keyword_matcher(keywords: dict) -> KeywordMatcher:
+    """Gets the compiled matcher for a keyword dictionary, compiling it on first use.
+    Matchers are cached per dictionary object, so keyword dictionaries should not be mutated after use.
+
+    Args:
+        keywords (dict): The keyword dictionary, holding the desired name and the keyword.
+
+    Returns:
+        KeywordMatcher: The compiled matcher.
+    """
+    cached = _keyword_matchers.get(id(keywords))
+    if cached is None or cached[0] is not keywords:
+        cached = (keywords, KeywordMatcher(keywords))
+        _keyword_matchers[id(keywords)] = cached
+    return cached[1]
+
+
 def keyword_search(value: str, keywords: dict, keep_original=False) -> str | float:
     """Searches for a keyword being present in the value.
 
@@ -22,10 +117,7 @@ def keyword_search(value: str, keywords: dict, keep_original=False) -> str | flo
     Returns:
         str: The standardized name, found as the key in the keyword list.
     """
-    for standard_name, keyword in keywords.items():
-        if re.search(r"\b" + re.escape(keyword.lower()) + r"\b", value.lower()):
-            return standard_name
-    return value if keep_original else np.nan
+    return get_keyword_matcher(keywords).search(value, keep_original)
 
 
 def keyword_list_search(value: str, keywords: dict, keep_original=False) -> str | float:
@@ -40,14 +132,7 @@ def keyword_list_search(value: str, keywords: dict, keep_original=False) -> str
     Returns:
         str: The standardized name, found as the key in the keyword list.
     """
-    for standard_name, keyword_sets in keywords.items():
-        for keyword_set in keyword_sets:
-            if all(
-                re.search(r"\b" + re.escape(keyword.lower()) + r"\b", value.lower())
-                for keyword in keyword_set
-            ):
-                return standard_name
-    return value if keep_original else np.nan
+    return get_keyword_matcher(keywords).search(value, keep_original)
 
 
 def extract_regex_pattern(
@@ -69,6 +154,126 @@ def extract_regex_pattern(
     return value if keep_original else np.nan
 
 
+class MemoizedTransformer:
+    """Applies a scalar standardize function to a whole Series, once per distinct value.
+
+    The Series is factorized, the function runs only on values missing from a bounded LRU cache,
+    and the results are broadcast back by code. The cache outlives a single call, so repeated runs
+    over similar exports reuse earlier results. Output matches Series.apply(func, args=args).
+    """
+
+    def __init__(self, func: Callable, args: tuple = (), maxsize: int = 10_000):
+        """
+        Args:
+            func (Callable): The scalar standardize function.
+            args (tuple): Extra positional arguments passed to the function. Defaults to () (optional).
+            maxsize (int): Maximum number of cached distinct values. Defaults to 10,000 (optional).
+        """
+        self.func = func
+        self.args = args
+        self.maxsize = maxsize
+        self.cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def transform_value(self, value) -> Any:
+        """Standardizes a single value through the cache.
+
+        Args:
+            value: The value to be standardized.
+
+        Returns:
+            The standardized value.
+        """
+        # Keyed by type as well, since 1, 1.0 and True hash alike but may standardize differently.
+        key = (type(value), value)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.misses += 1
+        result = self.func(value, *self.args)
+        self.cache[key] = result
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def factorize(col: pd.Series) -> Tuple[np.ndarray, list]:
+        """Encodes a Series as codes into its distinct values. Null values get the code -1.
+        pd.factorize alone merges 1, 1.0 and True, so object columns mixing value types are factorized
+        on (type, value) pairs instead.
+
+        Args:
+            col (pd.Series): The values to be encoded.
+
+        Returns:
+            Tuple[np.ndarray, list]: The code of each value and the distinct values.
+        """
+        if col.dtype == object:
+            notna = col.notna().to_numpy()
+            types = col.map(type)
+            if types[notna].nunique() > 1:
+                keys = pd.Series(
+                    [
+                        (value_type, value) if is_value else None
+                        for value_type, value, is_value in zip(types, col, notna)
+                    ],
+                    dtype=object,
+                )
+                codes, uniques = pd.factorize(keys)
+                return codes, [value for _, value in uniques]
+        codes, uniques = pd.factorize(col)
+        return codes, list(uniques)
+
+    def __call__(self, col: pd.Series) -> pd.Series:
+        """Standardizes every value of a Series.
+
+        Args:
+            col (pd.Series): The values to be standardized.
+
+        Returns:
+            pd.Series: The standardized values, aligned with the original index.
+        """
+        if col.empty:
+            return col.apply(self.func, args=self.args)
+        codes, uniques = self.factorize(col)
+        results = np.empty(len(uniques) + 1, dtype=object)
+        for i, value in enumerate(uniques):
+            results[i] = self.transform_value(value)
+        out = results.take(codes)
+        # Null values are factorized together, but None and NaN may standardize differently.
+        na_positions = np.flatnonzero(codes == -1)
+        if na_positions.size:
+            values = col.to_numpy(dtype=object)
+            na_results: Dict[type, Any] = {}
+            for pos in na_positions:
+                value = values[pos]
+                if type(value) not in na_results:
+                    na_results[type(value)] = self.func(value, *self.args)
+                out[pos] = na_results[type(value)]
+        return pd.Series(out, index=col.index, name=col.name).infer_objects()
+
+
+_transformers: Dict[Tuple[Callable, tuple], MemoizedTransformer] = {}
+
+
+def memoized(func: Callable, args: tuple = ()) -> MemoizedTransformer:
+    """Gets the shared MemoizedTransformer for a standardize function and its arguments.
+
+    Args:
+        func (Callable): The scalar standardize function.
+        args (tuple): Extra positional arguments passed to the function. Defaults to () (optional).
+
+    Returns:
+        MemoizedTransformer: The transformer, created on first use.
+    """
+    key = (func, args)
+    if key not in _transformers:
+        _transformers[key] = MemoizedTransformer(func, args)
+    return _transformers[key]
+
+
 # --- Standardize Functions ---
 """
 Standardize functions are methods used to transform and clean data within a Pandas DataFrame.
@@ -125,6 +330,18 @@ def standardize_state(state: str) -> str:
     return str(result).upper()
 
 
+def standardize_state_col(col: pd.Series) -> pd.Series:
+    """Column-wide standardize_state, standardizing each distinct value once.
+
+    Args:
+        col (pd.Series): The values to be standardized.
+
+    Returns:
+        pd.Series: The standardized US state abbreviations.
+    """
+    return memoized(standardize_state)(col)
+
+
 def standardize_mbi(mbi: str) -> str | float:
     """Standardizes medicare beneficiary ID strings. Trims whitespace and lowers the text.
     Regex matching attempts to find a medicare beneficiary ID and extracts it.
@@ -172,6 +389,18 @@ def standardize_insurance_name(name: str) -> str | float:
     return keyword_list_search(name, insurance_keywords, keep_original=True)
 
 
+def standardize_insurance_name_col(col: pd.Series) -> pd.Series:
+    """Column-wide standardize_insurance_name, standardizing each distinct value once.
+
+    Args:
+        col (pd.Series): The values to be standardized.
+
+    Returns:
+        pd.Series: The standardized insurance names.
+    """
+    return memoized(standardize_insurance_name)(col)
+
+
 def standardize_insurance_id(ins_id: str) -> str | float:
     """Standardizes insurance ID strings. Trims whitespace and uppers the text.
     Any non-alphanumeric character is replaced with empty string.
@@ -227,6 +456,49 @@ def fill_primary_payer_id(row: pd.Series) -> str | float:
     return row["Insurance ID:"]
 
 
+def null_nan_strings(col: pd.Series) -> pd.Series:
+    """Replaces 'nan' strings (any case) left behind by str() conversions with null values.
+
+    Args:
+        col (pd.Series): The values to be cleaned.
+
+    Returns:
+        pd.Series: The values with 'nan' strings nulled.
+    """
+    is_nan_str = col.astype(str).str.contains(r"^nan$", case=False, regex=True)
+    return col.mask(is_nan_str, np.nan)
+
+
+def fill_primary_payer_col(df: pd.DataFrame) -> pd.Series:
+    """Column-wise fill_primary_payer. Only the insurance name, insurance ID and medicare beneficiary ID columns are read.
+
+    Args:
+        df (pandas.DataFrame): Dataframe holding the insurance and medicare beneficiary ID columns.
+
+    Returns:
+        pd.Series: The standardized primary payer names.
+    """
+    name = null_nan_strings(df["Insurance Name:"])
+    ins_id = null_nan_strings(df["Insurance ID:"])
+    mbi = null_nan_strings(df["Medicare ID number"])
+    return name.mask(name.isna() & ins_id.isna() & mbi.notna(), "Medicare Part B")
+
+
+def fill_primary_payer_id_col(df: pd.DataFrame) -> pd.Series:
+    """Column-wise fill_primary_payer_id. Only the insurance name, insurance ID and medicare beneficiary ID columns are read.
+
+    Args:
+        df (pandas.DataFrame): Dataframe holding the insurance and medicare beneficiary ID columns.
+
+    Returns:
+        pd.Series: The standardized primary payer IDs.
+    """
+    ins_id = null_nan_strings(df["Insurance ID:"])
+    mbi = null_nan_strings(df["Medicare ID number"])
+    is_medicare = df["Insurance Name:"] == "Medicare Part B"
+    return ins_id.mask(is_medicare & ins_id.isna(), mbi)
+
+
 def standardize_call_time(call_time) -> int | float:
     """Standardizes call time in seconds.
     Converts value to a timedelta object and then calculates total seconds.
@@ -291,6 +563,18 @@ def standardize_emcontact_relationship(name: str) -> str | float:
     return keyword_search(name, relationship_keywords)
 
 
+def standardize_emcontact_relationship_col(col: pd.Series) -> pd.Series:
+    """Column-wide standardize_emcontact_relationship, standardizing each distinct value once.
+
+    Args:
+        col (pd.Series): The values to be standardized.
+
+    Returns:
+        pd.Series: The standardized relationship names, NaN where none matched.
+    """
+    return memoized(standardize_emcontact_relationship)(col)
+
+
 def standardize_race(race: str) -> str | float:
     """Standardizes patient race strings.
     Trims whitespace and titles the text.
@@ -307,6 +591,18 @@ def standardize_race(race: str) -> str | float:
     return keyword_list_search(race, race_keywords, keep_original=True)
 
 
+def standardize_race_col(col: pd.Series) -> pd.Series:
+    """Column-wide standardize_race, standardizing each distinct value once.
+
+    Args:
+        col (pd.Series): The values to be standardized.
+
+    Returns:
+        pd.Series: The standardized races.
+    """
+    return memoized(standardize_race)(col)
+
+
 def standardize_weight(weight: str) -> int | float:
     """Standardizes patient weight strings. Search values for common characters indicating height and remove them.
     Remove all characters that aren't numeric. Check if weight string has more than 3 characters and trim values to only 3 characers.
@@ -497,23 +793,23 @@ def normalize_patients(df: pd.DataFrame) -> pd.DataFrame:
     df["Social Security"] = (
         df["Social Security"].astype(str).str.replace(r"\D", "", regex=True)
     )
-    df["Race"] = df["Race"].apply(standardize_race)
-    df["Weight"] = df["Weight"].apply(standardize_weight)
-    df["Height"] = df["Height"].apply(standardize_height)
+    df["Race"] = standardize_race_col(df["Race"])
+    df["Weight"] = memoized(standardize_weight)(df["Weight"])
+    df["Height"] = memoized(standardize_height)(df["Height"])
 
     # The logic in standardize name can be used for address text as well.
     df["Mailing Address"] = df["Mailing Address"].apply(
         standardize_name, args=(r"[^a-zA-Z0-9\s#.-/]",)
     )
-    df["City"] = df["City"].apply(standardize_name, args=(r"[^a-zA-Z-]",))
-    df["State"] = df["State"].apply(standardize_state)
+    df["City"] = memoized(standardize_name, args=(r"[^a-zA-Z-]",))(df["City"])
+    df["State"] = standardize_state_col(df["State"])
     df["Zip code"] = df["Zip code"].astype(str).str.split("-", n=1).str[0]
 
-    df["EmergencyRelationship"] = df["EmergencyName"].apply(
-        standardize_emcontact_relationship
+    df["EmergencyRelationship"] = standardize_emcontact_relationship_col(
+        df["EmergencyName"]
     )
-    df["EmergencyRelationship2"] = df["EmergencyName2"].apply(
-        standardize_emcontact_relationship
+    df["EmergencyRelationship2"] = standardize_emcontact_relationship_col(
+        df["EmergencyName2"]
     )
     df["EmergencyName"] = df["EmergencyName"].apply(
         standardize_name, args=(r"[^a-zA-Z\s.-/()]",)
@@ -529,13 +825,13 @@ def normalize_patients(df: pd.DataFrame) -> pd.DataFrame:
     )
 
     df["Medicare ID number"] = df["Medicare ID number"].apply(standardize_mbi)
-    df["DX_Code"] = df["DX_Code"].apply(standardize_dx_code)
+    df["DX_Code"] = memoized(standardize_dx_code)(df["DX_Code"])
     df["Insurance ID:"] = df["Insurance ID:"].apply(standardize_insurance_id)
     df["InsuranceID2"] = df["InsuranceID2"].apply(standardize_insurance_id)
-    df["Insurance Name:"] = df["Insurance Name:"].apply(standardize_insurance_name)
-    df["InsuranceName2"] = df["InsuranceName2"].apply(standardize_insurance_name)
-    df["Insurance Name:"] = df.apply(fill_primary_payer, axis=1)
-    df["Insurance ID:"] = df.apply(fill_primary_payer_id, axis=1)
+    df["Insurance Name:"] = standardize_insurance_name_col(df["Insurance Name:"])
+    df["InsuranceName2"] = standardize_insurance_name_col(df["InsuranceName2"])
+    df["Insurance Name:"] = fill_primary_payer_col(df)
+    df["Insurance ID:"] = fill_primary_payer_id_col(df)
 
     previous_patient_statuses = {
         "DO NOT CALL": "Do Not Call",
@@ -691,44 +987,141 @@ def normalize_bg_readings(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-# def patient_check_failed_data(df: pd.DataFrame) -> pd.DataFrame:
-#     failed_df = df[df['phone_number'].apply(lambda x: len(str(x)) != 11)]
-#     failed_df.loc[failed_df['phone_number'].apply(lambda x: len(str(x)) != 11), 'error_type'] = 'phone number length error'
-#     failed_df = df[df['social_security'].apply(lambda x: len(str(x)) != 9)]
-#     failed_df.loc[failed_df['social_security'].apply(lambda x: len(str(x)) != 9), 'error_type'] = 'social security length error'
-#     failed_df = df[df['zipcode'].apply(lambda x: len(str(x)) != 5)]
-#     failed_df.loc[failed_df['zipcode'].apply(lambda x: len(str(x)) != 5), 'error_type'] = 'zipcode length error'
-#     failed_df = df[df['emergency_phone_number'].apply(lambda x: len(str(x)) != 11)]
-#     failed_df.loc[failed_df['emergency_phone_number'].apply(lambda x: len(str(x)) != 11), 'error_type'] = 'phone number length error'
-#     failed_df = df[df['emergency_phone_number2'].apply(lambda x: len(str(x)) != 11)]
-#     failed_df.loc[failed_df['emergency_phone_number2'].apply(lambda x: len(str(x)) != 11), 'error_type'] = 'phone number length error'
-#     failed_df = df[df['medicare_beneficiary_id'].apply(lambda x: len(str(x)) != 11)]
-#     failed_df.loc[failed_df['medicare_beneficiary_id'].apply(lambda x: len(str(x)) != 11), 'error_type'] = 'medicare beneficiary id length error'
-#     failed_df = df[df['primary_payer_id'].apply(lambda x: len(str(x)) >= 30)]
-#     failed_df.loc[failed_df['primary_payer_id'].apply(lambda x: len(str(x)) >= 30), 'error_type'] = 'primary payer id length error'
-#     failed_df = df[df['secondary_payer_id'].apply(lambda x: len(str(x)) >= 30)]
-#     failed_df.loc[failed_df['secondary_payer_id'].apply(lambda x: len(str(x)) >= 30), 'error_type'] = 'secondary payer id length error'
-#     missing_df = df[df[['primary_payer_id', 'primary_payer_name']].isnull().all(axis=1)]
-#     missing_df['error_type'] = 'missing insurance information'
-#     duplicate_df = df[df.duplicated(subset=['first_name', 'last_name', 'date_of_birth'], keep=False)]
-#     duplicate_df['error_type'] = 'duplicate patient'
-#     duplicate_df.sort_values(by=['first_name', 'last_name'])
-#     failed_df = pd.concat([failed_df, duplicate_df, missing_df])
-#     failed_df.insert(0, 'error_type', failed_df.pop('error_type'))
-#     return failed_df
+# Tenovi metric names and the SharePoint readings columns their values map to.
+tenovi_metric_columns = {
+    "glucose": {"value_1": "BG_Reading"},
+    "blood_pressure": {
+        "value_1": "BP_Reading_Systolic",
+        "value_2": "BP_Reading_Diastolic",
+    },
+}
+
+
+def split_tenovi_readings(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Splits Tenovi measurements by metric into the columns of the SharePoint readings exports,
+    so they can be passed through normalize_bg_readings and normalize_bp_readings.
+    Tenovi's patient_id is the external ID given to the device at fulfillment, which is the SharePoint ID.
+    Timestamps are converted to naive UTC. Metrics other than glucose and blood pressure are dropped.
+    Each reading keeps the index of its measurement, so loaded readings can be traced back to it.
+
+    Args:
+        df (pd.DataFrame): Tenovi measurements, one row per measurement.
+
+    Returns:
+        Dict[str, pd.DataFrame]: Readings keyed by metric: 'glucose' and 'blood_pressure'.
+    """
+    # Fields missing from every measurement in the batch, e.g. value_2 with no blood pressure readings, are left empty.
+    df = df.reindex(
+        columns=[
+            "metric",
+            "patient_id",
+            "device_name",
+            "timestamp",
+            "created",
+            "value_1",
+            "value_2",
+        ]
+    )
+    readings = {}
+    for metric, value_cols in tenovi_metric_columns.items():
+        metric_df = df[df["metric"] == metric]
+        out = pd.DataFrame(
+            {
+                "SharePoint_ID": pd.to_numeric(
+                    metric_df["patient_id"], errors="coerce"
+                ),
+                "Device_Model": metric_df["device_name"],
+                "Time_Recorded": pd.to_datetime(
+                    metric_df["timestamp"], utc=True
+                ).dt.tz_localize(None),
+                "Time_Recieved": pd.to_datetime(
+                    metric_df["created"], utc=True
+                ).dt.tz_localize(None),
+            }
+        )
+        for value_col, col in value_cols.items():
+            out[col] = pd.to_numeric(metric_df[value_col], errors="coerce")
+        out["Manual_Reading"] = False
+        readings[metric] = out
+    return readings
+
+
+def drop_vendor_readings(df: pd.DataFrame, vendor: str) -> pd.DataFrame:
+    """Drops the device readings of a vendor, e.g. when they are harvested from the vendor's own API.
+    Devices are matched on the vendor name in their model, as standardize_vendor does. Manual readings are kept.
+
+    Args:
+        df (pd.DataFrame): Normalized glucose or blood pressure readings.
+        vendor (str): The vendor name to look for in the device model.
+
+    Returns:
+        pd.DataFrame: The readings of other vendors' devices and the manual readings.
+    """
+    from_vendor = df["temp_device"].str.contains(vendor, case=False, na=False)
+    is_manual = df["is_manual"].eq(1).fillna(False).astype(bool)
+    return df[~from_vendor | is_manual]
+
+
+# Maximum string length of each patient column in the database, with the label used for rejected rows.
+patient_db_constraints = {
+    "phone_number": (11, "phone number length error"),
+    "social_security": (9, "social security length error"),
+    "temp_state": (2, "state length error"),
+    "zipcode": (5, "zipcode length error"),
+    "emergency_phone_number": (11, "emergency phone number length error"),
+    "emergency_phone_number2": (11, "emergency phone number 2 length error"),
+    "medicare_beneficiary_id": (11, "medicare beneficiary id length error"),
+    "primary_payer_id": (30, "primary payer id length error"),
+    "secondary_payer_id": (30, "secondary payer id length error"),
+}
+
+
+def split_patient_db_constraints(
+    df: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Splits patients into rows that fit the database column lengths and rows that do not.
+    Every constraint is checked in one vectorized pass and the frame is filtered once.
+
+    Args:
+        df (pandas.DataFrame): Normalized patient dataframe.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The valid rows, and the rejected rows with an
+            'error_type' column listing every constraint they failed.
+    """
+    error_type = pd.Series("", index=df.index)
+    for col, (max_len, label) in patient_db_constraints.items():
+        # Length of str(value), so nulls count as 'nan' like the database load sees them.
+        too_long = df[col].astype(str).str.len() > max_len
+        error_type = error_type.mask(too_long, error_type + label + ", ")
+    failed = error_type != ""
+    failed_df = df[failed].copy()
+    failed_df.insert(0, "error_type", error_type[failed].str.rstrip(", "))
+    return df[~failed], failed_df
 
 
 def check_patient_db_constraints(df: pd.DataFrame) -> pd.DataFrame:
-    df = df[df["phone_number"].apply(lambda x: len(str(x)) <= 11)]
-    df = df[df["social_security"].apply(lambda x: len(str(x)) <= 9)]
-    df = df[df["temp_state"].apply(lambda x: len(str(x)) <= 2)]
-    df = df[df["zipcode"].apply(lambda x: len(str(x)) <= 5)]
-    df = df[df["emergency_phone_number"].apply(lambda x: len(str(x)) <= 11)]
-    df = df[df["emergency_phone_number2"].apply(lambda x: len(str(x)) <= 11)]
-    df = df[df["medicare_beneficiary_id"].apply(lambda x: len(str(x)) <= 11)]
-    df = df[df["primary_payer_id"].apply(lambda x: len(str(x)) <= 30)]
-    df = df[df["secondary_payer_id"].apply(lambda x: len(str(x)) <= 30)]
-    return df
+    """Drops patients whose values exceed the database column lengths.
+
+    Args:
+        df (pandas.DataFrame): Normalized patient dataframe.
+
+    Returns:
+        pd.DataFrame: The rows that fit the database constraints.
+    """
+    return split_patient_db_constraints(df)[0]
+
+
+def patient_check_failed_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Gets the patients rejected by the database constraints, labelled with the constraints they failed.
+
+    Args:
+        df (pandas.DataFrame): Normalized patient dataframe.
+
+    Returns:
+        pd.DataFrame: The rejected rows, with an 'error_type' column first.
+    """
+    return split_patient_db_constraints(df)[1]
 
 
 def add_id_col(df: pd.DataFrame, id_df: pd.DataFrame, col: str) -> pd.DataFrame:
@@ -745,3 +1138,37 @@ def add_id_col(df: pd.DataFrame, id_df: pd.DataFrame, col: str) -> pd.DataFrame:
     df = pd.merge(df, id_df, on=col)
     df.drop(columns=[col], inplace=True)
     return df
+
+
+def map_id_col(
+    df: pd.DataFrame, id_map: pd.Series, col: str | List[str]
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """Resolves an ID column by looking up the specified column in an ID map. Remove specified column after lookup.
+    Unlike add_id_col, the rows are never multiplied, and unmatched keys are returned for reporting.
+
+    Args:
+        df (pandas.DataFrame): Target dataframe requiring ID column.
+        id_map (pandas.Series): IDs indexed by unique key values. The Series name is used as the ID column name.
+            A key of several columns is looked up in an ID map with a MultiIndex of the same columns.
+        col (str, List[str]): Column name, or column names of a key of several columns, to be looked up and deleted.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.Series]: Target dataframe with newly added ID column, limited to matched rows,
+            and the key values that had no match, as tuples for a key of several columns.
+    """
+    if isinstance(col, list):
+        keys = pd.MultiIndex.from_frame(df[col])
+        ids = pd.Series(id_map.reindex(keys).to_numpy(), index=df.index)
+        matched = ids.notna()
+        unmatched = pd.Series(
+            keys[~matched.to_numpy()].tolist(),
+            index=df.index[~matched],
+            dtype=object,
+        )
+    else:
+        ids = df[col].map(id_map)
+        matched = ids.notna()
+        unmatched = df.loc[~matched, col]
+    df = df[matched].drop(columns=col)
+    df[id_map.name] = ids[matched].astype(id_map.dtype)
+    return df, unmatched
@@ -1,22 +1,299 @@
 import logging
+import re
+import threading
+import time
+import numpy as np
 import pandas as pd
-from typing import List, Literal
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Literal, Tuple
 from sqlalchemy import create_engine, event, text, Row
-from sqlalchemy.engine import URL
+from sqlalchemy.engine import URL, Engine
 from sqlalchemy.orm import sessionmaker, Session
 
 
+def statement_preview(statement: str, limit: int = 300) -> str:
+    """Shortens a SQL statement to one line of at most limit characters, for logging.
+
+    Args:
+        statement (str): The SQL statement.
+        limit (int): Maximum length of the preview. Defaults to 300 (optional).
+
+    Returns:
+        str: The single line preview.
+    """
+    preview = " ".join(statement[: limit * 2].split())
+    if len(preview) > limit or len(statement) > limit * 2:
+        return preview[: limit - 3] + "..."
+    return preview
+
+
+class EngineRegistry:
+    """
+    Process-wide registry of SQLAlchemy engines, keyed by (host, database, username).
+    Every DatabaseManager pointed at the same database shares one engine and its connection pool.
+    """
+
+    def __init__(self) -> None:
+        self._engines: Dict[Tuple[str, str, str], Engine] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(
+        self, key: Tuple[str, str, str], factory: Callable[[], Engine]
+    ) -> Engine:
+        """
+        Returns the engine registered under the key, creating it with the factory on first use.
+
+        Args:
+            key (Tuple[str, str, str]): The (host, database, username) of the engine.
+            factory (Callable[[], Engine]): Callable that builds a new engine.
+
+        Returns:
+            Engine: The shared SQLAlchemy engine.
+        """
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = factory()
+                self._engines[key] = engine
+            return engine
+
+    def dispose_all(
+        self,
+    ) -> None:
+        """
+        Disposes every registered engine and empties the registry.
+        """
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose()
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+
+engine_registry = EngineRegistry()
+
+
+class QueryProfiler:
+    """
+    Opt-in statement profiler built on the SQLAlchemy cursor execute events.
+    Records the latency, rowcount and executemany batch size of every statement on the attached engines,
+    aggregated into a latency histogram per normalized statement. Statements slower than the threshold are logged.
+    """
+
+    # Upper bounds of the latency histogram buckets, in seconds.
+    buckets = (0.001, 0.01, 0.1, 1.0, 10.0, float("inf"))
+
+    def __init__(self, slow_query_seconds: float = 1.0, logger=None) -> None:
+        """
+        Initializes a disabled profiler.
+
+        Args:
+            slow_query_seconds (float): Statements taking longer than this are logged. Defaults to 1.0 (optional).
+            logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
+        """
+        self.slow_query_seconds = slow_query_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self.enabled = False
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._engines: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, slow_query_seconds: float | None = None) -> None:
+        """
+        Turns profiling on for engines attached from now on.
+
+        Args:
+            slow_query_seconds (float): New slow query threshold. Defaults to None (optional).
+        """
+        if slow_query_seconds is not None:
+            self.slow_query_seconds = slow_query_seconds
+        self.enabled = True
+
+    @staticmethod
+    def normalize_statement(statement: str) -> str:
+        """
+        Reduces a statement to its shape, so executions differing only in literals share one histogram entry.
+
+        Args:
+            statement (str): The SQL statement.
+
+        Returns:
+            str: The statement with literals replaced by ? and whitespace collapsed.
+        """
+        statement = re.sub(r"'(?:[^']|'')*'", "?", statement)
+        statement = re.sub(r"(?<![\w\]#])-?\d+(?:\.\d+)?\b", "?", statement)
+        statement = re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", "(?, ...)", statement)
+        return " ".join(statement.split())
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Starts recording the statements run on an engine. Engines shared by several managers are only hooked once.
+
+        Args:
+            engine (Engine): The SQLAlchemy engine.
+        """
+        with self._lock:
+            count = self._engines.get(id(engine), 0)
+            self._engines[id(engine)] = count + 1
+        if count == 0:
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def detach(self, engine: Engine) -> None:
+        """
+        Stops recording an engine once every manager that attached it has detached.
+
+        Args:
+            engine (Engine): The SQLAlchemy engine.
+        """
+        with self._lock:
+            count = self._engines.get(id(engine), 0) - 1
+            if count > 0:
+                self._engines[id(engine)] = count
+                return
+            self._engines.pop(id(engine), None)
+        if count == 0:
+            event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, params, context, executemany
+    ):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, params, context, executemany
+    ):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        batch_size = len(params) if executemany and params else 1
+        self.record(statement, elapsed, cursor.rowcount, batch_size)
+
+    def record(
+        self, statement: str, elapsed: float, rowcount: int = -1, batch_size: int = 1
+    ) -> None:
+        """
+        Adds one statement execution to the histogram and logs it if it was slow.
+
+        Args:
+            statement (str): The SQL statement.
+            elapsed (float): Execution time in seconds.
+            rowcount (int): Rows affected, or -1 when the driver does not report it. Defaults to -1 (optional).
+            batch_size (int): Number of parameter sets of an executemany. Defaults to 1 (optional).
+        """
+        key = self.normalize_statement(statement)
+        bucket = next(i for i, bound in enumerate(self.buckets) if elapsed <= bound)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = {
+                    "count": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "rows": 0,
+                    "batch_rows": 0,
+                    "histogram": [0] * len(self.buckets),
+                }
+            stats["count"] += 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            stats["rows"] += max(rowcount, 0)
+            stats["batch_rows"] += batch_size
+            stats["histogram"][bucket] += 1
+        if elapsed >= self.slow_query_seconds:
+            self.logger.warning(
+                "Slow query (%.2fs, rows: %d, batch: %d): %s",
+                elapsed,
+                rowcount,
+                batch_size,
+                key[:500],
+            )
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Summarizes the recorded statements, slowest in total first.
+
+        Returns:
+            pd.DataFrame: One row per normalized statement with its count, total, mean and max seconds,
+                rows, batch rows and the number of executions in each latency bucket.
+        """
+        labels = [
+            f"le_{bound:g}s" if bound != float("inf") else "le_inf"
+            for bound in self.buckets
+        ]
+        with self._lock:
+            records = [
+                {
+                    "statement": key,
+                    **{k: v for k, v in stats.items() if k != "histogram"},
+                    "mean_seconds": stats["total_seconds"] / stats["count"],
+                    **dict(zip(labels, stats["histogram"])),
+                }
+                for key, stats in self.stats.items()
+            ]
+        if not records:
+            return pd.DataFrame()
+        return (
+            pd.DataFrame.from_records(records)
+            .sort_values("total_seconds", ascending=False)
+            .reset_index(drop=True)
+        )
+
+    def dump(self, path: Path | str | None = None, top: int = 10) -> pd.DataFrame:
+        """
+        Logs the statements taking the most total time and optionally writes the full summary as JSON.
+
+        Args:
+            path (Path, str): Path of the JSON file. Defaults to None (optional).
+            top (int): Number of statements logged. Defaults to 10 (optional).
+
+        Returns:
+            pd.DataFrame: The summary.
+        """
+        df = self.summary()
+        for row in df.head(top).to_dict("records"):
+            self.logger.info(
+                "%.2fs over %d runs (max: %.2fs, rows: %d): %s",
+                row["total_seconds"],
+                row["count"],
+                row["max_seconds"],
+                row["rows"],
+                row["statement"][:200],
+            )
+        if path is not None:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_json(path, orient="records", indent=2)
+        return df
+
+    def reset(self) -> None:
+        """
+        Clears the recorded statements.
+        """
+        with self._lock:
+            self.stats.clear()
+
+
+query_profiler = QueryProfiler()
+
+
 class DatabaseManager:
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, profiler=None):
         """
         Initializes the DatabaseManager with an optional logger.
 
         Args:
             logger (logging.Logger, optional): Logger instance for logging. Defaults to None.
+            profiler (QueryProfiler, optional): Profiler recording the statements run by this manager.
+                Defaults to the module-level query_profiler when it is enabled.
         """
         self.logger = logger or logging.getLogger(__name__)
         self.engine = None
         self.session = None
+        self._shared_engine = False
+        self.profiler = profiler or (query_profiler if query_profiler.enabled else None)
 
     @staticmethod
     def __receive_before_cursor_execute(
@@ -37,34 +314,76 @@ class DatabaseManager:
             cursor.fast_executemany = True
 
     def create_engine(
-        self, username: str, password: str, host: str, database: str
+        self,
+        username: str,
+        password: str,
+        host: str,
+        database: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_pre_ping: bool = True,
+        pool_recycle: int = 3600,
     ) -> None:
         """
-        Creates a SQLAlchemy engine object with the provided credentials and sets up the session.
+        Attaches a SQLAlchemy engine for the provided credentials and sets up the session.
+        Engines are drawn from the process-wide registry, so managers for the same host, database and user share one connection pool.
+        Pool options only take effect when the registry creates the engine.
 
         Args:
             username (str): The username for the database.
             password (str): The password for the database.
             host (str): The hostname of the SQL Server.
             database (str): The name of the database.
+            pool_size (int): Number of connections kept open in the pool. Defaults to 5 (optional).
+            max_overflow (int): Connections allowed beyond pool_size under load. Defaults to 10 (optional).
+            pool_pre_ping (bool): Whether to test connections before handing them out. Defaults to True (optional).
+            pool_recycle (int): Seconds after which pooled connections are replaced. Defaults to 3600 (optional).
         """
-        connection_url = URL.create(
-            "mssql+pyodbc",
-            username=username,
-            password=password,
-            host=host,
-            port=1433,
-            database=database,
-            query={
-                "driver": "ODBC Driver 18 for SQL Server",
-                "TrustServerCertificate": "yes",
-            },
-        )
-        engine = create_engine(connection_url)
-        event.listen(
-            engine, "before_cursor_execute", self.__receive_before_cursor_execute
-        )
-        self.engine = engine
+
+        def factory() -> Engine:
+            connection_url = URL.create(
+                "mssql+pyodbc",
+                username=username,
+                password=password,
+                host=host,
+                port=1433,
+                database=database,
+                query={
+                    "driver": "ODBC Driver 18 for SQL Server",
+                    "TrustServerCertificate": "yes",
+                },
+            )
+            engine = create_engine(
+                connection_url,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_pre_ping=pool_pre_ping,
+                pool_recycle=pool_recycle,
+            )
+            event.listen(
+                engine, "before_cursor_execute", self.__receive_before_cursor_execute
+            )
+            self.logger.debug(f"Creating engine for {database} on {host}...")
+            return engine
+
+        self.engine = engine_registry.get_or_create((host, database, username), factory)
+        self._shared_engine = True
+        if self.profiler:
+            self.profiler.attach(self.engine)
+        self.session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+    def create_local_engine(self, path: str = "") -> None:
+        """
+        Attaches a local SQLite engine instead of SQL Server and sets up the session.
+        Used as a test double for exercising and benchmarking the load paths without the production server.
+
+        Args:
+            path (str): SQLite database file. Defaults to an in-memory database (optional).
+        """
+        self.engine = create_engine(f"sqlite:///{path}" if path else "sqlite://")
+        self._shared_engine = False
+        if self.profiler:
+            self.profiler.attach(self.engine)
         self.session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
 
     def get_session(
@@ -101,8 +420,8 @@ class DatabaseManager:
         """
         session = self.get_session()
         try:
-            single_line_query = query.replace("\n", " ")
-            self.logger.debug(f"Query: {single_line_query}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Query: %s", statement_preview(query))
             res = session.execute(text(query), params)
             rows = list(res.fetchall()) if res.returns_rows else None  # type: ignore[attr-defined]
             session.commit()
@@ -132,11 +451,50 @@ class DatabaseManager:
             pd.DataFrame: The query results as a DataFrame.
         """
         df = pd.read_sql(query, self.engine, params=params, parse_dates=parse_dates)
-        single_line_query = query.replace("\n", " ")
-        self.logger.debug(f"Query: {single_line_query}")
-        self.logger.debug(f"Reading (rows: {df.shape[0]}, cols: {df.shape[1]})...")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Query: %s", statement_preview(query))
+            self.logger.debug("Reading (rows: %d, cols: %d)...", *df.shape)
         return df
 
+    def read_sql_chunks(
+        self,
+        query: str,
+        params: tuple | None = None,
+        parse_dates: List[str] | None = None,
+        chunksize: int = 50_000,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Streams a SQL query as a sequence of DataFrames of at most chunksize rows.
+        Results are read through a streaming cursor whose row buffer is capped at chunksize, so memory stays flat regardless of the result size.
+
+        Args:
+            query (str): The SQL query to execute.
+            params (tuple): Query parameters used in execution. Defaults to None (optional).
+            parse_dates (List[str]): List of column names to parse as datetime. Defaults to None (optional).
+            chunksize (int): Maximum number of rows per DataFrame. Defaults to 50,000 (optional).
+
+        Yields:
+            pd.DataFrame: The next chunk of query results.
+        """
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.logger.debug("Query: %s", statement_preview(query))
+        with self.engine.connect().execution_options(
+            stream_results=True, max_row_buffer=chunksize
+        ) as conn:
+            for df in pd.read_sql(
+                query,
+                conn,
+                params=params,
+                parse_dates=parse_dates,
+                chunksize=chunksize,
+            ):
+                if debug:
+                    self.logger.debug(
+                        "Reading chunk (rows: %d, cols: %d)...", *df.shape
+                    )
+                yield df
+
     def to_sql(
         self,
         df: pd.DataFrame,
@@ -153,16 +511,217 @@ class DatabaseManager:
             if_exists (str): Specifies what to do if the table already exists. Defaults to 'fail' (optional).
             index (bool): Whether to write the DataFrame's index as a column. Defaults to False (optional).
         """
+        self.logger.debug("Writing (rows: %d, cols: %d) to %s...", *df.shape, table)
+        df.to_sql(table, self.engine, if_exists=if_exists, index=index)
+
+    def bulk_insert(
+        self, df: pd.DataFrame, table: str, batch_size: int = 100_000
+    ) -> int:
+        """
+        Appends a Pandas DataFrame to an existing SQL table through a heap staging table.
+        Rows are written to the staging table in batches of batch_size, then moved into the target with one set-based INSERT ... SELECT.
+        The whole load runs in a single transaction.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to be written to the SQL table.
+            table (str): The name of the target SQL table.
+            batch_size (int): Number of rows sent to the staging table per round trip. Defaults to 100,000 (optional).
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        if df.empty:
+            return 0
+        columns = ", ".join(f"[{col}]" for col in df.columns)
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            staging = self._load_staging_table(conn, df, table, batch_size)
+            conn.exec_driver_sql(
+                f"INSERT INTO [{table}] ({columns}) SELECT {columns} FROM {staging}"
+            )
+            conn.exec_driver_sql(f"DROP TABLE {staging}")
+        elapsed = time.perf_counter() - start
         self.logger.debug(
-            f"Writing (rows: {df.shape[0]}, cols: {df.shape[1]}) to {table}..."
+            "Bulk loaded (rows: %d, cols: %d) to %s in %.2fs (%.0f rows/sec)...",
+            *df.shape,
+            table,
+            elapsed,
+            df.shape[0] / max(elapsed, 1e-9),
         )
-        df.to_sql(table, self.engine, if_exists=if_exists, index=index)
+        return df.shape[0]
+
+    def merge(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        keys: List[str],
+        batch_size: int = 100_000,
+    ) -> int:
+        """
+        Upserts a Pandas DataFrame into an existing SQL table on its natural key.
+        Rows are bulk loaded into a staging table, then one MERGE inserts new keys and updates matched rows whose values changed.
+        Duplicate keys within the DataFrame are collapsed to the last occurrence.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to be merged into the SQL table.
+            table (str): The name of the target SQL table.
+            keys (List[str]): Columns forming the natural key of the table.
+            batch_size (int): Number of rows sent to the staging table per round trip. Defaults to 100,000 (optional).
+
+        Returns:
+            int: The number of rows staged for the merge.
+        """
+        df = df.drop_duplicates(subset=keys, keep="last")
+        if df.empty:
+            return 0
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            staging = self._load_staging_table(conn, df, table, batch_size)
+            for stmt in self._merge_stmts(
+                conn.dialect.name, table, staging, list(df.columns), keys
+            ):
+                conn.exec_driver_sql(stmt)
+            conn.exec_driver_sql(f"DROP TABLE {staging}")
+        elapsed = time.perf_counter() - start
+        self.logger.debug(
+            "Merged (rows: %d, cols: %d) into %s in %.2fs (%.0f rows/sec)...",
+            *df.shape,
+            table,
+            elapsed,
+            df.shape[0] / max(elapsed, 1e-9),
+        )
+        return df.shape[0]
+
+    @staticmethod
+    def _merge_stmts(
+        dialect: str, table: str, staging: str, columns: List[str], keys: List[str]
+    ) -> List[str]:
+        """
+        Builds the statements that upsert a staging table into the target table.
+        SQL Server gets a single MERGE; other dialects get an UPDATE ... FROM followed by an INSERT of unmatched keys.
+
+        Args:
+            dialect (str): SQLAlchemy dialect name of the connection.
+            table (str): The name of the target SQL table.
+            staging (str): The name of the staging table.
+            columns (List[str]): Columns present in the staging table.
+            keys (List[str]): Columns forming the natural key of the table.
+
+        Returns:
+            List[str]: SQL statements to execute in order.
+        """
+        values = [col for col in columns if col not in keys]
+        col_list = ", ".join(f"[{col}]" for col in columns)
+        on = " AND ".join(f"t.[{col}] = s.[{col}]" for col in keys)
+        if dialect == "mssql":
+            stmt = f"MERGE INTO [{table}] AS t USING {staging} AS s ON {on}"
+            if values:
+                t_values = ", ".join(f"t.[{col}]" for col in values)
+                s_values = ", ".join(f"s.[{col}]" for col in values)
+                assignments = ", ".join(f"t.[{col}] = s.[{col}]" for col in values)
+                stmt += (
+                    f" WHEN MATCHED AND EXISTS (SELECT {s_values} EXCEPT SELECT {t_values})"
+                    f" THEN UPDATE SET {assignments}"
+                )
+            s_columns = ", ".join(f"s.[{col}]" for col in columns)
+            stmt += f" WHEN NOT MATCHED BY TARGET THEN INSERT ({col_list}) VALUES ({s_columns});"
+            return [stmt]
+
+        stmts = []
+        if values:
+            assignments = ", ".join(f"[{col}] = s.[{col}]" for col in values)
+            match = " AND ".join(f"[{table}].[{col}] = s.[{col}]" for col in keys)
+            stmts.append(
+                f"UPDATE [{table}] SET {assignments} FROM {staging} AS s WHERE {match}"
+            )
+        stmts.append(
+            f"INSERT INTO [{table}] ({col_list}) SELECT {col_list} FROM {staging} AS s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM [{table}] AS t WHERE {on})"
+        )
+        return stmts
+
+    def _load_staging_table(
+        self, conn, df: pd.DataFrame, table: str, batch_size: int
+    ) -> str:
+        """
+        Creates a staging table for the target table and fills it with the DataFrame in batches.
+
+        Args:
+            conn: Connection the staging table is bound to.
+            df (pd.DataFrame): The DataFrame to stage.
+            table (str): The name of the target SQL table.
+            batch_size (int): Number of rows sent per round trip.
+
+        Returns:
+            str: The name of the staging table.
+        """
+        columns = ", ".join(f"[{col}]" for col in df.columns)
+        placeholders = ", ".join("?" for _ in df.columns)
+        staging = self._create_staging_table(conn, table, columns)
+        insert_stmt = f"INSERT INTO {staging} ({columns}) VALUES ({placeholders})"
+        for offset in range(0, df.shape[0], batch_size):
+            batch = df.iloc[offset : offset + batch_size]
+            conn.exec_driver_sql(insert_stmt, self._to_records(batch))
+        return staging
+
+    @staticmethod
+    def _to_records(df: pd.DataFrame) -> List[tuple]:
+        """
+        Converts a DataFrame into DBAPI parameter tuples, with nulls as None and timestamps as datetime objects.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to convert.
+
+        Returns:
+            List[tuple]: One parameter tuple per row.
+        """
+        columns = []
+        for _, series in df.items():
+            values = series.to_numpy(dtype=object)
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = np.array(
+                    [value.to_pydatetime() for value in values], dtype=object
+                )
+            values[series.isna().to_numpy()] = None
+            columns.append(values)
+        return list(zip(*columns))
+
+    @staticmethod
+    def _create_staging_table(conn, table: str, columns: str) -> str:
+        """
+        Creates an empty heap staging table with the target table's column types.
+
+        Args:
+            conn: Connection the staging table is bound to.
+            table (str): The name of the target SQL table.
+            columns (str): Quoted, comma separated column list.
+
+        Returns:
+            str: The name of the staging table.
+        """
+        if conn.dialect.name == "mssql":
+            staging = f"[#staging_{table}]"
+            conn.exec_driver_sql(
+                f"SELECT TOP 0 {columns} INTO {staging} FROM [{table}]"
+            )
+        else:
+            staging = f"temp.[staging_{table}]"
+            conn.exec_driver_sql(
+                f"CREATE TEMP TABLE [staging_{table}] AS SELECT {columns} FROM [{table}] WHERE 0"
+            )
+        return staging
 
     def close(
         self,
     ) -> None:
         """
         Closes the database connection.
+        Shared engines are released back to the registry with their pool intact; use engine_registry.dispose_all() to tear them down.
         """
-        if self.engine:
+        if self.engine and self.profiler:
+            self.profiler.detach(self.engine)
+        if self.engine and not self._shared_engine:
             self.engine.dispose()
+        self.engine = None
+        self.session = None
+        self._shared_engine = False
@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+import pandas as pd
+from pathlib import Path
+from typing import List, Literal, Tuple
+
+
+SnapshotFormat = Literal["parquet", "feather", "csv", "xlsx"]
+
+snapshot_extensions = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "csv": ".csv",
+    "xlsx": ".xlsx",
+}
+
+
+def has_pyarrow() -> bool:
+    """Checks whether the optional pyarrow dependency, needed for Parquet and Feather, is installed.
+
+    Returns:
+        bool: True if pyarrow can be imported.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def write_snapshot(df: pd.DataFrame, path: Path | str, fmt: SnapshotFormat) -> Path:
+    """Writes a DataFrame snapshot in the given format.
+    Parquet is zstd compressed. Feather is left uncompressed so it can be memory mapped without copying.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to save.
+        path (Path, str): The path of the snapshot file, without extension.
+        fmt (str): Snapshot format: 'parquet', 'feather', 'csv' or 'xlsx'.
+
+    Returns:
+        Path: The path of the written file.
+
+    Raises:
+        Exception: If the format is unknown.
+    """
+    if fmt not in snapshot_extensions:
+        raise Exception(f"Unknown snapshot format: {fmt}")
+    path = Path(path).with_suffix(snapshot_extensions[fmt])
+    if fmt == "parquet":
+        df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path, compression="uncompressed")
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
+
+
+def read_snapshot(path: Path | str, memory_map: bool = True) -> pd.DataFrame:
+    """Reads a snapshot back, choosing the reader from the file extension.
+    Parquet and Feather files are memory mapped; uncompressed Feather columns are then read without copying.
+
+    Args:
+        path (Path, str): The path of the snapshot file.
+        memory_map (bool): Whether to memory map Parquet and Feather files. Defaults to True (optional).
+
+    Returns:
+        pd.DataFrame: The snapshot.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=memory_map).to_pandas()
+    if path.suffix == ".feather":
+        import pyarrow.feather as feather
+
+        return feather.read_table(path, memory_map=memory_map).to_pandas()
+    if path.suffix == ".csv":
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+class SnapshotWriter:
+    """
+    Writes DataFrame snapshots on a background thread, so saving them does not block the import.
+    Snapshots wait in a bounded queue; submit() only blocks when the queue is full.
+    """
+
+    def __init__(
+        self,
+        snaps_dir: Path | str,
+        fmt: SnapshotFormat = "parquet",
+        max_queue: int = 4,
+        logger=None,
+    ) -> None:
+        """
+        Starts the writer thread.
+
+        Args:
+            snaps_dir (Path, str): Directory the snapshots are written to.
+            fmt (str): Snapshot format: 'parquet', 'feather', 'csv' or 'xlsx'. Parquet and Feather fall back to CSV
+                when pyarrow is not installed. Defaults to 'parquet' (optional).
+            max_queue (int): Maximum number of snapshots waiting to be written. Defaults to 4 (optional).
+            logger (logging.Logger): Logger instance for logging. Defaults to None (optional).
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        if fmt in ("parquet", "feather") and not has_pyarrow():
+            self.logger.warning(
+                f"pyarrow is not installed, writing {fmt} snapshots as csv."
+            )
+            fmt = "csv"
+        self.snaps_dir = Path(snaps_dir)
+        self.fmt: SnapshotFormat = fmt
+        self.written: List[Path] = []
+        self.errors: List[Tuple[str, Exception]] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(
+            target=self._run, name="snapshot-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, df: pd.DataFrame, name: str) -> None:
+        """
+        Queues a snapshot. The DataFrame is copied, so the caller may keep changing it.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to save.
+            name (str): File name of the snapshot, without extension.
+        """
+        self._queue.put((df.copy(), name))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                df, name = item
+                path = write_snapshot(df, self.snaps_dir / name, self.fmt)
+                self.written.append(path)
+                self.logger.debug(
+                    f"Wrote snapshot {path.name} (rows: {df.shape[0]}, cols: {df.shape[1]})"
+                )
+            except Exception as e:
+                self.errors.append((item[1], e))
+                self.logger.error(f"Error writing snapshot {item[1]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """
+        Waits until every queued snapshot has been written.
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Writes the remaining snapshots and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,436 @@
+"""
+Deterministic synthetic source data, shaped like the SharePoint patient export and the LCH source tables.
+No value is derived from real patients. The same arguments and seed always produce the same frames,
+so the normalize and load stages can be exercised at any multiple of production volume without PHI.
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+first_names = [
+    "John",
+    "Jane",
+    "Robert",
+    "Mary",
+    "Luis",
+    "Ana",
+    "Wei",
+    "james ",
+    "PATRICIA",
+]
+last_names = [
+    "Doe",
+    "Smith",
+    "Jones",
+    "Garcia",
+    "Nguyen",
+    "O'Brien",
+    "Lee-Park",
+    " miller",
+]
+middle_names = ["A", "Lee", "Marie", "J.", None, None, None]
+suffixes = ["Jr", "Sr", "III", None, None, None, None, None]
+races = [
+    "White",
+    "Black",
+    "African American",
+    "Hispanic",
+    "Latino",
+    "Asian",
+    "Caucasian",
+    "Native American",
+    "Unknown",
+    None,
+]
+states = [
+    "California",
+    "Texas",
+    "Florida",
+    "new york",
+    "FL",
+    "Ohio",
+    "invalid-state",
+    None,
+]
+cities = ["Anytown", "Springfield", "Rivertown", "Miami", "san diego", "Columbus", None]
+weights = ["150 lbs", "130", "212 LBS", "98kg", "5'4\"", "invalid-weight", None]
+heights = ["5'8\"", "5ft 4", "6'", "5 ft 11 in", "170 lbs", "invalid-height", None]
+insurance_names = [
+    "Humana Gold",
+    "Kaiser",
+    "United Health Care",
+    "Blue Cross",
+    "BCBS Fed",
+    "Medicaid FL",
+    "aetna",
+    "Some Local Plan",
+    None,
+    None,
+]
+emergency_names = [
+    "Jane Doe (wife)",
+    "John Smith - son",
+    "Daughter Mary",
+    "Neighbor Tom",
+    "Friend Bob",
+    "Alice Jones",
+]
+dx_codes = ["E11.9", "I10", "E11.65", "R05", "I50.9", "E78.5"]
+member_statuses = ["Active", "On-Board", "In-Active", "DO NOT CALL", "Onboard"]
+health_coaches = ["admin", "admin2", "coach1", "coach2", "coach3"]
+note_types = [
+    "Initial Evaluation with APRN",
+    "Monthly Check-in",
+    "Alert",
+    "Follow Up,Monthly Check-in",
+    "Device Issue",
+]
+note_users = [
+    "Joycelynn Harris",
+    "coach1",
+    "coach2",
+    "NursePractitioner",
+    "RegisteredNurse1",
+    "AlertTeamMember1",
+]
+
+
+def _digits(rng: np.random.Generator, n: int, length: int) -> pd.Series:
+    return pd.Series(rng.integers(0, 10**length, n)).astype(str).str.zfill(length)
+
+
+def _choice(
+    rng: np.random.Generator, values: list, n: int, null_rate: float = 0.0
+) -> np.ndarray:
+    out = rng.choice(np.array(values, dtype=object), n)
+    if null_rate:
+        out[rng.random(n) < null_rate] = None
+    return out
+
+
+def generate_patient_export(patients: int = 22_000, seed: int = 42) -> pd.DataFrame:
+    """Generates a SharePoint-shaped patient export, including the messy values normalize_patients cleans up.
+
+    Args:
+        patients (int): Number of patients. Defaults to 22,000 (optional).
+        seed (int): Random seed. Defaults to 42 (optional).
+
+    Returns:
+        pd.DataFrame: The raw patient export, one row per patient.
+    """
+    rng = np.random.default_rng(seed)
+    n = patients
+    first = pd.Series(rng.choice(first_names, n))
+    phone = _digits(rng, n, 10)
+    ssn = _digits(rng, n, 9)
+    zipcode = _digits(rng, n, 5)
+    mbi_chars = rng.choice(list("ACDEFGHJKM0123456789"), (n, 10))
+    mbi = _digits(rng, n, 1) + pd.Series(
+        mbi_chars.view(f"<U{mbi_chars.shape[1]}")[:, 0]
+    )
+    dx = [
+        ",".join(rng.choice(dx_codes, k, replace=False)) for k in rng.integers(1, 4, n)
+    ]
+    second_contact = rng.random(n) < 0.3
+    df = pd.DataFrame(
+        {
+            "First Name": first,
+            "Last Name": rng.choice(last_names, n),
+            "Middle Name": _choice(rng, middle_names, n),
+            "Nickname": _choice(rng, first_names, n, null_rate=0.8),
+            "Phone Number": phone.str[:3] + "-" + phone.str[3:6] + "-" + phone.str[6:],
+            "Gender": rng.choice(["Male", "Female"], n),
+            "Email": first.str.strip().str.lower()
+            + "."
+            + pd.Series(np.arange(n)).astype(str)
+            + "@EXAMPLE.COM",
+            "Suffix": _choice(rng, suffixes, n),
+            "Social Security": ssn.str[:3] + "-" + ssn.str[3:5] + "-" + ssn.str[5:],
+            "Race": _choice(rng, races, n),
+            "Weight": _choice(rng, weights, n),
+            "Height": _choice(rng, heights, n),
+            "Mailing Address": pd.Series(rng.integers(1, 9999, n)).astype(str)
+            + pd.Series(rng.choice([" Main St", " Oak Ave", " Pine Rd #2"], n)),
+            "City": _choice(rng, cities, n),
+            "State": _choice(rng, states, n),
+            "Zip code": zipcode.where(rng.random(n) > 0.2, zipcode + "-1234"),
+            "EmergencyName": _choice(rng, emergency_names, n, null_rate=0.1),
+            "EmergencyNumber": _digits(rng, n, 10).where(rng.random(n) > 0.1),
+            "EmergencyName2": pd.Series(rng.choice(emergency_names, n)).where(
+                second_contact
+            ),
+            "EmergencyNumber2": _digits(rng, n, 10).where(second_contact),
+            "Medicare ID number": mbi.where(rng.random(n) > 0.05),
+            "DX_Code": dx,
+            "Insurance ID:": ("abc-" + _digits(rng, n, 9)).where(rng.random(n) > 0.4),
+            "Insurance Name:": _choice(rng, insurance_names, n),
+            "InsuranceID2": ("def-" + _digits(rng, n, 9)).where(rng.random(n) > 0.7),
+            "InsuranceName2": _choice(rng, insurance_names, n, null_rate=0.7),
+            "On-board Date": (
+                pd.Timestamp("2023-01-01")
+                + pd.to_timedelta(rng.integers(0, 730, n), unit="D")
+            ).strftime("%Y-%m-%d"),
+            "Member_Status": rng.choice(member_statuses, n),
+            "Health Coach": rng.choice(health_coaches, n),
+            "Relationship_Status": rng.choice(["Married", "Single", "Divorced"], n),
+            "Preferred_Language": rng.choice(["English", "Spanish", "Vietnamese"], n),
+            "DOB": (
+                pd.Timestamp("1935-01-01")
+                + pd.to_timedelta(rng.integers(0, 15_000, n), unit="D")
+            ).strftime("%m/%d/%Y"),
+            "ID": np.arange(1, n + 1),
+        }
+    )
+    return df
+
+
+def generate_fulfillment(patients: int = 22_000, seed: int = 42) -> pd.DataFrame:
+    """Generates the Fulfillment_All table. Every patient gets a glucometer or a blood pressure cuff,
+    some get both, and a few devices are resupplies.
+
+    Args:
+        patients (int): Number of patients. Defaults to 22,000 (optional).
+        seed (int): Random seed. Defaults to 42 (optional).
+
+    Returns:
+        pd.DataFrame: Fulfillment rows with Vendor, Device_ID, Device_Name, Patient_ID and Resupply.
+    """
+    rng = np.random.default_rng(seed + 1)
+    patient_ids = np.arange(1, patients + 1)
+    kind = rng.choice(["glucose", "bp", "both"], patients, p=[0.45, 0.45, 0.1])
+    gluc_ids = patient_ids[kind != "bp"]
+    bp_ids = patient_ids[kind != "glucose"]
+    df = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "Vendor": "Tenovi",
+                    "Device_Name": "Tenovi Glucometer",
+                    "Patient_ID": gluc_ids,
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "Vendor": rng.choice(["Omron", "Tenovi"], bp_ids.shape[0]),
+                    "Device_Name": "Omron Blood Pressure Monitor",
+                    "Patient_ID": bp_ids,
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    uuid = pd.Series(rng.integers(0, 16**12, df.shape[0])).map("{:012x}".format)
+    df["Device_ID"] = uuid.str[:4] + "-" + uuid.str[4:8] + "-" + uuid.str[8:]
+    df["Resupply"] = (rng.random(df.shape[0]) < 0.02).astype(int)
+    return df[["Vendor", "Device_ID", "Device_Name", "Patient_ID", "Resupply"]]
+
+
+def _reading_times(
+    rng: np.random.Generator,
+    patient_ids: np.ndarray,
+    start: datetime,
+    days: int,
+    per_day: float,
+) -> pd.DataFrame:
+    counts = rng.poisson(per_day * days, patient_ids.shape[0])
+    sharepoint_ids = np.repeat(patient_ids, counts)
+    n = sharepoint_ids.shape[0]
+    recorded = pd.Timestamp(start) + pd.to_timedelta(
+        rng.integers(0, days * 86_400, n), unit="s"
+    )
+    received = recorded + pd.to_timedelta(rng.integers(5, 900, n), unit="s")
+    return pd.DataFrame(
+        {
+            "SharePoint_ID": sharepoint_ids,
+            "Time_Recorded": recorded,
+            "Time_Recieved": received,
+            "Manual_Reading": rng.random(n) < 0.05,
+        }
+    )
+
+
+def generate_readings(
+    fulfillment_df: pd.DataFrame,
+    months: int = 1,
+    readings_per_day: float = 1.0,
+    start_date: str = "2025-01-01",
+    seed: int = 42,
+) -> Dict[str, pd.DataFrame]:
+    """Generates the Glucose_Readings and Blood_Pressure_Readings tables for the devices in Fulfillment_All.
+    Each device sends a Poisson distributed number of readings averaging readings_per_day.
+
+    Args:
+        fulfillment_df (pd.DataFrame): The generated Fulfillment_All table.
+        months (int): Number of 30 day months of readings. Defaults to 1 (optional).
+        readings_per_day (float): Average readings per device per day. Defaults to 1.0 (optional).
+        start_date (str): First day of readings. Defaults to '2025-01-01' (optional).
+        seed (int): Random seed. Defaults to 42 (optional).
+
+    Returns:
+        Dict[str, pd.DataFrame]: The 'Glucose_Readings' and 'Blood_Pressure_Readings' tables.
+    """
+    rng = np.random.default_rng(seed + 2)
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    days = months * 30
+    active = fulfillment_df[fulfillment_df["Resupply"] == 0]
+    gluc_ids = active.loc[
+        active["Device_Name"].str.contains("Glucometer"), "Patient_ID"
+    ]
+    bp_ids = active.loc[~active["Device_Name"].str.contains("Glucometer"), "Patient_ID"]
+
+    gluc_df = _reading_times(rng, gluc_ids.to_numpy(), start, days, readings_per_day)
+    gluc_df.insert(1, "Device_Model", "Tenovi Glucometer")
+    gluc_df["BG_Reading"] = rng.normal(130, 35, gluc_df.shape[0]).clip(40, 500).round(1)
+
+    bp_df = _reading_times(rng, bp_ids.to_numpy(), start, days, readings_per_day)
+    bp_df.insert(1, "Device_Model", "Omron Blood Pressure Monitor")
+    bp_df["BP_Reading_Systolic"] = rng.normal(132, 18, bp_df.shape[0]).round(0)
+    bp_df["BP_Reading_Diastolic"] = rng.normal(82, 11, bp_df.shape[0]).round(0)
+    return {
+        "Glucose_Readings": gluc_df[
+            [
+                "SharePoint_ID",
+                "Device_Model",
+                "Time_Recorded",
+                "Time_Recieved",
+                "BG_Reading",
+                "Manual_Reading",
+            ]
+        ],
+        "Blood_Pressure_Readings": bp_df[
+            [
+                "SharePoint_ID",
+                "Device_Model",
+                "Time_Recorded",
+                "Time_Recieved",
+                "BP_Reading_Systolic",
+                "BP_Reading_Diastolic",
+                "Manual_Reading",
+            ]
+        ],
+    }
+
+
+def generate_notes(
+    patients: int = 22_000,
+    months: int = 1,
+    notes_per_month: float = 4.0,
+    start_date: str = "2025-01-01",
+    seed: int = 42,
+) -> Dict[str, pd.DataFrame]:
+    """Generates the Medical_Notes table and the matching Time_Log rows, joined on Note_ID.
+    A few notes have no call time logged, like in production.
+
+    Args:
+        patients (int): Number of patients. Defaults to 22,000 (optional).
+        months (int): Number of 30 day months of notes. Defaults to 1 (optional).
+        notes_per_month (float): Average notes per patient per month. Defaults to 4.0 (optional).
+        start_date (str): First day of notes. Defaults to '2025-01-01' (optional).
+        seed (int): Random seed. Defaults to 42 (optional).
+
+    Returns:
+        Dict[str, pd.DataFrame]: The 'Medical_Notes' and 'Time_Log' tables.
+    """
+    rng = np.random.default_rng(seed + 3)
+    counts = rng.poisson(notes_per_month * months, patients)
+    sharepoint_ids = np.repeat(np.arange(1, patients + 1), counts)
+    n = sharepoint_ids.shape[0]
+    note_ids = np.arange(1, n + 1)
+    users = rng.choice(note_users, n)
+    timestamps = pd.Timestamp(
+        datetime.strptime(start_date, "%Y-%m-%d")
+    ) + pd.to_timedelta(rng.integers(0, months * 30 * 86_400, n), unit="s")
+    types = rng.choice(note_types, n)
+    notes_df = pd.DataFrame(
+        {
+            "SharePoint_ID": sharepoint_ids.astype(str),
+            "Notes": pd.Series(
+                rng.choice(
+                    ["Spoke with patient", "Reviewed readings", "Left voicemail"], n
+                )
+            )
+            .radd("<p>")
+            .add(" &amp; documented.</p>"),
+            "TimeStamp": timestamps,
+            "LCH_UPN": users,
+            "Time_Note": types,
+            "Note_ID": note_ids,
+        }
+    )
+    logged = rng.random(n) < 0.95
+    seconds = rng.integers(60, 2_400, n)
+    time_df = pd.DataFrame(
+        {
+            "SharPoint_ID": sharepoint_ids.astype(str),
+            "Recording_Time": (
+                pd.Timestamp(0) + pd.to_timedelta(seconds, unit="s")
+            ).strftime("%H:%M:%S"),
+            "LCH_UPN": users,
+            "Notes": types,
+            "Auto_Time": rng.random(n) < 0.7,
+            "Start_Time": timestamps - pd.to_timedelta(seconds, unit="s"),
+            "End_Time": timestamps,
+            "Note_ID": note_ids,
+        }
+    )[logged]
+    return {"Medical_Notes": notes_df, "Time_Log": time_df.reset_index(drop=True)}
+
+
+def generate_dataset(
+    patients: int = 22_000,
+    months: int = 1,
+    readings_per_day: float = 1.0,
+    notes_per_month: float = 4.0,
+    start_date: str = "2025-01-01",
+    seed: int = 42,
+) -> Dict[str, pd.DataFrame]:
+    """Generates the patient export and every source table the importer reads, all keyed to the same patients.
+    Volume scales with patients x months x readings_per_day.
+
+    Args:
+        patients (int): Number of patients. Defaults to 22,000 (optional).
+        months (int): Number of 30 day months of readings and notes. Defaults to 1 (optional).
+        readings_per_day (float): Average readings per device per day. Defaults to 1.0 (optional).
+        notes_per_month (float): Average notes per patient per month. Defaults to 4.0 (optional).
+        start_date (str): First day of readings and notes. Defaults to '2025-01-01' (optional).
+        seed (int): Random seed. Defaults to 42 (optional).
+
+    Returns:
+        Dict[str, pd.DataFrame]: 'Patient_Export', 'Fulfillment_All', 'Glucose_Readings',
+            'Blood_Pressure_Readings', 'Medical_Notes' and 'Time_Log'.
+    """
+    fulfillment_df = generate_fulfillment(patients, seed=seed)
+    return {
+        "Patient_Export": generate_patient_export(patients, seed=seed),
+        "Fulfillment_All": fulfillment_df,
+        **generate_readings(
+            fulfillment_df,
+            months=months,
+            readings_per_day=readings_per_day,
+            start_date=start_date,
+            seed=seed,
+        ),
+        **generate_notes(
+            patients,
+            months=months,
+            notes_per_month=notes_per_month,
+            start_date=start_date,
+            seed=seed,
+        ),
+    }
+
+
+def write_dataset(dataset: Dict[str, pd.DataFrame], path: Path | str) -> None:
+    """Writes a generated dataset as CSV files named after each table, e.g. data/Patient_Export.csv.
+
+    Args:
+        dataset (Dict[str, pd.DataFrame]): The generated tables, keyed by table name.
+        path (Path, str): Directory the files are written to.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for name, df in dataset.items():
+        df.to_csv(path / f"{name}.csv", index=False)
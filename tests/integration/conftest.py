@@ -91,3 +91,29 @@ def execute_ddl(database: str, statements: list[str]) -> None:
     for statement in statements:
         cur.execute(statement)
     conn.close()
+
+
+def insert_rows(database: str, table: str, df) -> None:
+    """Bulk insert a DataFrame's rows into a table, its columns matching the table's by name."""
+    columns = ", ".join(f"[{column}]" for column in df.columns)
+    params = ", ".join("?" for _ in df.columns)
+    conn = pyodbc.connect(_connect_str() + f";DATABASE={database}")
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    cur.executemany(
+        f"INSERT INTO [{table}] ({columns}) VALUES ({params})",
+        df.astype(object).where(df.notna(), None).values.tolist(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def fetch_rows(database: str, statement: str, params: tuple = ()) -> list[tuple]:
+    """Run a query or procedure and return its rows as tuples, raising on any error."""
+    conn = pyodbc.connect(_connect_str() + f";DATABASE={database}")
+    cur = conn.cursor()
+    cur.execute(statement, *params)
+    rows = [tuple(row) for row in cur.fetchall()]
+    conn.commit()
+    conn.close()
+    return rows
@@ -46,6 +46,7 @@ SCHEMA = [
         weight_lbs INT,
         height_in INT,
         sharepoint_id INT,
+        user_id INT,
         temp_user VARCHAR(100)
     )
     """,
@@ -79,8 +80,16 @@ SCHEMA = [
     )
     """,
     """
+    CREATE TABLE patient_status_type (
+        patient_status_type_id INT PRIMARY KEY,
+        name VARCHAR(50)
+    )
+    """,
+    "INSERT INTO patient_status_type VALUES (1, 'Active'), (2, 'Inactive')",
+    """
     CREATE TABLE patient_status (
         patient_status_id INT IDENTITY PRIMARY KEY,
+        patient_status_type_id INT,
         temp_status_type VARCHAR(50),
         modified_date DATETIME2,
         temp_user VARCHAR(100),
@@ -105,6 +114,7 @@ TABLES = [
     "patient_address",
     "patient_insurance",
     "medical_necessity",
+    "patient_status_type",
     "patient_status",
     "emergency_contact",
 ]
@@ -268,9 +278,11 @@ def test_import_patient_data(data_importer, patient_csv):
     ) == ["E119", "I10"]
 
     statuses = data_importer.gps.read_sql(
-        "SELECT patient_id, temp_status_type FROM patient_status ORDER BY patient_id"
+        "SELECT patient_id, temp_status_type, patient_status_type_id FROM patient_status ORDER BY patient_id"
     )
     assert set(statuses["temp_status_type"]) == {"Active"}
+    # Status types are resolved before the insert, no post-load update is needed.
+    assert set(statuses["patient_status_type_id"]) == {1}
 
     emcontacts = data_importer.gps.read_sql(
         "SELECT patient_id, full_name FROM emergency_contact ORDER BY patient_id"
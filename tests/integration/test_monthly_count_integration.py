@@ -0,0 +1,223 @@
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medicare_rebuild.queries import create_patient_reading_day_stmt
+from tests.integration.conftest import execute_ddl, fetch_rows, insert_rows
+
+pytestmark = pytest.mark.integration
+
+PROCS_DIR = Path(__file__).resolve().parents[2] / "sql" / "stored_procedures"
+PROCS = [
+    "refresh_patient_reading_day",
+    "get_my_queue",
+    "search_patient_list",
+    "get_patient_overview",
+]
+USERS = ["Alex Coach", "Sam Coach"]
+
+SCHEMA = [
+    "CREATE TABLE [user] (user_id INT PRIMARY KEY, display_name VARCHAR(200))",
+    """
+    CREATE TABLE patient (
+        patient_id INT PRIMARY KEY,
+        first_name VARCHAR(100),
+        last_name VARCHAR(100),
+        full_name VARCHAR(200),
+        phone_number VARCHAR(20),
+        date_of_birth DATETIME2,
+        user_id INT
+    )
+    """,
+    "CREATE TABLE patient_status (patient_id INT, temp_status_type VARCHAR(50))",
+    "CREATE TABLE patient_address (patient_id INT, temp_state VARCHAR(10))",
+    """
+    CREATE TABLE patient_note (
+        patient_id INT,
+        note_datetime DATETIME2,
+        call_time_seconds INT
+    )
+    """,
+    "CREATE TABLE device (device_id INT PRIMARY KEY, patient_id INT)",
+    """
+    CREATE TABLE glucose_reading (
+        glucose_reading_id INT IDENTITY PRIMARY KEY,
+        device_id INT,
+        received_datetime DATETIME2
+    )
+    """,
+    """
+    CREATE TABLE blood_pressure_reading (
+        blood_pressure_reading_id INT IDENTITY PRIMARY KEY,
+        device_id INT,
+        received_datetime DATETIME2
+    )
+    """,
+    create_patient_reading_day_stmt,
+]
+TABLES = [
+    "user",
+    "patient",
+    "patient_status",
+    "patient_address",
+    "patient_note",
+    "device",
+    "glucose_reading",
+    "blood_pressure_reading",
+    "patient_reading_day",
+]
+
+# The monthly_count CTE as it was before the reading day rollup: both reading tables joined onto
+# each device at once, with a correlated UNION per device for the latest reading.
+REFERENCE_MONTHLY_COUNT = """
+SELECT p.patient_id,
+    p.user_id,
+    COUNT(DISTINCT CAST(gr.received_datetime AS DATE)) +
+    COUNT(DISTINCT CAST(bpr.received_datetime AS DATE)) AS mon_count,
+    (
+        SELECT MAX(received_datetime)
+        FROM (
+            SELECT gr.received_datetime
+            FROM glucose_reading gr
+            WHERE gr.device_id = d.device_id
+            UNION
+            SELECT bpr.received_datetime
+            FROM blood_pressure_reading bpr
+            WHERE bpr.device_id = d.device_id
+        ) AS combined_dates
+    ) AS last_reading_date,
+    d.device_id
+FROM patient p
+LEFT JOIN device d
+ON p.patient_id = d.patient_id
+LEFT JOIN glucose_reading gr
+ON d.device_id = gr.device_id
+AND gr.received_datetime >= CAST(DATEADD(MONTH, DATEDIFF(MONTH, 0, GETDATE()), 0) AS DATE)
+AND gr.received_datetime <= GETDATE()
+LEFT JOIN blood_pressure_reading bpr
+ON d.device_id = bpr.device_id
+AND bpr.received_datetime >= CAST(DATEADD(MONTH, DATEDIFF(MONTH, 0, GETDATE()), 0) AS DATE)
+AND bpr.received_datetime <= GETDATE()
+GROUP BY p.patient_id, p.user_id, d.device_id
+"""
+
+
+@pytest.fixture
+def queue_schema(test_database):
+    drop_statements = [f"DROP TABLE IF EXISTS [{table}]" for table in TABLES]
+    drop_statements += [f"DROP PROCEDURE IF EXISTS [{proc}]" for proc in PROCS]
+    procs = [
+        (PROCS_DIR / f"{proc}.sql").read_text(encoding="utf-8-sig") for proc in PROCS
+    ]
+    execute_ddl(test_database, drop_statements + SCHEMA + procs)
+    return test_database
+
+
+def _readings(
+    rng: np.random.Generator, devices: pd.Series, now: pd.Timestamp, n: int
+) -> pd.DataFrame:
+    # Readings from the middle of last month to a day past now, several on most days.
+    start = now.normalize().replace(day=1) - timedelta(days=15)
+    seconds = rng.integers(0, int((now - start).total_seconds()) + 86_400, n)
+    return pd.DataFrame(
+        {
+            "device_id": rng.choice(devices.to_numpy(), n),
+            "received_datetime": start + pd.to_timedelta(seconds, unit="s"),
+        }
+    )
+
+
+def _generate(database: str, seed: int = 7, patients: int = 60) -> pd.Timestamp:
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp(fetch_rows(database, "SELECT GETDATE()")[0][0])
+    patient_ids = np.arange(1, patients + 1)
+    insert_rows(
+        database,
+        "user",
+        pd.DataFrame({"user_id": [1, 2], "display_name": USERS}),
+    )
+    insert_rows(
+        database,
+        "patient",
+        pd.DataFrame(
+            {
+                "patient_id": patient_ids,
+                "first_name": [f"First{i % 7}" for i in patient_ids],
+                "last_name": [f"Last{i}" for i in patient_ids],
+                "full_name": [f"First{i % 7} Last{i}" for i in patient_ids],
+                "phone_number": [f"555{i:07d}" for i in patient_ids],
+                "date_of_birth": pd.Timestamp("1950-06-15"),
+                "user_id": rng.choice([1, 2], patients),
+            }
+        ),
+    )
+    insert_rows(
+        database,
+        "patient_status",
+        pd.DataFrame({"patient_id": patient_ids, "temp_status_type": "Active"}),
+    )
+    insert_rows(
+        database,
+        "patient_address",
+        pd.DataFrame({"patient_id": patient_ids, "temp_state": "TX"}),
+    )
+    # Zero to three devices per patient.
+    owners = np.repeat(patient_ids, rng.integers(0, 4, patients))
+    devices = pd.DataFrame(
+        {"device_id": np.arange(1, owners.size + 1), "patient_id": owners}
+    )
+    insert_rows(database, "device", devices)
+    # The last device gets no readings at all.
+    with_readings = devices["device_id"].iloc[:-1]
+    insert_rows(database, "glucose_reading", _readings(rng, with_readings, now, 4_000))
+    insert_rows(
+        database, "blood_pressure_reading", _readings(rng, with_readings, now, 3_000)
+    )
+    return now
+
+
+def _assert_procs_match_reference(database: str) -> None:
+    # patient_id, user_id, mon_count, last_reading_date and device_id of each patient's devices.
+    reference = fetch_rows(database, REFERENCE_MONTHLY_COUNT)
+
+    for user_id, display_name in enumerate(USERS, start=1):
+        rows = fetch_rows(database, "EXEC get_my_queue ?", (display_name,))
+        assert {(r[0], r[7], r[8]) for r in rows} == {
+            (r[0], r[2], r[3]) for r in reference if r[1] == user_id
+        }
+
+    rows = fetch_rows(database, "EXEC search_patient_list")
+    assert {(r[0], r[7], r[8]) for r in rows} == {(r[0], r[2], r[3]) for r in reference}
+
+    # The overview only returns patients who own a device.
+    for patient_id in {r[0] for r in reference}:
+        rows = fetch_rows(
+            database, "EXEC get_patient_overview @patient_id = ?", (patient_id,)
+        )
+        assert sorted(r[8] for r in rows) == sorted(
+            {r[2] for r in reference if r[0] == patient_id and r[4] is not None}
+        )
+
+
+def test_monthly_count_matches_raw_readings(queue_schema):
+    now = _generate(queue_schema)
+    execute_ddl(queue_schema, ["EXEC refresh_patient_reading_day"])
+
+    assert fetch_rows(queue_schema, "SELECT COUNT(*) FROM patient_reading_day")[0][0]
+    _assert_procs_match_reference(queue_schema)
+
+    # An incremental refresh only rebuilds the days from the earliest new reading.
+    rng = np.random.default_rng(11)
+    devices = pd.Series(
+        [row[0] for row in fetch_rows(queue_schema, "SELECT device_id FROM device")]
+    )
+    late = _readings(rng, devices, now, 500)
+    late = late[late["received_datetime"] >= now.normalize() - timedelta(days=3)]
+    insert_rows(queue_schema, "glucose_reading", late)
+    since = late["received_datetime"].min().date()
+    execute_ddl(queue_schema, [f"EXEC refresh_patient_reading_day @since = '{since}'"])
+
+    _assert_procs_match_reference(queue_schema)
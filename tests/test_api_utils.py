@@ -1,11 +1,26 @@
+import time
+from unittest.mock import patch
+
 import pytest
 import requests
 
-from medicare_rebuild.utils.api_utils import MSGraphApi, TenoviApi
+from medicare_rebuild.utils.api_utils import (
+    MSGraphApi,
+    TenoviApi,
+    TokenCache,
+    shared_token_cache,
+)
 
 JSON_HEADERS = {"Content-Type": "application/json"}
 
 
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    shared_token_cache.clear()
+    yield
+    shared_token_cache.clear()
+
+
 @pytest.fixture
 def ms_graph_api():
     return MSGraphApi(
@@ -43,7 +58,7 @@ def test_get_group_members(ms_graph_api, requests_mock):
         status_code=200,
     )
     response = ms_graph_api.get_group_members(group_id)
-    assert response == {"value": [{"id": "member_id"}]}
+    assert response == [{"id": "member_id"}]
 
 
 def test_get_group_members_raises_on_http_error(ms_graph_api, requests_mock):
@@ -62,6 +77,145 @@ def test_get_group_members_raises_on_http_error(ms_graph_api, requests_mock):
         ms_graph_api.get_group_members(group_id)
 
 
+def _authorize(ms_graph_api, requests_mock):
+    requests_mock.post(
+        "https://login.microsoftonline.com/tenant_id/oauth2/v2.0/token",
+        json={"access_token": "test_token"},
+        headers=JSON_HEADERS,
+    )
+    ms_graph_api.request_access_token()
+
+
+def test_iter_group_members_follows_next_link(ms_graph_api, requests_mock):
+    _authorize(ms_graph_api, requests_mock)
+    endpoint = "https://graph.microsoft.com/v1.0/groups/group_id/members"
+    next_link = f"{endpoint}?$skiptoken=page2"
+    requests_mock.get(
+        endpoint,
+        [
+            {
+                "json": {
+                    "value": [{"id": "1"}, {"id": "2"}],
+                    "@odata.nextLink": next_link,
+                },
+                "headers": JSON_HEADERS,
+            },
+        ],
+    )
+    requests_mock.get(
+        next_link,
+        json={"value": [{"id": "3"}]},
+        headers=JSON_HEADERS,
+        complete_qs=True,
+    )
+
+    members = list(ms_graph_api.iter_group_members("group_id"))
+
+    assert [m["id"] for m in members] == ["1", "2", "3"]
+    first_request = requests_mock.request_history[1]
+    assert first_request.qs["$select"] == ["givenname,surname,displayname,mail,id"]
+    assert first_request.qs["$top"] == ["999"]
+    assert requests_mock.request_history[2].qs == {"$skiptoken": ["page2"]}
+
+
+@patch("medicare_rebuild.utils.api_utils.time.sleep")
+def test_iter_group_members_honours_retry_after(
+    mock_sleep, ms_graph_api, requests_mock
+):
+    _authorize(ms_graph_api, requests_mock)
+    endpoint = "https://graph.microsoft.com/v1.0/groups/group_id/members"
+    requests_mock.get(
+        endpoint,
+        [
+            {"status_code": 429, "headers": {"Retry-After": "7"}},
+            {"json": {"value": [{"id": "1"}]}, "headers": JSON_HEADERS},
+        ],
+    )
+
+    members = list(ms_graph_api.iter_group_members("group_id"))
+
+    assert members == [{"id": "1"}]
+    mock_sleep.assert_called_once_with(7.0)
+
+
+@patch("medicare_rebuild.utils.api_utils.time.sleep")
+def test_iter_group_members_gives_up_after_max_retries(
+    mock_sleep, ms_graph_api, requests_mock
+):
+    ms_graph_api.max_retries = 2
+    _authorize(ms_graph_api, requests_mock)
+    endpoint = "https://graph.microsoft.com/v1.0/groups/group_id/members"
+    requests_mock.get(endpoint, status_code=429)
+
+    with pytest.raises(requests.HTTPError):
+        list(ms_graph_api.iter_group_members("group_id"))
+    assert mock_sleep.call_count == 2
+
+
+def test_request_access_token_is_shared_until_expiry(requests_mock):
+    token_endpoint = "https://login.microsoftonline.com/tenant_id/oauth2/v2.0/token"
+    token_mock = requests_mock.post(
+        token_endpoint,
+        [
+            {"json": {"access_token": "token1", "expires_in": 3600}},
+            {"json": {"access_token": "token2", "expires_in": 3600}},
+        ],
+    )
+    first = MSGraphApi("tenant_id", "client_id", "client_secret")
+    second = MSGraphApi("tenant_id", "client_id", "client_secret")
+
+    first.request_access_token()
+    second.request_access_token()
+
+    assert token_mock.call_count == 1
+    assert second.rest.session.headers["Authorization"] == "Bearer token1"
+
+    # Within the refresh margin the token counts as expired and is replaced before the next request.
+    with patch(
+        "medicare_rebuild.utils.api_utils.time.time", return_value=time.time() + 3400
+    ):
+        second.ensure_access_token()
+    assert token_mock.call_count == 2
+    assert second.rest.session.headers["Authorization"] == "Bearer token2"
+
+
+def test_get_page_logs_in_again_on_unauthorized(ms_graph_api, requests_mock):
+    _authorize(ms_graph_api, requests_mock)
+    requests_mock.post(
+        "https://login.microsoftonline.com/tenant_id/oauth2/v2.0/token",
+        json={"access_token": "fresh_token"},
+        headers=JSON_HEADERS,
+    )
+    endpoint = "https://graph.microsoft.com/v1.0/groups/group_id/members"
+    requests_mock.get(
+        endpoint,
+        [
+            {"status_code": 401},
+            {"json": {"value": [{"id": "1"}]}, "headers": JSON_HEADERS},
+        ],
+    )
+
+    members = list(ms_graph_api.iter_group_members("group_id"))
+
+    assert members == [{"id": "1"}]
+    assert requests_mock.request_history[-1].headers["Authorization"] == (
+        "Bearer fresh_token"
+    )
+
+
+def test_token_cache_persists_owner_only(tmp_path):
+    path = tmp_path / "cache" / "msgraph_token.json"
+    cache = TokenCache(path)
+    cache.set("tenant:client:scope", "secret_token", 3600)
+
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert TokenCache(path).get("tenant:client:scope") == "secret_token"
+    assert TokenCache(path, refresh_margin=3601).get("tenant:client:scope") is None
+
+    path.write_text("not json")
+    assert TokenCache(path).get("tenant:client:scope") is None
+
+
 @pytest.fixture
 def tenovi_api():
     return TenoviApi(client_domain="client_domain", api_key="api_key")
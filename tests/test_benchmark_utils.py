@@ -0,0 +1,62 @@
+import pandas as pd
+
+from medicare_rebuild.utils.benchmark_utils import (
+    compare_to_baseline,
+    load_baseline,
+    measure,
+    save_baseline,
+)
+
+
+def test_measure_builds_fresh_input_per_run():
+    inputs = []
+
+    def make_input():
+        inputs.append([0] * 1000)
+        return inputs[-1]
+
+    result = measure(lambda arr: arr.append(1), make_input, rows=1000, repeat=2)
+
+    # Two timed runs plus the traced run, each on its own input.
+    assert len(inputs) == 3
+    assert all(len(arr) == 1001 for arr in inputs)
+    assert result["rows"] == 1000
+    assert result["rows_per_sec"] > 0
+    assert result["peak_mb"] >= 0
+
+
+def test_baseline_round_trip(tmp_path):
+    path = tmp_path / "baseline.json"
+    assert load_baseline(path) == {}
+
+    results = {"normalize_devices[10]": {"rows_per_sec": 5.0, "peak_mb": 1.0}}
+    save_baseline(results, path)
+
+    assert load_baseline(path) == results
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {
+        "fast": {"rows_per_sec": 100.0, "peak_mb": 10.0},
+        "slower": {"rows_per_sec": 100.0, "peak_mb": 10.0},
+        "bigger": {"rows_per_sec": 100.0, "peak_mb": 10.0},
+    }
+    results = {
+        "fast": {"rows_per_sec": 90.0, "peak_mb": 11.0},
+        "slower": {"rows_per_sec": 70.0, "peak_mb": 10.0},
+        "bigger": {"rows_per_sec": 150.0, "peak_mb": 13.0},
+        "new": {"rows_per_sec": 1.0, "peak_mb": 1.0},
+    }
+
+    report = compare_to_baseline(results, baseline, threshold=0.2).set_index(
+        "benchmark"
+    )
+
+    assert report["regression"].to_dict() == {
+        "fast": False,
+        "slower": True,
+        "bigger": True,
+        "new": False,
+    }
+    assert report.loc["slower", "speed_ratio"] == 0.7
+    assert pd.isna(report.loc["new", "base_rows_per_sec"])
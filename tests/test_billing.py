@@ -0,0 +1,213 @@
+import pandas as pd
+
+from medicare_rebuild.billing import (
+    compare_medical_codes,
+    compute_medical_codes,
+    month_cutoff,
+    summarize_daily_codes,
+)
+
+TODAY = "2025-02-28"
+
+
+def _notes(rows):
+    return pd.DataFrame(
+        rows, columns=["patient_id", "note_datetime", "call_time_seconds", "note_type"]
+    ).astype({"note_datetime": "datetime64[ns]"})
+
+
+def _readings(patient_id, device_id, start, days, per_day=1):
+    times = [
+        pd.Timestamp(start) + pd.Timedelta(days=d, hours=h)
+        for d in range(days)
+        for h in range(per_day)
+    ]
+    return pd.DataFrame(
+        {"patient_id": patient_id, "device_id": device_id, "received_datetime": times}
+    )
+
+
+def _codes(codes, code):
+    return codes[codes["code"] == code].reset_index(drop=True)
+
+
+def test_month_cutoff_clamps_month_ends():
+    assert month_cutoff("2025-03-31") == pd.Timestamp("2025-02-28")
+    assert month_cutoff(pd.Timestamp("2025-02-28 17:45")) == pd.Timestamp("2025-01-28")
+
+
+def test_99202_needs_15_to_29_minutes_of_initial_evaluation():
+    notes = _notes(
+        [
+            (1, "2024-11-01", 600, "Initial Evaluation"),
+            (1, "2024-11-03", 300, "Initial Evaluation"),
+            (1, "2024-11-05", 9000, "RPM Review"),
+            (2, "2024-11-01", 899, "Initial Evaluation"),
+            (3, "2024-11-01", 1799, "Initial Evaluation"),
+            (4, "2024-11-01", 1800, "Initial Evaluation"),
+            (5, "2024-11-01", None, "Initial Evaluation"),
+            (6, "2024-11-01", 1000, "Initial Evaluation"),
+        ]
+    )
+    existing = pd.DataFrame(
+        {"patient_id": [6], "code": ["99204"], "timestamp_applied": ["2024-01-01"]}
+    ).astype({"timestamp_applied": "datetime64[ns]"})
+    empty = _readings(0, 0, TODAY, 0)
+
+    codes, _ = compute_medical_codes(
+        notes, empty, empty, TODAY, existing_codes=existing
+    )
+
+    assert _codes(codes, "99202").values.tolist() == [
+        [1, "99202", pd.Timestamp("2024-11-03")],
+        [3, "99202", pd.Timestamp("2024-11-01")],
+    ]
+
+
+def test_99453_counts_distinct_days_and_bills_once_per_patient():
+    gluc = pd.concat(
+        [
+            _readings(1, 11, "2024-06-01", 16, per_day=3),
+            _readings(2, 21, "2024-06-01", 15, per_day=3),
+        ]
+    )
+    # Patient 1 also qualifies on blood pressure, but its glucose 99453 already covers every device.
+    bp = pd.concat(
+        [_readings(1, 12, "2024-07-01", 20), _readings(3, 31, "2024-07-01", 16)]
+    )
+    notes = _notes([])
+
+    codes, code_devices = compute_medical_codes(notes, gluc, bp, TODAY)
+
+    assert _codes(codes, "99453").values.tolist() == [
+        [1, "99453", pd.Timestamp("2024-06-16 02:00")],
+        [3, "99453", pd.Timestamp("2024-07-16")],
+    ]
+    assert sorted(map(tuple, code_devices.values.tolist())) == [
+        (1, 11),
+        (1, 12),
+        (3, 31),
+    ]
+
+
+def test_99454_counts_days_since_30_days_before_billing_date():
+    # The window starts at midnight on 01/29; patient 2's first day falls before it.
+    gluc = pd.concat(
+        [
+            _readings(1, 11, "2025-01-29", 16),
+            _readings(2, 21, "2025-01-28 23:00", 16),
+        ]
+    )
+    bp = pd.concat(
+        [_readings(1, 12, "2025-02-01", 20), _readings(3, 31, "2025-02-10", 19)]
+    )
+
+    codes, _ = compute_medical_codes(_notes([]), gluc, bp, TODAY)
+
+    assert _codes(codes, "99454").values.tolist() == [
+        [1, "99454", pd.Timestamp("2025-02-13")],
+        [3, "99454", pd.Timestamp("2025-02-28")],
+    ]
+
+
+def test_99457_and_99458_bill_20_minute_blocks():
+    notes = _notes(
+        [
+            # 19:59 of calls since 01/28 is not enough for 99457.
+            (1, "2025-02-10", 1199, "RPM Review"),
+            (1, "2025-01-10", 6000, "RPM Review"),
+            # 20 minutes: 99457 only.
+            (2, "2025-02-10", 1200, "RPM Review"),
+            # 40 minutes: one 99458, dated at the latest note of any date.
+            (3, "2025-01-28", 1800, "RPM Review"),
+            (3, "2025-02-20", 600, "RPM Review"),
+            (3, "2025-03-02", 0, "RPM Review"),
+            # 100 minutes is five blocks, capped at four: three 99458s.
+            (4, "2025-02-01", 6000, "RPM Review"),
+        ]
+    )
+    empty = _readings(0, 0, TODAY, 0)
+
+    codes, _ = compute_medical_codes(notes, empty, empty, TODAY)
+
+    assert _codes(codes, "99457")["patient_id"].tolist() == [2, 3, 4]
+    assert _codes(codes, "99457")["timestamp_applied"].tolist() == [
+        pd.Timestamp("2025-02-10"),
+        pd.Timestamp("2025-03-02"),
+        pd.Timestamp("2025-02-01"),
+    ]
+    assert _codes(codes, "99458").values.tolist() == [
+        [3, "99458", pd.Timestamp("2025-03-02")],
+        [4, "99458", pd.Timestamp("2025-02-01")],
+        [4, "99458", pd.Timestamp("2025-02-01")],
+        [4, "99458", pd.Timestamp("2025-02-01")],
+    ]
+
+
+def test_99458_subtracts_codes_already_applied():
+    notes = _notes([(1, "2025-02-01", 4800, "RPM Review")])
+    existing = pd.DataFrame(
+        {
+            "patient_id": [1, 1],
+            "code": ["99457", "99458"],
+            "timestamp_applied": pd.to_datetime(["2025-02-01", "2025-02-01"]),
+        }
+    )
+    empty = _readings(0, 0, TODAY, 0)
+
+    codes, _ = compute_medical_codes(
+        notes, empty, empty, TODAY, existing_codes=existing
+    )
+
+    # Four blocks less the first and the one already billed leaves two more, next to the existing codes.
+    assert _codes(codes, "99457").shape[0] == 1
+    assert _codes(codes, "99458").shape[0] == 3
+
+
+def test_summarize_daily_codes_and_compare():
+    codes = pd.DataFrame(
+        {
+            "patient_id": [1, 1, 1, 2, 2],
+            "code": ["99457", "99458", "99458", "99454", "99454"],
+            "timestamp_applied": pd.to_datetime(
+                [
+                    "2025-02-10 09:00",
+                    "2025-02-10 09:00",
+                    "2025-02-10 09:00",
+                    "2025-02-28 00:00",
+                    "2025-02-28 08:00",
+                ]
+            ),
+        }
+    )
+
+    daily = summarize_daily_codes(codes, "2025-02-01", "2025-02-28")
+
+    # Like the report, the end date only includes codes applied at midnight.
+    assert daily.to_dict("records") == [
+        {
+            "patient_id": 1,
+            "date_of_service": pd.Timestamp("2025-02-10"),
+            "count_99202": 0,
+            "count_99453": 0,
+            "count_99454": 0,
+            "count_99457": 1,
+            "count_99458": 2,
+        },
+        {
+            "patient_id": 2,
+            "date_of_service": pd.Timestamp("2025-02-28"),
+            "count_99202": 0,
+            "count_99453": 0,
+            "count_99454": 1,
+            "count_99457": 0,
+            "count_99458": 0,
+        },
+    ]
+
+    assert compare_medical_codes(codes, codes.sample(frac=1, random_state=1)).empty
+    mismatches = compare_medical_codes(codes, codes.drop(index=[2, 4]))
+    assert mismatches[["patient_id", "code", "expected", "actual"]].values.tolist() == [
+        [1, "99458", 2, 1],
+        [2, "99454", 1, 0],
+    ]
@@ -0,0 +1,154 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+from medicare_rebuild.utils.cache_utils import (
+    ResponseCache,
+    mount_response_cache,
+    normalize_url,
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves /etag with an ETag, /plain without one and /missing as a 404, counting every request."""
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.server.requests.append((path, self.headers.get("If-None-Match")))
+        if path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304)
+            else:
+                self._send(200, b'{"value": 1}', {"ETag": '"v1"'})
+        elif path.startswith("/plain"):
+            self._send(200, b"x" * 100, {"Content-Type": "text/plain"})
+        else:
+            self._send(404)
+
+    def do_POST(self):
+        self.server.requests.append((urlparse(self.path).path, None))
+        self._send(200, b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _session(cache):
+    session = requests.Session()
+    mount_response_cache(session, cache, namespace="tenant")
+    return session
+
+
+def test_normalize_url():
+    assert (
+        normalize_url("https://api/x?b=2&a=1&a=0#frag") == "https://api/x?a=0&a=1&b=2"
+    )
+
+
+def test_fresh_response_is_served_from_disk(stub, tmp_path):
+    cache = ResponseCache(tmp_path / "http", default_ttl=60)
+
+    first = _session(cache).get(f"{stub.url}/plain", params={"b": 2, "a": 1})
+    # A new session, as on a rerun, with the params in another order.
+    second = _session(cache).get(f"{stub.url}/plain", params={"a": 1, "b": 2})
+
+    assert len(stub.requests) == 1
+    assert second.content == first.content
+    assert second.headers["Content-Type"] == "text/plain"
+    assert second.from_cache
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert {p.stat().st_mode & 0o777 for p in (tmp_path / "http").iterdir()} == {0o600}
+
+
+def test_stale_response_is_revalidated_with_etag(stub, tmp_path):
+    cache = ResponseCache(tmp_path, ttls={"/etag": 0}, default_ttl=60)
+    session = _session(cache)
+
+    assert session.get(f"{stub.url}/etag").json() == {"value": 1}
+    res = session.get(f"{stub.url}/etag")
+
+    assert res.status_code == 200
+    assert res.json() == {"value": 1}
+    assert stub.requests == [("/etag", None), ("/etag", '"v1"')]
+    assert cache.revalidated == 1
+
+
+def test_stale_response_without_etag_is_refetched(stub, tmp_path):
+    cache = ResponseCache(tmp_path, default_ttl=0)
+    session = _session(cache)
+
+    session.get(f"{stub.url}/plain")
+    res = session.get(f"{stub.url}/plain")
+
+    assert len(stub.requests) == 2
+    assert not getattr(res, "from_cache", False)
+
+
+def test_only_successful_gets_are_cached(stub, tmp_path):
+    cache = ResponseCache(tmp_path, default_ttl=60)
+    session = _session(cache)
+
+    for _ in range(2):
+        assert session.get(f"{stub.url}/missing").status_code == 404
+        session.post(f"{stub.url}/plain")
+
+    assert len(stub.requests) == 4
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_least_recently_used_responses_are_evicted(stub, tmp_path):
+    cache = ResponseCache(tmp_path, default_ttl=60)
+    session = _session(cache)
+
+    for name in ("a", "b", "c"):
+        session.get(f"{stub.url}/plain/{name}")
+        time.sleep(0.02)
+    # Room for three and a half entries.
+    entry_size = sum(p.stat().st_size for p in tmp_path.iterdir()) // 3
+    cache.max_bytes = entry_size * 7 // 2
+    session.get(f"{stub.url}/plain/a")  # a is now the most recently used
+    time.sleep(0.02)
+    for name in ("d", "e"):
+        session.get(f"{stub.url}/plain/{name}")
+        time.sleep(0.02)
+    stub.requests.clear()
+
+    for name in ("a", "b", "c", "d", "e"):
+        session.get(f"{stub.url}/plain/{name}")
+
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= cache.max_bytes
+    assert ("/plain/a", None) not in stub.requests
+    assert ("/plain/b", None) in stub.requests
+
+
+def test_disabled_cache_is_not_mounted():
+    session = requests.Session()
+    adapter = session.get_adapter("https://example.com")
+
+    mount_response_cache(session, ResponseCache())
+
+    assert session.get_adapter("https://example.com") is adapter
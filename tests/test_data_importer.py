@@ -0,0 +1,277 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from medicare_rebuild.__main__ import DataImporter
+from medicare_rebuild.queries import set_watermark_stmt
+
+GPS_ENV = [
+    "LCH_SQL_GPS_USERNAME",
+    "LCH_SQL_GPS_PASSWORD",
+    "LCH_SQL_GPS_HOST",
+    "LCH_SQL_GPS_DB",
+]
+
+
+def _importer(monkeypatch, incremental: bool) -> DataImporter:
+    for var in GPS_ENV:
+        monkeypatch.setenv(var, "test")
+    with patch("medicare_rebuild.__main__.DatabaseManager"):
+        return DataImporter("2025-01-01", "2025-02-28", incremental=incremental)
+
+
+@pytest.fixture
+def importer(monkeypatch):
+    return _importer(monkeypatch, incremental=True)
+
+
+@pytest.fixture
+def full_importer(monkeypatch):
+    return _importer(monkeypatch, incremental=False)
+
+
+def _committed_marks(dim: DataImporter) -> dict:
+    return {
+        call.args[1]["source_name"]: call.args[1]["high_water_mark"]
+        for call in dim.gps.execute_query.call_args_list
+        if call.args[0] == set_watermark_stmt
+    }
+
+
+def _readings(sharepoint_ids, recorded) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "sharepoint_id": pd.array(sharepoint_ids, dtype="Int64"),
+            "temp_device": "Tenovi Glucometer",
+            "recorded_datetime": pd.to_datetime(recorded),
+            "received_datetime": pd.to_datetime(recorded),
+            "glucose_reading": 100.0,
+            "is_manual": 0,
+        }
+    )
+
+
+def test_track_watermark_keeps_latest(importer):
+    importer.track_watermark("source", pd.Series(pd.to_datetime(["2025-01-03"])))
+    importer.track_watermark("source", pd.Series(pd.to_datetime(["2025-01-02"])))
+    importer.commit_watermarks()
+    assert _committed_marks(importer) == {"source": datetime(2025, 1, 3)}
+
+
+def test_track_watermark_held_at_earliest_rejected_row(importer):
+    importer.track_watermark(
+        "source",
+        pd.Series(pd.to_datetime(["2025-01-01", "2025-01-05", "2025-01-09"])),
+        rejected=pd.Series(pd.to_datetime(["2025-01-05"])),
+    )
+    # A later batch without rejects does not move the mark past the rejected row.
+    importer.track_watermark("source", pd.Series(pd.to_datetime(["2025-01-20"])))
+    importer.commit_watermarks()
+    assert _committed_marks(importer) == {"source": datetime(2025, 1, 5)}
+    assert not importer.watermark_caps
+
+
+def test_track_watermark_ignored_outside_incremental(full_importer):
+    full_importer.track_watermark("source", pd.Series(pd.to_datetime(["2025-01-03"])))
+    assert not full_importer.pending_watermarks
+
+
+def _reading_day_refreshes(dim: DataImporter) -> list:
+    return [
+        call.args[1]["since"]
+        for call in dim.gps.execute_query.call_args_list
+        if call.args[0] == "EXEC refresh_patient_reading_day :since"
+    ]
+
+
+def test_track_reading_days_keeps_earliest_day(importer):
+    importer.track_reading_days(pd.Series(pd.to_datetime(["2025-01-05 10:00"])))
+    importer.track_reading_days(
+        pd.Series(pd.to_datetime(["2025-01-09 00:00", "2025-01-03 23:59"]))
+    )
+    importer.track_reading_days(pd.Series(pd.to_datetime(["2025-01-04"])))
+    assert importer.first_reading_day == date(2025, 1, 3)
+
+
+def test_track_reading_days_ignores_empty_and_missing_days(importer):
+    importer.track_reading_days(pd.Series([], dtype="datetime64[ns]"))
+    importer.track_reading_days(pd.Series([pd.NaT]))
+    assert importer.first_reading_day is None
+
+
+def test_full_refresh_rebuilds_every_day(full_importer):
+    full_importer.track_reading_days(pd.Series(pd.to_datetime(["2025-01-03"])))
+    full_importer.refresh_reading_days()
+    assert _reading_day_refreshes(full_importer) == [None]
+    assert full_importer.first_reading_day is None
+
+
+def test_incremental_refresh_starts_at_earliest_day(importer):
+    importer.track_reading_days(pd.Series(pd.to_datetime(["2025-01-03 08:00"])))
+    importer.refresh_reading_days()
+    assert _reading_day_refreshes(importer) == [date(2025, 1, 3)]
+    assert importer.first_reading_day is None
+
+
+def test_incremental_refresh_skipped_without_readings(importer):
+    importer.refresh_reading_days()
+    assert _reading_day_refreshes(importer) == []
+
+
+def test_failed_reading_day_refresh_keeps_watermarks(importer):
+    received = pd.Series(pd.to_datetime(["2025-01-03"]))
+    importer.track_watermark("source", received)
+    importer.track_reading_days(received)
+    importer.gps.execute_query.side_effect = Exception("refresh failed")
+    with pytest.raises(Exception, match="refresh failed"):
+        importer.finish_loads()
+    assert _committed_marks(importer) == {}
+    assert importer.pending_watermarks == {"source": datetime(2025, 1, 3)}
+
+
+def test_finish_loads_commits_watermarks_after_refresh(importer):
+    received = pd.Series(pd.to_datetime(["2025-01-03"]))
+    importer.track_watermark("source", received)
+    importer.track_reading_days(received)
+    importer.finish_loads()
+    statements = [call.args[0] for call in importer.gps.execute_query.call_args_list]
+    assert statements.index(
+        "EXEC refresh_patient_reading_day :since"
+    ) < statements.index(set_watermark_stmt)
+
+
+def test_import_readings_holds_mark_at_unmatched_patient(importer):
+    importer.id_maps["patient"] = pd.Series(
+        [10], index=pd.Index([1], name="sharepoint_id"), name="patient_id"
+    )
+    importer.id_maps["device"] = pd.Series(
+        [100],
+        index=pd.MultiIndex.from_tuples(
+            [(10, "bg")], names=["patient_id", "reading_kind"]
+        ),
+        name="device_id",
+    )
+    df = _readings([1, 2, 1], ["2025-01-02", "2025-01-04", "2025-01-06"])
+    importer.import_gluc_readings_data(df)
+    importer.commit_watermarks()
+    assert _committed_marks(importer) == {
+        "Glucose_Readings.Time_Recorded": datetime(2025, 1, 4)
+    }
+    assert importer.unmatched_keys == {"glucose_reading": 1}
+
+
+def test_readings_resolve_device_of_their_kind(importer):
+    importer.id_maps["patient"] = pd.Series(
+        [10, 20], index=pd.Index([1, 2], name="sharepoint_id"), name="patient_id"
+    )
+    # Patient 10 has a glucometer and a newer blood pressure cuff, patient 20 only a cuff.
+    importer.gps.read_sql.return_value = pd.DataFrame(
+        {
+            "device_id": [100, 200, 300],
+            "patient_id": [10, 10, 20],
+            "reading_kind": ["bg", "bp", "bp"],
+        }
+    )
+    importer.import_gluc_readings_data(
+        _readings([1, 2, 1], ["2025-01-02", "2025-01-03", "2025-01-04"])
+    )
+    bp_df = _readings([1, 2], ["2025-01-02", "2025-01-03"]).rename(
+        columns={"glucose_reading": "systolic_reading"}
+    )
+    importer.import_bp_readings_data(bp_df)
+
+    loaded = {call.args[1]: call.args[0] for call in importer.gps.merge.call_args_list}
+    assert loaded["glucose_reading"]["device_id"].tolist() == [100, 100]
+    assert loaded["blood_pressure_reading"]["device_id"].tolist() == [200, 300]
+    assert "reading_kind" not in loaded["glucose_reading"]
+    assert importer.unmatched_keys == {"glucose_reading": 1}
+
+
+def test_readings_fall_back_to_only_device_of_unknown_kind(importer, caplog):
+    importer.id_maps["patient"] = pd.Series(
+        [10, 20], index=pd.Index([1, 2], name="sharepoint_id"), name="patient_id"
+    )
+    # Neither "Omron BP7250" nor "Smart Meter" names a reading kind. Patient 20 also has a glucometer,
+    # so its cuff is not the only device to fall back to.
+    importer.gps.read_sql.return_value = pd.DataFrame(
+        {
+            "device_id": [100, 200, 300],
+            "patient_id": [10, 20, 20],
+            "name": ["Omron BP7250", "Smart Meter", "Tenovi BGM"],
+            "reading_kind": [None, None, "bg"],
+        }
+    )
+    importer.import_gluc_readings_data(_readings([1, 2], ["2025-01-02", "2025-01-03"]))
+    bp_df = _readings([1, 2], ["2025-01-02", "2025-01-03"]).rename(
+        columns={"glucose_reading": "systolic_reading"}
+    )
+    importer.import_bp_readings_data(bp_df)
+
+    loaded = {call.args[1]: call.args[0] for call in importer.gps.merge.call_args_list}
+    assert loaded["glucose_reading"]["device_id"].tolist() == [100, 300]
+    assert loaded["blood_pressure_reading"]["device_id"].tolist() == [100]
+    assert importer.unmatched_keys == {"blood_pressure_reading": 1}
+    assert "{100: 'Omron BP7250', 200: 'Smart Meter'}" in caplog.text
+
+
+def test_concurrent_stages_keep_latest_mark_and_earliest_day(importer):
+    days = [datetime(2025, 1, 1) + timedelta(days=i) for i in range(200)]
+
+    def load(day):
+        values = pd.Series([day])
+        importer.track_watermark("source", values)
+        importer.track_reading_days(values)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(load, reversed(days)))
+    assert importer.pending_watermarks == {"source": days[-1]}
+    assert importer.first_reading_day == date(2025, 1, 1)
+
+
+def test_tenovi_marks_advance_only_over_loaded_readings(importer, monkeypatch):
+    monkeypatch.setenv("TENOVI_CLIENT_DOMAIN", "test")
+    monkeypatch.setenv("TENOVI_API_KEY", "test")
+    importer.id_maps["patient"] = pd.Series(
+        [10], index=pd.Index([1], name="sharepoint_id"), name="patient_id"
+    )
+    importer.id_maps["device"] = pd.Series(
+        [100],
+        index=pd.MultiIndex.from_tuples(
+            [(10, "bg")], names=["patient_id", "reading_kind"]
+        ),
+        name="device_id",
+    )
+    measurements = pd.DataFrame(
+        {
+            "hwi_device_id": ["a", "a", "a", "b", "c"],
+            "metric": ["glucose", "glucose", "glucose", "glucose", "weight"],
+            "patient_id": ["1", "2", "1", "2", "1"],
+            "device_name": "Tenovi BGM",
+            "timestamp": pd.date_range("2025-01-02", periods=5, tz="UTC"),
+            "created": pd.date_range("2025-01-02", periods=5, tz="UTC"),
+            "value_1": "104",
+        }
+    )
+    with (
+        patch("medicare_rebuild.__main__.TenoviApi"),
+        patch("medicare_rebuild.__main__.TenoviHarvester") as harvester,
+    ):
+        harvester.return_value.iter_readings.return_value = iter([measurements])
+        importer.import_tenovi_readings()
+    importer.commit_watermarks()
+    # Patient 2 is not loaded yet, so device a is held at its reading and b does not move.
+    # Device c only sent a metric that is not imported.
+    assert _committed_marks(importer) == {"Tenovi.created.a": datetime(2025, 1, 3)}
+    assert importer.watermark_caps == {}
+
+
+def test_harvested_tenovi_readings_are_dropped_from_sharepoint(importer):
+    df = _readings([1, 2], ["2025-01-02", "2025-01-03"]).assign(
+        temp_device=["Tenovi Glucometer", "Omron"]
+    )
+    assert importer.drop_harvested_readings(df) is df
+    importer.tenovi = True
+    assert importer.drop_harvested_readings(df)["temp_device"].tolist() == ["Omron"]
@@ -2,7 +2,10 @@ import re
 import pandas as pd
 import numpy as np
 
+from medicare_rebuild.utils.enums import insurance_keywords, race_keywords
 from medicare_rebuild.utils.dataframe_utils import (
+    KeywordMatcher,
+    MemoizedTransformer,
     keyword_search,
     keyword_list_search,
     extract_regex_pattern,
@@ -15,11 +18,15 @@ from medicare_rebuild.utils.dataframe_utils import (
     standardize_insurance_id,
     fill_primary_payer,
     fill_primary_payer_id,
+    fill_primary_payer_col,
+    fill_primary_payer_id_col,
     standardize_call_time,
     standardize_note_types,
     standardize_vendor,
     standardize_emcontact_relationship,
     standardize_race,
+    standardize_race_col,
+    standardize_insurance_name_col,
     standardize_weight,
     standardize_height,
     create_patient_df,
@@ -35,7 +42,12 @@ from medicare_rebuild.utils.dataframe_utils import (
     normalize_bp_readings,
     normalize_bg_readings,
     check_patient_db_constraints,
+    split_patient_db_constraints,
+    patient_check_failed_data,
     add_id_col,
+    map_id_col,
+    split_tenovi_readings,
+    drop_vendor_readings,
 )
 
 
@@ -53,6 +65,118 @@ def test_keyword_list_search():
     assert keyword_list_search("I have insurance", keywords) is np.nan
 
 
+def test_keyword_matcher_respects_priority_and_all_tokens():
+    matcher = KeywordMatcher(insurance_keywords)
+    # BCBS Federal is listed before the broader Blue Cross entry.
+    assert matcher.search("Blue Cross Federal Employee") == "BCBS Federal"
+    assert matcher.search("Blue Cross Of Texas") == (
+        "Blue Cross and Blue Shield of Florida"
+    )
+    # Every keyword of a set must be present, as whole words.
+    assert matcher.search("Western Health") is np.nan
+    assert matcher.search("Caresourced", keep_original=True) == "Caresourced"
+
+
+def test_keyword_matcher_multi_word_keywords():
+    matcher = KeywordMatcher({"NY": "New York", "DC": "District of Columbia"})
+    assert matcher.search("Lives In New York City") == "NY"
+    assert matcher.search("York") is np.nan
+    assert matcher.search("District Of Columbia") == "DC"
+
+
+def test_keyword_matcher_matches_regex_search():
+    def regex_list_search(value, keywords):
+        for standard_name, keyword_sets in keywords.items():
+            for keyword_set in keyword_sets:
+                if all(
+                    re.search(r"\b" + re.escape(kw.lower()) + r"\b", value.lower())
+                    for kw in keyword_set
+                ):
+                    return standard_name
+        return value
+
+    values = [
+        "Aetna Medicare",
+        "United Health Care",
+        "Medicaid Ca",
+        "Humanna Gold",
+        "Blue Shield Fed",
+        "African American",
+        "Native Hawaiian",
+        "Unknown",
+        "Nan",
+    ]
+    for keywords in (insurance_keywords, race_keywords):
+        matcher = KeywordMatcher(keywords)
+        for value in values:
+            assert matcher.search(value, keep_original=True) == regex_list_search(
+                value, keywords
+            )
+
+
+def test_standardize_cols_match_scalar_functions():
+    insurance = pd.Series([" humana gold ", "kaiser", np.nan, "somebody else"])
+    assert standardize_insurance_name_col(insurance).tolist() == [
+        standardize_insurance_name(value) for value in insurance
+    ]
+    race = pd.Series(["white", "African American", np.nan, "Other"])
+    assert standardize_race_col(race).tolist() == [
+        standardize_race(value) for value in race
+    ]
+
+
+def test_memoized_transformer_matches_apply():
+    cases = [
+        (standardize_weight, (), ["150 lbs", "130 lbs", "invalid", np.nan, None]),
+        (standardize_height, (), ["5'8\"", "5'4\"", "5'8\"", np.nan]),
+        (standardize_state, (), ["california", "Texas", "texas", np.nan, None]),
+        (standardize_name, (r"[^a-zA-Z-]",), [" anytown ", np.nan, "Anytown"]),
+    ]
+    for func, args, values in cases:
+        col = pd.Series(values * 3, index=range(10, 10 + len(values) * 3), name="col")
+        pd.testing.assert_series_equal(
+            MemoizedTransformer(func, args)(col), col.apply(func, args=args)
+        )
+
+
+def test_memoized_transformer_keeps_mixed_types_apart():
+    col = pd.Series([1, 1.0, True, "X", None, 1], dtype=object)
+    args = (r"[^a-zA-Z0-9.]",)
+    result = MemoizedTransformer(standardize_name, args)(col)
+    assert result.tolist() == col.apply(standardize_name, args=args).tolist()
+    assert MemoizedTransformer(str)(col).tolist() == [
+        "1",
+        "1.0",
+        "True",
+        "X",
+        "None",
+        "1",
+    ]
+
+
+def test_memoized_transformer_calls_once_per_distinct_value():
+    calls = []
+
+    def standardize(value):
+        calls.append(value)
+        return str(value).upper()
+
+    transformer = MemoizedTransformer(standardize)
+    col = pd.Series(["a", "b", "a", "a", "b"])
+    assert transformer(col).tolist() == ["A", "B", "A", "A", "B"]
+    assert calls == ["a", "b"]
+    # The cache is reused on the next call.
+    assert transformer(pd.Series(["b", "c"])).tolist() == ["B", "C"]
+    assert calls == ["a", "b", "c"]
+    assert (transformer.hits, transformer.misses) == (1, 3)
+
+
+def test_memoized_transformer_lru_bound():
+    transformer = MemoizedTransformer(str.upper, maxsize=2)
+    transformer(pd.Series(["a", "b", "c"]))
+    assert list(transformer.cache) == [(str, "b"), (str, "c")]
+
+
 def test_extract_regex_pattern():
     pattern = re.compile(r"\d{3}-\d{2}-\d{4}")
     assert extract_regex_pattern("My SSN is 123-45-6789", pattern) == "123-45-6789"
@@ -115,6 +239,32 @@ def test_fill_primary_payer_id():
     assert fill_primary_payer_id(row) == "12345"
 
 
+def test_fill_primary_payer_cols_match_row_functions():
+    rng = np.random.default_rng(7)
+    n = 500
+    names = np.array(["Humana", "Kaiser", "Nan", "nan", np.nan], dtype=object)
+    ids = np.array(["H123456789", "NAN", np.nan, "K987654321"], dtype=object)
+    mbis = np.array(["1EG4TE5MK73", "NAN", np.nan], dtype=object)
+    df = pd.DataFrame(
+        {
+            "First Name": rng.choice(["John", "Jane", "nan"], n),
+            "Insurance Name:": rng.choice(names, n),
+            "Insurance ID:": rng.choice(ids, n),
+            "Medicare ID number": rng.choice(mbis, n),
+            "Weight": rng.integers(100, 300, n).astype(float),
+        }
+    )
+
+    expected = df.copy()
+    expected["Insurance Name:"] = expected.apply(fill_primary_payer, axis=1)
+    expected["Insurance ID:"] = expected.apply(fill_primary_payer_id, axis=1)
+    result = df.copy()
+    result["Insurance Name:"] = fill_primary_payer_col(result)
+    result["Insurance ID:"] = fill_primary_payer_id_col(result)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
 def test_standardize_call_time():
     assert standardize_call_time("1 days 02:30:00") == 95400
     assert standardize_call_time(None) == 0
@@ -377,9 +527,136 @@ def test_check_patient_db_constraints():
     assert result.shape == (1, 9)
 
 
+def test_split_patient_db_constraints():
+    df = pd.DataFrame(
+        {
+            "phone_number": ["1234567890", "123456789012", "1234567890"],
+            "social_security": ["123456789", "123456789", "1234567890"],
+            "temp_state": ["CA", "CA", np.nan],
+            "zipcode": ["12345", "12345", "12345"],
+            "emergency_phone_number": ["1234567890", "nan", "nan"],
+            "emergency_phone_number2": ["0987654321", "nan", "nan"],
+            "medicare_beneficiary_id": ["1EG4TE5MK73", "1EG4TE5MK73", np.nan],
+            "primary_payer_id": ["67890", "67890", "A" * 31],
+            "secondary_payer_id": ["54321", np.nan, np.nan],
+        },
+        index=[10, 11, 12],
+    )
+
+    valid_df, failed_df = split_patient_db_constraints(df)
+
+    assert valid_df.index.tolist() == [10]
+    assert failed_df.index.tolist() == [11, 12]
+    assert failed_df.columns[0] == "error_type"
+    assert failed_df["error_type"].tolist() == [
+        "phone number length error",
+        "social security length error, state length error, "
+        "primary payer id length error",
+    ]
+    pd.testing.assert_frame_equal(check_patient_db_constraints(df), valid_df)
+    pd.testing.assert_frame_equal(patient_check_failed_data(df), failed_df)
+
+
 def test_add_id_col():
     df = pd.DataFrame({"name": ["John Doe"], "age": [30]})
     id_df = pd.DataFrame({"name": ["John Doe"], "id": [1]})
     result = add_id_col(df, id_df, "name")
     assert result.shape == (1, 2)
     assert "name" not in result.columns
+
+
+def test_map_id_col():
+    df = pd.DataFrame(
+        {
+            "sharepoint_id": pd.array([7, 8, None, 7, 9], dtype="Int64"),
+            "reading": [1.0, 2.0, 3.0, 4.0, 5.0],
+        }
+    )
+    id_map = pd.Series([101, 102], index=[7, 8], name="patient_id")
+    result, unmatched = map_id_col(df, id_map, "sharepoint_id")
+    assert result.columns.tolist() == ["reading", "patient_id"]
+    assert result["patient_id"].tolist() == [101, 102, 101]
+    assert result["reading"].tolist() == [1.0, 2.0, 4.0]
+    assert result["patient_id"].dtype == np.int64
+    assert unmatched.index.tolist() == [2, 4]
+
+
+def test_map_id_col_on_several_columns():
+    df = pd.DataFrame(
+        {
+            "patient_id": pd.array([10, 10, 20, None], dtype="Int64"),
+            "reading_kind": ["bg", "bp", "bg", "bg"],
+        }
+    )
+    id_map = pd.Series(
+        [100, 200, 300],
+        index=pd.MultiIndex.from_tuples(
+            [(10, "bg"), (10, "bp"), (20, "bp")],
+            names=["patient_id", "reading_kind"],
+        ),
+        name="device_id",
+    )
+    result, unmatched = map_id_col(df, id_map, ["patient_id", "reading_kind"])
+    assert result.columns.tolist() == ["device_id"]
+    assert result["device_id"].tolist() == [100, 200]
+    assert unmatched.index.tolist() == [2, 3]
+    assert unmatched[2] == (20, "bg")
+
+
+def test_split_tenovi_readings():
+    df = pd.DataFrame(
+        [
+            {
+                "metric": "glucose",
+                "patient_id": "12",
+                "device_name": "Tenovi BGM",
+                "timestamp": "2025-02-01T14:00:00Z",
+                "created": "2025-02-01T14:00:05Z",
+                "value_1": "104",
+                "hwi_device_id": "a",
+            },
+            {
+                "metric": "blood_pressure",
+                "patient_id": "13",
+                "device_name": "Tenovi BPM",
+                "timestamp": "2025-02-01T09:30:00-05:00",
+                "created": "2025-02-01T14:30:09Z",
+                "value_1": "121",
+                "value_2": "79",
+                "hwi_device_id": "b",
+            },
+            {"metric": "pulse", "patient_id": "13", "value_1": "60"},
+        ]
+    )
+
+    readings = split_tenovi_readings(df)
+
+    gluc_df = normalize_bg_readings(readings["glucose"])
+    assert gluc_df.to_dict("records") == [
+        {
+            "sharepoint_id": 12,
+            "temp_device": "Tenovi BGM",
+            "recorded_datetime": pd.Timestamp("2025-02-01 14:00:00"),
+            "received_datetime": pd.Timestamp("2025-02-01 14:00:05"),
+            "glucose_reading": 104.0,
+            "is_manual": 0,
+        }
+    ]
+    bp_df = normalize_bp_readings(readings["blood_pressure"])
+    assert bp_df["recorded_datetime"].tolist() == [pd.Timestamp("2025-02-01 14:30")]
+    assert bp_df[["systolic_reading", "diastolic_reading"]].values.tolist() == [
+        [121.0, 79.0]
+    ]
+
+    only_gluc = split_tenovi_readings(df.iloc[:1].drop(columns="value_2"))
+    assert only_gluc["blood_pressure"].empty
+
+
+def test_drop_vendor_readings_keeps_manual_and_other_vendors():
+    df = pd.DataFrame(
+        {
+            "temp_device": ["Tenovi BGM", "tenovi glucometer", "Omron", None],
+            "is_manual": pd.array([0, 1, 0, pd.NA], dtype="Int64"),
+        }
+    )
+    assert drop_vendor_readings(df, "Tenovi").index.tolist() == [1, 2, 3]
@@ -1,9 +1,23 @@
 import logging
+import numpy as np
+import pandas as pd
 import pytest
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from unittest.mock import MagicMock, patch
 
-from medicare_rebuild.utils.db_utils import DatabaseManager
+from medicare_rebuild.utils.db_utils import (
+    DatabaseManager,
+    EngineRegistry,
+    QueryProfiler,
+    engine_registry,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_engine_registry():
+    yield
+    engine_registry.dispose_all()
 
 
 @pytest.fixture
@@ -28,6 +42,61 @@ def test_create_engine(mock_create_engine, mock_listen, db_manager):
     mock_listen.assert_called_once()
 
 
+@patch("medicare_rebuild.utils.db_utils.event.listen")
+@patch("medicare_rebuild.utils.db_utils.create_engine")
+def test_create_engine_passes_pool_options(mock_create_engine, mock_listen, db_manager):
+    db_manager.create_engine(
+        "username", "password", "host", "database", pool_size=2, pool_recycle=60
+    )
+    kwargs = mock_create_engine.call_args.kwargs
+    assert kwargs["pool_size"] == 2
+    assert kwargs["max_overflow"] == 10
+    assert kwargs["pool_pre_ping"] is True
+    assert kwargs["pool_recycle"] == 60
+
+
+@patch("medicare_rebuild.utils.db_utils.event.listen")
+@patch("medicare_rebuild.utils.db_utils.create_engine")
+def test_create_engine_shares_engine_per_database(mock_create_engine, mock_listen):
+    mock_create_engine.side_effect = lambda *args, **kwargs: MagicMock()
+    first = DatabaseManager()
+    second = DatabaseManager()
+    other = DatabaseManager()
+    first.create_engine("username", "password", "host", "database")
+    second.create_engine("username", "password", "host", "database")
+    other.create_engine("username", "password", "host", "other_database")
+
+    assert first.engine is second.engine
+    assert first.engine is not other.engine
+    assert mock_create_engine.call_count == 2
+    assert mock_listen.call_count == 2
+
+
+@patch("medicare_rebuild.utils.db_utils.event.listen")
+@patch("medicare_rebuild.utils.db_utils.create_engine")
+def test_close_keeps_shared_engine_warm(mock_create_engine, mock_listen, db_manager):
+    mock_engine = MagicMock()
+    mock_create_engine.return_value = mock_engine
+    db_manager.create_engine("username", "password", "host", "database")
+    db_manager.close()
+
+    mock_engine.dispose.assert_not_called()
+    assert db_manager.engine is None
+    assert len(engine_registry) == 1
+
+
+def test_engine_registry_dispose_all():
+    registry = EngineRegistry()
+    mock_engine = MagicMock()
+    assert registry.get_or_create(("h", "d", "u"), lambda: mock_engine) is mock_engine
+    assert registry.get_or_create(("h", "d", "u"), MagicMock) is mock_engine
+
+    registry.dispose_all()
+
+    mock_engine.dispose.assert_called_once()
+    assert len(registry) == 0
+
+
 def test_get_session_without_engine_raises(db_manager):
     with pytest.raises(Exception, match="Database connection is not established"):
         db_manager.get_session()
@@ -102,3 +171,225 @@ def test_close(db_manager):
 
 def test_close_without_engine_is_noop(db_manager):
     db_manager.close()
+
+
+def test_read_sql_chunks_streams_bounded_frames(db_manager):
+    db_manager.engine = create_engine("sqlite://")
+    with db_manager.engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE readings (id INTEGER, value REAL)")
+        conn.exec_driver_sql(
+            "INSERT INTO readings VALUES (?, ?)", [(i, i * 1.5) for i in range(10)]
+        )
+
+    chunks = list(
+        db_manager.read_sql_chunks(
+            "SELECT id, value FROM readings WHERE id >= ? ORDER BY id",
+            params=(2,),
+            chunksize=3,
+        )
+    )
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+    assert pd.concat(chunks)["id"].tolist() == list(range(2, 10))
+
+
+def test_create_local_engine(db_manager):
+    db_manager.create_local_engine()
+    assert db_manager.engine.dialect.name == "sqlite"
+    assert db_manager.execute_query("SELECT 1") == [(1,)]
+    db_manager.close()
+    assert db_manager.engine is None
+
+
+def test_bulk_insert_through_staging_table(db_manager):
+    db_manager.create_local_engine()
+    db_manager.execute_query(
+        "CREATE TABLE glucose_reading (glucose_reading_id INTEGER PRIMARY KEY, "
+        "device_id INTEGER, recorded_datetime TIMESTAMP, glucose_reading REAL)"
+    )
+    df = pd.DataFrame(
+        {
+            "device_id": [1, 2, 3, 4, 5],
+            "recorded_datetime": pd.to_datetime(
+                [
+                    "2025-01-01 08:00",
+                    "2025-01-02 09:30",
+                    None,
+                    "2025-01-04 00:00",
+                    "2025-01-05 00:00",
+                ]
+            ),
+            "glucose_reading": [101.5, np.nan, 98.0, 110.25, 120.0],
+        }
+    )
+
+    inserted = db_manager.bulk_insert(df, "glucose_reading", batch_size=2)
+
+    assert inserted == 5
+    rows = db_manager.execute_query(
+        "SELECT device_id, recorded_datetime, glucose_reading FROM glucose_reading "
+        "ORDER BY glucose_reading_id"
+    )
+    assert [row[0] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[1][2] is None
+    assert rows[2][1] is None
+    assert rows[0][1].startswith("2025-01-01 08:00")
+    # The staging table is dropped once its rows are moved to the target.
+    assert (
+        db_manager.execute_query(
+            "SELECT name FROM sqlite_temp_master WHERE name = 'staging_glucose_reading'"
+        )
+        == []
+    )
+
+
+def test_bulk_insert_empty_frame_is_noop(db_manager):
+    db_manager.engine = MagicMock()
+    assert db_manager.bulk_insert(pd.DataFrame({"a": []}), "table") == 0
+    db_manager.engine.begin.assert_not_called()
+
+
+def test_merge_updates_changed_rows_and_inserts_new_keys(db_manager):
+    db_manager.create_local_engine()
+    db_manager.execute_query(
+        "CREATE TABLE device (device_id INTEGER PRIMARY KEY, "
+        "hardware_uuid TEXT, name TEXT)"
+    )
+    db_manager.execute_query(
+        "INSERT INTO device (hardware_uuid, name) VALUES ('a1', 'Glucometer'), ('b2', 'Cuff')"
+    )
+    df = pd.DataFrame(
+        {
+            "hardware_uuid": ["b2", "c3", "c3"],
+            "name": ["BP Cuff", "Scale", "Smart Scale"],
+        }
+    )
+
+    merged = db_manager.merge(df, "device", keys=["hardware_uuid"])
+
+    assert merged == 2
+    rows = db_manager.execute_query(
+        "SELECT device_id, hardware_uuid, name FROM device ORDER BY device_id"
+    )
+    assert [tuple(row) for row in rows] == [
+        (1, "a1", "Glucometer"),
+        (2, "b2", "BP Cuff"),
+        (3, "c3", "Smart Scale"),
+    ]
+
+
+def test_merge_stmts_mssql_single_merge():
+    stmts = DatabaseManager._merge_stmts(
+        "mssql",
+        "glucose_reading",
+        "[#staging_glucose_reading]",
+        ["device_id", "recorded_datetime", "glucose_reading"],
+        ["device_id", "recorded_datetime"],
+    )
+
+    assert len(stmts) == 1
+    assert stmts[0].startswith(
+        "MERGE INTO [glucose_reading] AS t USING [#staging_glucose_reading] AS s "
+        "ON t.[device_id] = s.[device_id] AND t.[recorded_datetime] = s.[recorded_datetime]"
+    )
+    assert (
+        "WHEN MATCHED AND EXISTS (SELECT s.[glucose_reading] EXCEPT SELECT t.[glucose_reading])"
+        in stmts[0]
+    )
+    assert stmts[0].endswith(
+        "WHEN NOT MATCHED BY TARGET THEN INSERT ([device_id], [recorded_datetime], [glucose_reading]) "
+        "VALUES (s.[device_id], s.[recorded_datetime], s.[glucose_reading]);"
+    )
+
+
+def test_query_profiler_normalizes_literals():
+    normalize = QueryProfiler.normalize_statement
+
+    assert (
+        normalize(
+            "SELECT *\n  FROM patient WHERE sharepoint_id = 42 AND name = 'O''Brien'"
+        )
+        == "SELECT * FROM patient WHERE sharepoint_id = ? AND name = ?"
+    )
+    assert normalize("EXEC batch_medcode_99454_bg ?") == "EXEC batch_medcode_99454_bg ?"
+    assert (
+        normalize("SELECT 1 WHERE id IN (1, 2, 3)") == "SELECT ? WHERE id IN (?, ...)"
+    )
+
+
+def test_query_profiler_records_statements(caplog):
+    profiler = QueryProfiler(slow_query_seconds=60)
+    db_manager = DatabaseManager(profiler=profiler)
+    db_manager.create_local_engine()
+    db_manager.execute_query("CREATE TABLE device (device_id INTEGER, name TEXT)")
+    db_manager.bulk_insert(
+        pd.DataFrame({"device_id": range(5), "name": list("abcde")}),
+        "device",
+        batch_size=2,
+    )
+    for device_id in range(3):
+        db_manager.execute_query(
+            f"SELECT name FROM device WHERE device_id = {device_id}"
+        )
+
+    summary = profiler.summary().set_index("statement")
+
+    assert summary.loc["SELECT name FROM device WHERE device_id = ?", "count"] == 3
+    staging_insert = summary.loc[
+        "INSERT INTO temp.[staging_device] ([device_id], [name]) VALUES (?, ...)"
+    ]
+    assert staging_insert["count"] == 3
+    assert staging_insert["batch_rows"] == 5
+    assert staging_insert["rows"] == 5
+    assert (
+        summary[["le_0.001s", "le_0.01s", "le_0.1s", "le_1s", "le_10s", "le_inf"]]
+        .sum(axis=1)
+        .equals(summary["count"])
+    )
+    assert "Slow query" not in caplog.text
+
+    # An unprofiled manager adds nothing.
+    db_manager.close()
+    db_manager.profiler = None
+    db_manager.create_local_engine()
+    db_manager.execute_query("SELECT 1")
+    assert "SELECT ?" not in profiler.summary()["statement"].tolist()
+
+
+def test_query_profiler_logs_slow_queries(caplog):
+    profiler = QueryProfiler(slow_query_seconds=0.5)
+
+    with caplog.at_level(logging.WARNING):
+        profiler.record("SELECT * FROM patient WHERE patient_id = 7", 0.75, 1)
+        profiler.record("SELECT * FROM patient WHERE patient_id = 8", 0.01, 1)
+
+    assert caplog.text.count("Slow query") == 1
+    assert "patient_id = ?" in caplog.text
+
+
+def test_query_profiler_attaches_shared_engine_once():
+    profiler = QueryProfiler()
+    engine = create_engine("sqlite://")
+    profiler.attach(engine)
+    profiler.attach(engine)
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+    profiler.detach(engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+    profiler.detach(engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+
+    assert profiler.stats["SELECT ?"]["count"] == 2
+
+
+def test_query_profiler_dump(tmp_path):
+    profiler = QueryProfiler()
+    profiler.record("EXEC batch_medcode_99202", 0.2)
+
+    df = profiler.dump(tmp_path / "query_profile.json")
+
+    assert df.shape[0] == 1
+    assert pd.read_json(tmp_path / "query_profile.json").shape[0] == 1
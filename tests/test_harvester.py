@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from medicare_rebuild.harvester import RateLimiter, TenoviHarvester
+from medicare_rebuild.utils.api_utils import TenoviApi
+
+DEVICES = [{"hwi_device_id": f"device_{i}"} for i in range(6)]
+
+
+def _reading(device_id: str, created: str) -> dict:
+    return {
+        "metric": "glucose",
+        "patient_id": "1",
+        "device_name": "Tenovi BGM",
+        "timestamp": created,
+        "created": created,
+        "value_1": "100",
+    }
+
+
+class TenoviStub(BaseHTTPRequestHandler):
+    """Serves the two Tenovi endpoints the harvester calls and records every request."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append((url.path, parse_qs(url.query)))
+        parts = url.path.strip("/").split("/")
+        if url.path == "/clients/stub/hwi/hwi-devices":
+            body = DEVICES
+        elif parts[-1] == "measurements" and parts[-2] != "device_5":
+            time.sleep(0.05)
+            body = [_reading(parts[-2], "2025-02-01T12:00:00Z")]
+        else:
+            self.send_response(500)
+            self.end_headers()
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def tenovi_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TenoviStub)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def tenovi_api(tenovi_stub):
+    return TenoviApi(
+        client_domain="stub",
+        api_key="api_key",
+        base_url=f"http://127.0.0.1:{tenovi_stub.server_port}",
+    )
+
+
+def test_iter_readings_uses_watermarks_and_batches(tenovi_stub, tenovi_api):
+    harvester = TenoviHarvester(tenovi_api, max_workers=3, requests_per_second=0)
+    watermarks = {"device_0": datetime(2025, 1, 15, 8, 30)}
+
+    batches = list(
+        harvester.iter_readings(
+            watermarks,
+            default_start=datetime(2025, 1, 1),
+            batch_size=2,
+            end=datetime(2025, 2, 28),
+        )
+    )
+
+    assert all(df.shape[0] >= 2 for df in batches[:-1])
+    readings = [r for df in batches for r in df.to_dict("records")]
+    assert sorted(r["hwi_device_id"] for r in readings) == [
+        f"device_{i}" for i in range(5)
+    ]
+    assert harvester.failed_devices == ["device_5"]
+    created_gte = {
+        path.split("/")[-3]: query["created__gte"]
+        for path, query in tenovi_stub.requests
+        if path.endswith("/measurements/")
+    }
+    assert created_gte["device_0"] == ["2025-01-15T08:30:00Z"]
+    assert created_gte["device_1"] == ["2025-01-01T00:00:00Z"]
+    assert all(
+        query["created__lte"] == ["2025-02-28T00:00:00Z"]
+        for path, query in tenovi_stub.requests
+        if path.endswith("/measurements/")
+    )
+
+
+def test_iter_readings_runs_devices_concurrently(tenovi_api):
+    harvester = TenoviHarvester(tenovi_api, max_workers=5, requests_per_second=0)
+
+    start = time.perf_counter()
+    list(harvester.iter_readings({}))
+
+    # Five 50 ms device requests finish well under their 250 ms serial time.
+    assert time.perf_counter() - start < 0.2
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(50)
+    starts = []
+
+    def call():
+        limiter.acquire()
+        starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    starts.sort()
+    assert starts[-1] - starts[0] >= 4 * 0.02 * 0.9
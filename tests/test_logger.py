@@ -1,6 +1,7 @@
 import logging
+from logging.handlers import QueueHandler
 
-from medicare_rebuild.logger import setup_logger
+from medicare_rebuild.logger import setup_logger, stop_logger
 
 
 def _teardown(logger):
@@ -42,3 +43,21 @@ def test_setup_logger_default_level_is_warning(tmp_path, monkeypatch):
         assert logger.level == logging.WARNING
     finally:
         _teardown(logger)
+
+
+def test_setup_logger_queue_handler_writes_off_thread(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    name = "test_logger_queue"
+    logger = setup_logger(name, level="info", queue_handler=True)
+    try:
+        assert len(logger.handlers) == 1
+        assert isinstance(logger.handlers[0], QueueHandler)
+        logger.info("queued message")
+        logger.debug("filtered message")
+        stop_logger(name)
+        log_text = (tmp_path / "logs" / f"{name}_logfile.log").read_text()
+        assert "queued message" in log_text
+        assert "filtered message" not in log_text
+        stop_logger(name)
+    finally:
+        _teardown(logger)
@@ -0,0 +1,90 @@
+import json
+
+import pandas as pd
+import pytest
+
+from medicare_rebuild.metrics import RunMetrics, frame_size
+
+
+def test_frame_size_counts_dataframes_and_dicts():
+    df = pd.DataFrame({"a": [1, 2, 3]})
+
+    assert frame_size(df)[0] == 3
+    assert frame_size({"x": df, "y": df.head(1), "z": None})[0] == 4
+    assert frame_size(None) == (None, None)
+
+
+def test_frame_size_counts_object_contents_only_when_deep():
+    df = pd.DataFrame({"name": ["a" * 100] * 10})
+
+    assert frame_size(df)[1] < frame_size(df, deep=True)[1]
+    metrics = RunMetrics("test", deep_bytes=True)
+    with metrics.stage("normalize.user", df):
+        pass
+    assert metrics.stages["normalize.user"].bytes_in == frame_size(df, deep=True)[1]
+
+
+def test_stage_records_rows_and_times():
+    metrics = RunMetrics("test")
+    df_in = pd.DataFrame({"a": range(10)})
+
+    with metrics.stage("normalize.device", df_in) as stage:
+        df_out = stage.output(df_in.head(4))
+
+    assert df_out.shape[0] == 4
+    stage_metrics = metrics.stages["normalize.device"]
+    assert stage_metrics.calls == 1
+    assert stage_metrics.rows_in == 10
+    assert stage_metrics.rows_out == 4
+    assert stage_metrics.bytes_in > stage_metrics.bytes_out > 0
+    assert stage_metrics.wall_seconds >= 0
+    assert stage_metrics.cpu_seconds >= 0
+
+
+def test_stage_adds_up_repeated_runs():
+    metrics = RunMetrics("test")
+
+    for rows in (5, 7):
+        with metrics.stage("load.glucose_reading") as stage:
+            stage.output(None, rows=rows)
+
+    stage_metrics = metrics.stages["load.glucose_reading"]
+    assert stage_metrics.calls == 2
+    assert stage_metrics.rows_out == 12
+    assert stage_metrics.rows_in is None
+
+
+def test_stage_records_failures():
+    metrics = RunMetrics("test")
+
+    with pytest.raises(ValueError):
+        with metrics.stage("proc.batch_medcode_99202"):
+            raise ValueError("boom")
+
+    assert metrics.stages["proc.batch_medcode_99202"].failures == 1
+
+
+def test_write_manifest_and_prometheus(tmp_path):
+    metrics = RunMetrics("nightly")
+    with metrics.stage("extract.device") as stage:
+        stage.output(pd.DataFrame({"a": [1, 2]}))
+    with metrics.stage("proc.reset_medical_code_tables"):
+        pass
+
+    manifest = json.loads(metrics.write_manifest(tmp_path / "run.json").read_text())
+    prom = metrics.write_prometheus(tmp_path / "textfile" / "run.prom").read_text()
+
+    assert manifest["run"] == "nightly"
+    assert [s["stage"] for s in manifest["stages"]] == [
+        "extract.device",
+        "proc.reset_medical_code_tables",
+    ]
+    assert manifest["stages"][0]["rows_out"] == 2
+    assert (
+        'medicare_rebuild_stage_rows_out{run="nightly",stage="extract.device"} 2'
+        in prom
+    )
+    assert "# TYPE medicare_rebuild_stage_wall_seconds gauge" in prom
+    # Stages without a row count are left out rather than reported as zero.
+    assert 'stage_rows_out{run="nightly",stage="proc.reset' not in prom
+    assert not list((tmp_path / "textfile").glob(".*.tmp"))
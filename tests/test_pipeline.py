@@ -0,0 +1,118 @@
+import threading
+import weakref
+
+import pytest
+
+from medicare_rebuild.pipeline import Pipeline
+
+
+def test_pipeline_passes_dependency_results():
+    pipeline = Pipeline()
+    pipeline.add_stage("extract_a", lambda: 2)
+    pipeline.add_stage("extract_b", lambda: 3)
+    pipeline.add_stage("load", lambda a, b: a * 10 + b, ["extract_a", "extract_b"])
+
+    results = pipeline.run()
+
+    assert results == {"load": 23}
+
+
+def test_pipeline_releases_results_once_dependents_finish():
+    class Frame:
+        pass
+
+    refs = []
+
+    def extract():
+        frame = Frame()
+        refs.append(weakref.ref(frame))
+        return frame
+
+    pipeline = Pipeline(max_workers=1)
+    pipeline.add_stage("extract", extract)
+    pipeline.add_stage("load", lambda df: None, ["extract"])
+    # The extract result is released once load, its only dependent, has finished.
+    pipeline.add_stage("report", lambda _: refs[0]() is None, ["load"])
+
+    assert pipeline.run() == {"report": True}
+
+
+def test_pipeline_returns_kept_results():
+    pipeline = Pipeline()
+    pipeline.add_stage("extract", lambda: 2)
+    pipeline.add_stage("load", lambda df: df * 10, ["extract"])
+
+    assert pipeline.run(keep=["extract", "load"]) == {"extract": 2, "load": 20}
+
+
+def test_pipeline_rejects_unknown_kept_stage():
+    pipeline = Pipeline()
+    pipeline.add_stage("extract", lambda: None)
+
+    with pytest.raises(Exception, match="unknown stage load"):
+        pipeline.run(keep=["load"])
+
+
+def test_pipeline_runs_independent_stages_concurrently():
+    # Each extract waits for the other; run one after another they would time out.
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline(max_workers=2)
+    pipeline.add_stage("extract_a", lambda: barrier.wait())
+    pipeline.add_stage("extract_b", lambda: barrier.wait())
+
+    results = pipeline.run()
+
+    assert sorted(results.values()) == [0, 1]
+
+
+def test_pipeline_runs_loads_in_dependency_order():
+    order = []
+    pipeline = Pipeline(max_workers=4)
+    pipeline.add_stage("load_user", lambda: order.append("user"))
+    pipeline.add_stage("load_patient", lambda _: order.append("patient"), ["load_user"])
+    pipeline.add_stage(
+        "load_device", lambda _: order.append("device"), ["load_patient"]
+    )
+    pipeline.add_stage(
+        "load_readings", lambda _: order.append("readings"), ["load_device"]
+    )
+
+    pipeline.run()
+
+    assert order == ["user", "patient", "device", "readings"]
+
+
+def test_pipeline_failure_skips_dependents():
+    loaded = []
+    pipeline = Pipeline()
+    pipeline.add_stage("extract", lambda: 1 / 0)
+    pipeline.add_stage("load", lambda df: loaded.append(df), ["extract"])
+
+    with pytest.raises(ZeroDivisionError):
+        pipeline.run()
+    assert loaded == []
+
+
+def test_pipeline_rejects_duplicate_stage():
+    pipeline = Pipeline()
+    pipeline.add_stage("extract", lambda: None)
+
+    with pytest.raises(Exception, match="already registered"):
+        pipeline.add_stage("extract", lambda: None)
+
+
+def test_pipeline_rejects_unknown_dependency():
+    pipeline = Pipeline()
+    pipeline.add_stage("load", lambda df: None, ["extract"])
+
+    with pytest.raises(Exception, match="unknown stage extract"):
+        pipeline.run()
+
+
+def test_pipeline_rejects_cycle():
+    pipeline = Pipeline()
+    pipeline.add_stage("a", lambda b: None, ["b"])
+    pipeline.add_stage("b", lambda a: None, ["a"])
+
+    with pytest.raises(Exception, match="dependency cycle"):
+        pipeline.run()
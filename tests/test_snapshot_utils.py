@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from medicare_rebuild.utils.snapshot_utils import (
+    SnapshotWriter,
+    has_pyarrow,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+@pytest.fixture
+def readings_df():
+    return pd.DataFrame(
+        {
+            "device_id": [1, 2, 3],
+            "recorded_datetime": pd.to_datetime(
+                ["2025-01-01 08:00", "2025-01-02 09:30", "2025-01-03 10:45"]
+            ),
+            "glucose_reading": [101.5, np.nan, 98.0],
+        }
+    )
+
+
+def test_write_snapshot_csv_round_trip(tmp_path, readings_df):
+    path = write_snapshot(readings_df, tmp_path / "snap_glucose_df", "csv")
+    assert path.name == "snap_glucose_df.csv"
+    result = read_snapshot(path)
+    assert result["device_id"].tolist() == [1, 2, 3]
+    assert result["glucose_reading"].isna().tolist() == [False, True, False]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_write_snapshot_arrow_round_trip(tmp_path, readings_df, fmt):
+    pytest.importorskip("pyarrow")
+    path = write_snapshot(readings_df, tmp_path / "snap_glucose_df", fmt)
+    assert path.suffix == f".{fmt}"
+    pd.testing.assert_frame_equal(read_snapshot(path), readings_df)
+
+
+def test_write_snapshot_unknown_format(tmp_path, readings_df):
+    with pytest.raises(Exception, match="Unknown snapshot format"):
+        write_snapshot(readings_df, tmp_path / "snap", "json")
+
+
+def test_snapshot_writer_writes_in_background(tmp_path, readings_df):
+    with SnapshotWriter(tmp_path, fmt="csv") as writer:
+        writer.submit(readings_df, "snap_glucose_df")
+        # The queued copy is unaffected by later changes to the frame.
+        readings_df["device_id"] = 0
+        writer.submit(readings_df, "snap_blood_pressure_df")
+
+    assert [path.name for path in writer.written] == [
+        "snap_glucose_df.csv",
+        "snap_blood_pressure_df.csv",
+    ]
+    assert read_snapshot(tmp_path / "snap_glucose_df.csv")["device_id"].tolist() == [
+        1,
+        2,
+        3,
+    ]
+    assert not writer._thread.is_alive()
+
+
+def test_snapshot_writer_records_errors(tmp_path, readings_df):
+    writer = SnapshotWriter(tmp_path / "missing", fmt="csv")
+    writer.submit(readings_df, "snap_glucose_df")
+    writer.close()
+    assert writer.written == []
+    assert writer.errors[0][0] == "snap_glucose_df"
+
+
+def test_snapshot_writer_falls_back_to_csv_without_pyarrow(tmp_path):
+    writer = SnapshotWriter(tmp_path, fmt="parquet")
+    writer.close()
+    assert writer.fmt == ("parquet" if has_pyarrow() else "csv")
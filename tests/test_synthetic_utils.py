@@ -0,0 +1,75 @@
+import pandas as pd
+
+from medicare_rebuild.utils.dataframe_utils import (
+    normalize_bg_readings,
+    normalize_bp_readings,
+    normalize_devices,
+    normalize_patient_notes,
+    normalize_patients,
+)
+from medicare_rebuild.utils.synthetic_utils import generate_dataset, write_dataset
+
+
+def test_generate_dataset_is_deterministic():
+    first = generate_dataset(patients=200, seed=7)
+    second = generate_dataset(patients=200, seed=7)
+    other = generate_dataset(patients=200, seed=8)
+
+    for name, df in first.items():
+        pd.testing.assert_frame_equal(df, second[name])
+    assert not first["Patient_Export"].equals(other["Patient_Export"])
+
+
+def test_generate_dataset_scales_with_patients_months_and_readings():
+    base = generate_dataset(patients=500, months=1, readings_per_day=1.0)
+    scaled = generate_dataset(patients=500, months=2, readings_per_day=2.0)
+
+    assert base["Patient_Export"].shape[0] == 500
+    assert base["Patient_Export"]["ID"].is_unique
+    for name in ("Glucose_Readings", "Blood_Pressure_Readings", "Medical_Notes"):
+        assert set(base[name]["SharePoint_ID"].astype(int)) <= set(range(1, 501))
+    # Readings grow with months x readings/day, notes with months only.
+    ratio = scaled["Glucose_Readings"].shape[0] / base["Glucose_Readings"].shape[0]
+    assert 3.6 < ratio < 4.4
+    ratio = scaled["Medical_Notes"].shape[0] / base["Medical_Notes"].shape[0]
+    assert 1.8 < ratio < 2.2
+
+
+def test_generated_tables_pass_through_normalize():
+    dataset = generate_dataset(patients=300)
+
+    patient_df = normalize_patients(dataset["Patient_Export"].copy())
+    assert patient_df.shape[0] == 300
+    assert "sharepoint_id" in patient_df.columns
+
+    notes_df = pd.merge(
+        dataset["Medical_Notes"],
+        dataset["Time_Log"].rename(
+            columns={"SharPoint_ID": "SharePoint_ID", "Notes": "Note_Type"}
+        ),
+        on=["SharePoint_ID", "Note_ID", "LCH_UPN"],
+        how="left",
+    )
+    notes_df["Time_Note"] = notes_df["Time_Note"].fillna(notes_df["Note_Type"])
+    notes_df = normalize_patient_notes(notes_df.drop(columns=["Note_ID", "Note_Type"]))
+    assert notes_df["note_content"].str.contains("<p>").sum() == 0
+
+    device_df = normalize_devices(dataset["Fulfillment_All"].drop(columns="Resupply"))
+    assert not device_df["hardware_uuid"].str.contains("-").any()
+
+    gluc_df = normalize_bg_readings(dataset["Glucose_Readings"].copy())
+    bp_df = normalize_bp_readings(dataset["Blood_Pressure_Readings"].copy())
+    assert gluc_df["glucose_reading"].notna().all()
+    assert bp_df[["systolic_reading", "diastolic_reading"]].notna().all().all()
+
+
+def test_write_dataset(tmp_path):
+    dataset = generate_dataset(patients=20)
+
+    write_dataset(dataset, tmp_path / "data")
+
+    assert sorted(p.name for p in (tmp_path / "data").iterdir()) == sorted(
+        f"{name}.csv" for name in dataset
+    )
+    df = pd.read_csv(tmp_path / "data" / "Patient_Export.csv")
+    assert df.shape == dataset["Patient_Export"].shape